@@ -0,0 +1,104 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from agent_backend.agent.agent_errors.agent_exception import BudgetExceededError
+
+
+@dataclass
+class AgentBudget:
+    """
+    请求级预算：在 BaseAgent 每个 step 前、每次 LLM / 工具调用前检查
+    各上限为 None 表示不限制；同一请求的所有 Agent（含并发 task）共享同一个实例
+    degrade_ratio: 任一维度用量达到该比例后，Agent 切换为只做总结的最后一步
+    """
+    max_total_tokens: Optional[int] = None
+    max_wall_time: Optional[float] = None       # 秒
+    max_tool_calls: Optional[int] = None
+    max_cost: Optional[float] = None
+    cost_per_1k_tokens: float = 0.0
+    degrade_ratio: float = 0.8
+
+    # ========= 用量 =========
+    used_tokens: int = 0
+    used_tool_calls: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @classmethod
+    def from_config(cls, genie_config) -> Optional["AgentBudget"]:
+        """
+        按 GenieConfig 构建预算，全部不限制时返回 None
+        """
+        budget = cls(
+            max_total_tokens=genie_config.budget_max_total_tokens or None,
+            max_wall_time=genie_config.budget_max_wall_time or None,
+            max_tool_calls=genie_config.budget_max_tool_calls or None,
+            max_cost=genie_config.budget_max_cost or None,
+            cost_per_1k_tokens=genie_config.budget_cost_per_1k_tokens,
+            degrade_ratio=genie_config.budget_degrade_ratio,
+        )
+        return budget if budget.has_limit() else None
+
+    def has_limit(self) -> bool:
+        return any(
+            limit is not None
+            for limit in (self.max_total_tokens, self.max_wall_time, self.max_tool_calls, self.max_cost)
+        )
+
+    # =============================
+    # 记账
+    # =============================
+    def record_tokens(self, tokens: Optional[int]) -> None:
+        if not tokens:
+            return
+        with self._lock:
+            self.used_tokens += tokens
+
+    def record_tool_call(self, count: int = 1) -> None:
+        with self._lock:
+            self.used_tool_calls += count
+
+    @property
+    def used_cost(self) -> float:
+        return self.used_tokens / 1000 * self.cost_per_1k_tokens
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    # =============================
+    # 检查
+    # =============================
+    def _dimensions(self):
+        yield "tokens", self.used_tokens, self.max_total_tokens
+        yield "wall_time", self.elapsed, self.max_wall_time
+        yield "tool_calls", self.used_tool_calls, self.max_tool_calls
+        yield "cost", self.used_cost, self.max_cost
+
+    def usage_ratio(self) -> float:
+        """
+        各维度用量占比的最大值
+        """
+        ratio = 0.0
+        for _, used, limit in self._dimensions():
+            if limit:
+                ratio = max(ratio, used / limit)
+        return ratio
+
+    def should_degrade(self) -> bool:
+        return self.usage_ratio() >= self.degrade_ratio
+
+    def exceeded(self) -> Optional[str]:
+        """
+        返回第一个耗尽的维度描述，未耗尽返回 None
+        """
+        for name, used, limit in self._dimensions():
+            if limit and used >= limit:
+                return f"{name} {used:g}/{limit:g}"
+        return None
+
+    def check(self) -> None:
+        for name, used, limit in self._dimensions():
+            if limit and used >= limit:
+                raise BudgetExceededError(name, used, limit)
@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgentCheckpoint:
+    """
+    Agent 单步执行后的可恢复快照
+    request_id + agent_name 唯一确定一次 Agent 运行
+    """
+    request_id: str
+    agent_name: str
+    current_step: int = 0
+    state: str = "IDLE"
+    # save 时为从 messages_offset 开始的增量消息（0 表示全量重写）；load 返回完整历史
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    messages_offset: int = 0
+    # ToolCollection 数字员工状态
+    current_task: Optional[str] = None
+    digital_employees: Optional[Dict[str, Any]] = None
+    # 已完成但所在 step 尚未提交的工具结果：tool_call_key(...) -> result
+    # current_step 为 0 表示第一个 step 尚未提交，只有工具结果可复用
+    pending_tool_results: Dict[str, str] = field(default_factory=dict)
+    last_result: Optional[str] = None
+
+
+def tool_call_key(step: int, tool_name: str, tool_input: Any) -> str:
+    """
+    工具结果的复用键：step + 工具名 + 规范化参数
+    恢复后 LLM 重新生成的 tool_call_id 与崩溃前不同，不能用 id 匹配
+    """
+    return f"{step}:{tool_name}:{json.dumps(tool_input, ensure_ascii=False, sort_keys=True, default=str)}"
+
+
+class AgentCheckpointer(ABC):
+    """
+    Checkpoint 存储抽象
+    """
+
+    @abstractmethod
+    def save(self, checkpoint: AgentCheckpoint) -> None:
+        """
+        每个 step 完成后持久化
+        """
+        pass
+
+    @abstractmethod
+    def load(self, request_id: str, agent_name: str) -> Optional[AgentCheckpoint]:
+        """
+        读取最近一次 checkpoint，不存在返回 None
+        """
+        pass
+
+    @abstractmethod
+    def save_tool_result(
+        self,
+        request_id: str,
+        agent_name: str,
+        step: int,
+        call_key: str,
+        result: str,
+    ) -> None:
+        """
+        step 内单个工具完成即落盘，崩溃后无需重新调用
+        """
+        pass
+
+    @abstractmethod
+    def complete(self, request_id: str, agent_name: Optional[str] = None) -> None:
+        """
+        运行正常结束，清理 checkpoint（agent_name 为空时清理整个 request）
+        """
+        pass
+
+
+class SqliteCheckpointer(AgentCheckpointer):
+    """
+    基于本地 SQLite 的 checkpoint 存储
+    每个 step 追加一行状态（append-only），读取时取最新 step；
+    消息按下标逐行存储，每个 step 只写新增的消息，恢复时按下标拼回完整历史；
+    放在共享盘上即可被任意 worker 按 request_id 恢复
+    """
+
+    @classmethod
+    def from_config(cls, genie_config) -> Optional["SqliteCheckpointer"]:
+        """
+        checkpoint_db_path 为空时不开启断点续跑
+        """
+        if not genie_config.checkpoint_db_path:
+            return None
+        return cls(genie_config.checkpoint_db_path)
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS agent_checkpoint ("
+            " request_id TEXT NOT NULL,"
+            " agent_name TEXT NOT NULL,"
+            " step INTEGER NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (request_id, agent_name, step))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS agent_checkpoint_message ("
+            " request_id TEXT NOT NULL,"
+            " agent_name TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " step INTEGER NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " PRIMARY KEY (request_id, agent_name, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS agent_tool_result ("
+            " request_id TEXT NOT NULL,"
+            " agent_name TEXT NOT NULL,"
+            " step INTEGER NOT NULL,"
+            " call_key TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " PRIMARY KEY (request_id, agent_name, call_key))"
+        )
+
+    def save(self, checkpoint: AgentCheckpoint) -> None:
+        payload = json.dumps(
+            {
+                "current_step": checkpoint.current_step,
+                "state": checkpoint.state,
+                "current_task": checkpoint.current_task,
+                "digital_employees": checkpoint.digital_employees,
+                "last_result": checkpoint.last_result,
+            },
+            ensure_ascii=False,
+        )
+        key = (checkpoint.request_id, checkpoint.agent_name)
+        offset = checkpoint.messages_offset
+        rows = [
+            (*key, offset + i, checkpoint.current_step, json.dumps(message, ensure_ascii=False))
+            for i, message in enumerate(checkpoint.messages)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # offset 之后的旧消息（全量重写或上次未提交的部分）先删除
+                self._conn.execute(
+                    "DELETE FROM agent_checkpoint_message"
+                    " WHERE request_id = ? AND agent_name = ? AND seq >= ?",
+                    (*key, offset),
+                )
+                self._conn.executemany(
+                    "INSERT INTO agent_checkpoint_message VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO agent_checkpoint VALUES (?, ?, ?, ?, ?)",
+                    (
+                        checkpoint.request_id,
+                        checkpoint.agent_name,
+                        checkpoint.current_step,
+                        payload,
+                        time.time(),
+                    ),
+                )
+                # 已提交 step 的工具结果已经进入 messages，不再需要
+                self._conn.execute(
+                    "DELETE FROM agent_tool_result"
+                    " WHERE request_id = ? AND agent_name = ? AND step <= ?",
+                    (checkpoint.request_id, checkpoint.agent_name, checkpoint.current_step),
+                )
+                # 只保留最近一个 step，避免长任务无限膨胀
+                self._conn.execute(
+                    "DELETE FROM agent_checkpoint"
+                    " WHERE request_id = ? AND agent_name = ? AND step < ?",
+                    (checkpoint.request_id, checkpoint.agent_name, checkpoint.current_step),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load(self, request_id: str, agent_name: str) -> Optional[AgentCheckpoint]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM agent_checkpoint"
+                " WHERE request_id = ? AND agent_name = ?"
+                " ORDER BY step DESC LIMIT 1",
+                (request_id, agent_name),
+            ).fetchone()
+            message_rows = self._conn.execute(
+                "SELECT payload FROM agent_checkpoint_message"
+                " WHERE request_id = ? AND agent_name = ?"
+                " ORDER BY seq",
+                (request_id, agent_name),
+            ).fetchall() if row else []
+            tool_rows = self._conn.execute(
+                "SELECT call_key, result FROM agent_tool_result"
+                " WHERE request_id = ? AND agent_name = ?",
+                (request_id, agent_name),
+            ).fetchall()
+
+        if row is None and not tool_rows:
+            return None
+
+        data = json.loads(row[0]) if row else {}
+        return AgentCheckpoint(
+            request_id=request_id,
+            agent_name=agent_name,
+            current_step=data.get("current_step", 0),
+            state=data.get("state", "IDLE"),
+            messages=[json.loads(payload) for payload, in message_rows],
+            current_task=data.get("current_task"),
+            digital_employees=data.get("digital_employees"),
+            pending_tool_results={call_key: result for call_key, result in tool_rows},
+            last_result=data.get("last_result"),
+        )
+
+    def save_tool_result(
+        self,
+        request_id: str,
+        agent_name: str,
+        step: int,
+        call_key: str,
+        result: str,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO agent_tool_result VALUES (?, ?, ?, ?, ?)",
+                (request_id, agent_name, step, call_key, result),
+            )
+
+    def complete(self, request_id: str, agent_name: Optional[str] = None) -> None:
+        with self._lock:
+            if agent_name is None:
+                self._conn.execute(
+                    "DELETE FROM agent_checkpoint WHERE request_id = ?", (request_id,)
+                )
+                self._conn.execute(
+                    "DELETE FROM agent_checkpoint_message WHERE request_id = ?", (request_id,)
+                )
+                self._conn.execute(
+                    "DELETE FROM agent_tool_result WHERE request_id = ?", (request_id,)
+                )
+            else:
+                self._conn.execute(
+                    "DELETE FROM agent_checkpoint WHERE request_id = ? AND agent_name = ?",
+                    (request_id, agent_name),
+                )
+                self._conn.execute(
+                    "DELETE FROM agent_checkpoint_message WHERE request_id = ? AND agent_name = ?",
+                    (request_id, agent_name),
+                )
+                self._conn.execute(
+                    "DELETE FROM agent_tool_result WHERE request_id = ? AND agent_name = ?",
+                    (request_id, agent_name),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
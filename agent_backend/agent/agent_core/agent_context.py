@@ -2,16 +2,22 @@ from dataclasses import dataclass, field
 from typing import List, Optional, Any
 from agent_backend.agent.agent_tracing.printer import Printer
 from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_core.agent_checkpoint import AgentCheckpointer
+from agent_backend.agent.agent_core.session_store import AgentSession
+from agent_backend.agent.agent_core.agent_budget import AgentBudget
+from agent_backend.agent.agent_core.cancel_token import CancelToken
 
 @dataclass
 class AgentContext:
     # ========= 基础追踪信息 =========
     request_id: str
     session_id: Optional[str] = None
+    session: Optional[AgentSession] = None   # 跨请求会话状态（SessionStore.get_or_create(session_id)）
 
     # ========= 用户 & 任务语义 =========
     query: Optional[str] = None           # 用户原始问题
     task: Optional[str] = None            # 当前 Agent 子任务
+    task_index: Optional[int] = None      # 子任务在计划中的下标（并发 task 区分 checkpoint 等）
     agent_type: Optional[int] = None      # AgentType 枚举值
 
     # ========= 流式与输出控制 =========
@@ -33,3 +39,12 @@ class AgentContext:
 
     # ========= 环境信息 =========
     date_info: Optional[str] = None
+
+    # ========= 断点续跑 =========
+    checkpointer: Optional[AgentCheckpointer] = None  # 为空时不做 checkpoint
+
+    # ========= 请求级预算 =========
+    budget: Optional[AgentBudget] = None  # 为空表示只受 max_steps 限制
+
+    # ========= 取消 =========
+    cancel_token: Optional[CancelToken] = None  # 客户端断开等场景下中止 LLM / 工具调用
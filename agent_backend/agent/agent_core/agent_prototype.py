@@ -0,0 +1,166 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, ClassVar, Dict, Mapping, Optional, Tuple, Type
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_enums.agent_type import AgentType
+from agent_backend.agent.agent_llms.llm import LLMClient
+from agent_backend.agent.agent_prompts.prompt_template import PromptTemplate
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent_config.genie_config import GenieConfig
+
+DEFAULT_ROLE = "default"
+
+
+@dataclass(frozen=True)
+class AgentPrototype:
+    """
+    预构建的 Agent 原型：启动（及配置重载）时构建一次
+    prompt 已解析并预编译，工具集只作为模板通过 fork() 使用，原型本身不可变；
+    每个请求通过 clone() 得到一个写时复制的 Agent
+    """
+    agent_type: AgentType
+    agent_cls: Type[BaseAgent]
+    name: str
+    description: str
+    system_prompt: PromptTemplate
+    next_step_prompt: PromptTemplate
+    max_steps: int
+    tools: ToolCollection
+    digital_employee_prompt: Optional[str] = None
+    duplicate_threshold: int = 2
+
+    @classmethod
+    def from_config(
+        cls,
+        agent_type: AgentType,
+        agent_cls: Type[BaseAgent],
+        genie_config: GenieConfig,
+        config_prefix: str,
+        tools: ToolCollection,
+        name: str,
+        description: str = "",
+        prompt_key: str = "default",
+        static_values: Optional[Mapping[str, str]] = None,
+    ) -> "AgentPrototype":
+        """
+        按 GenieConfig 中 {prefix}_system_prompt_map / {prefix}_next_step_prompt_map /
+        {prefix}_max_steps 构建原型；static_values 为构建期即可确定的占位符
+        """
+        static_values = dict(static_values or {})
+        system_map = getattr(genie_config, f"{config_prefix}_system_prompt_map")
+        next_step_map = getattr(genie_config, f"{config_prefix}_next_step_prompt_map")
+        # 工具描述在构建期生成，首个请求不再承担拼接开销
+        tools.get_tools_desc()
+        return cls(
+            agent_type=agent_type,
+            agent_cls=agent_cls,
+            name=name,
+            description=description,
+            system_prompt=PromptTemplate.compile(system_map.get(prompt_key, "")).partial(**static_values),
+            next_step_prompt=PromptTemplate.compile(next_step_map.get(prompt_key, "")).partial(**static_values),
+            max_steps=getattr(genie_config, f"{config_prefix}_max_steps"),
+            tools=tools,
+            digital_employee_prompt=genie_config.digital_employee_prompt or None,
+        )
+
+    def clone(
+        self,
+        context: AgentContext,
+        llm: Optional[LLMClient] = None,
+        **values: str,
+    ) -> BaseAgent:
+        """
+        基于原型创建请求级 Agent
+        :param values: 请求级占位符（query / date / sopPrompt 等）
+        """
+        # 请求已自带工具集（如追加了 MCP 工具）时优先使用，否则从原型派生
+        if context.tool_collection is None:
+            context.tool_collection = self.tools.fork()
+        tools = context.tool_collection
+        tools.agent_context = context
+
+        agent = self.agent_cls(
+            name=self.name,
+            description=self.description,
+            system_prompt=self.system_prompt.render(**values),
+            next_step_prompt=self.next_step_prompt.render(**values),
+            llm=llm,
+            context=context,
+            max_steps=self.max_steps,
+            duplicate_threshold=self.duplicate_threshold,
+        )
+        agent.available_tools = tools
+        agent.digital_employee_prompt = self.digital_employee_prompt
+        return agent
+
+
+# 原型构建函数：(配置, 工具模板) -> 原型
+PrototypeBuilder = Callable[[GenieConfig, ToolCollection], AgentPrototype]
+
+
+class AgentPrototypeRegistry:
+    """
+    进程级原型注册表，按 (AgentType, 角色) 索引
+    同一 AgentType 可包含多个角色（如 PLAN_SOLVE 的 planner / executor）
+    接入方在启动时 register() 各 Agent 的构建函数，AgentGateway.from_config 调用 build()，
+    配置重载时调用 reload()（AgentGateway.reload）；两者都整体替换原型表，正在执行的请求不受影响
+    """
+    _builders: ClassVar[Dict[Tuple[AgentType, str], PrototypeBuilder]] = {}
+    _prototypes: ClassVar[Dict[Tuple[AgentType, str], AgentPrototype]] = {}
+    _tools: ClassVar[Optional[ToolCollection]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def register(
+        cls,
+        agent_type: AgentType,
+        builder: PrototypeBuilder,
+        role: str = DEFAULT_ROLE,
+    ) -> None:
+        with cls._lock:
+            cls._builders[(agent_type, role)] = builder
+
+    @classmethod
+    def build(cls, genie_config: GenieConfig, tools: ToolCollection) -> None:
+        with cls._lock:
+            builders = dict(cls._builders)
+        prototypes = {key: builder(genie_config, tools) for key, builder in builders.items()}
+        with cls._lock:
+            cls._prototypes = prototypes
+            cls._tools = tools
+
+    @classmethod
+    def reload(cls, genie_config: GenieConfig) -> None:
+        """
+        配置重载：沿用上次 build() 的工具模板重建全部原型
+        """
+        cls.build(genie_config, cls._tools if cls._tools is not None else ToolCollection())
+
+    @classmethod
+    def get(cls, agent_type: AgentType, role: str = DEFAULT_ROLE) -> AgentPrototype:
+        prototype = cls._prototypes.get((agent_type, role))
+        if prototype is None:
+            raise KeyError(
+                f"No agent prototype for {agent_type.name}/{role}, "
+                f"register it before AgentGateway.from_config (or call AgentPrototypeRegistry.build)"
+            )
+        return prototype
+
+    @classmethod
+    def clone(
+        cls,
+        agent_type: AgentType,
+        context: AgentContext,
+        llm: Optional[LLMClient] = None,
+        role: str = DEFAULT_ROLE,
+        **values: str,
+    ) -> BaseAgent:
+        return cls.get(agent_type, role).clone(context, llm, **values)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._builders = {}
+            cls._prototypes = {}
+            cls._tools = None
@@ -2,17 +2,28 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import Field
+from agent_backend.agent.agent_core.agent_checkpoint import AgentCheckpoint, tool_call_key
 from agent_backend.agent.agent_core.agent_context import AgentContext
 from agent_backend.agent.agent_enums.agent_state import AgentState
-from agent_backend.agent.agent_enums.agent_type import RoleType
+from agent_backend.agent.agent_enums.agent_type import MessageKind, RoleType
+from agent_backend.agent.agent_errors.agent_exception import (
+    AgentCancelledError,
+    BudgetExceededError,
+    CircuitOpenError,
+    McpError,
+    ToolArgumentError,
+)
 from agent_backend.agent.agent_llms.llm import LLMClient
+from agent_backend.agent.agent_llms.prompt import BUDGET_SUMMARY_PROMPT
 from agent_backend.agent.agent_schema.memory import Memory
 from agent_backend.agent.agent_schema.message import Message
 from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
 from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_tracing.tracer import Tracer
+from agent_backend.agent.agent_util.log_util import LogUtil
 
 # ===== BaseAgent =====
 
@@ -51,6 +62,11 @@ class BaseAgent:
         self.current_step = 0
         self.duplicate_threshold = duplicate_threshold
 
+        # 断点续跑：上次运行中未提交 step 内已完成的工具结果 tool_call_key -> result
+        self.pending_tool_results: Dict[str, str] = {}
+        # 已写入 checkpoint 的消息：(memory.generation, 条数)，用于只写增量
+        self._checkpointed: Optional[Tuple[int, int]] = None
+
 
     # ===== abstract step =====
     async def step(self):
@@ -61,34 +77,196 @@ class BaseAgent:
 
     # ===== main loop =====
     async def run(self, query: str):
+        request_id = self.context.request_id if self.context else None
+        with Tracer.span("agent.run", agent=self.name, request_id=request_id) as span:
+            result = await self._run_steps(query)
+            span.set("state", self.state.name)
+            return result
+
+    async def _run_steps(self, query: str):
         self.state = AgentState.IDLE
         self.current_step = 0
 
-        if query:
-            self.update_memory(RoleType.USER, query)
-
         results: List[str] = []
 
+        checkpoint = self.restore_checkpoint()
+        if checkpoint is not None:
+            if checkpoint.last_result is not None:
+                results.append(checkpoint.last_result)
+        else:
+            # 同一会话的追问直接装载历轮对话，无需重新构建
+            if self.memory.is_empty() and self.context and self.context.session:
+                self.memory.add_messages(self.context.session.history)
+            if query:
+                self.update_memory(RoleType.USER, query)
+
+        budget = self.context.budget if self.context else None
+        cancel_token = self.context.cancel_token if self.context else None
         try:
             while self.current_step < self.max_steps and self.state != AgentState.FINISHED:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                await self._wait_printer()
+                # 预算检查：耗尽直接终止，接近上限时只做一次总结
+                if budget is not None:
+                    budget.check()
                 self.current_step += 1
                 req_id = self.context.request_id if self.context else "-"
                 print(f"{req_id} {self.name} Executing step {self.current_step}/{self.max_steps}")
+                self.memory.mark_step(self.current_step)
 
-                step_result = await self.step()
+                with Tracer.span("agent.step", step=self.current_step):
+                    if budget is not None and budget.should_degrade():
+                        print(f"{req_id} {self.name} budget usage {budget.usage_ratio():.0%}, summarize only")
+                        step_result = await self.summary_step()
+                    else:
+                        step_result = await self.step()
                 results.append(step_result)
+                self.save_checkpoint(step_result)
 
             if self.current_step >= self.max_steps:
                 self.current_step = 0
                 self.state = AgentState.IDLE
                 results.append(f"Terminated: Reached max steps ({self.max_steps})")
 
+        except BudgetExceededError as e:
+            req_id = self.context.request_id if self.context else "-"
+            print(f"{req_id} {self.name} {e}")
+            self.state = AgentState.IDLE
+            results.append(f"Terminated: Budget exceeded ({e.dimension})")
+
+        except (asyncio.CancelledError, AgentCancelledError):
+            # 取消时保留 checkpoint，不标记完成
+            req_id = self.context.request_id if self.context else "-"
+            print(f"{req_id} {self.name} cancelled at step {self.current_step}")
+            self.state = AgentState.IDLE
+            raise
+
         except Exception:
             self.state = AgentState.ERROR
             raise
 
+        self.complete_checkpoint()
         return results[-1] if results else "No steps executed"
 
+    async def _wait_printer(self) -> None:
+        """
+        输出背压：异步 Printer 队列积压时在 step 边界等待
+        """
+        printer = self.context.printer if self.context else None
+        wait_writable = getattr(printer, "wait_writable", None)
+        if wait_writable is not None:
+            await wait_writable()
+
+    # ===== budget =====
+    async def summary_step(self) -> str:
+        """
+        预算接近上限时的最后一步：不再调用工具，直接基于已有上下文给出结论
+        """
+        self.state = AgentState.FINISHED
+        if self.llm is None:
+            last = self.memory.get_last_message_by_role(RoleType.ASSISTANT)
+            return last.content if last and last.content else "Terminated: Budget nearly exhausted"
+
+        self.update_memory(RoleType.USER, BUDGET_SUMMARY_PROMPT, kind=MessageKind.NEXT_STEP_PROMPT)
+        system_msg = Message.system_message(self.system_prompt) if self.system_prompt else None
+        result = await self.llm.ask_llm_once(self.context, self.memory.context_messages(), system_msg)
+        self.update_memory(RoleType.ASSISTANT, result)
+        return result
+
+    # ===== checkpoint =====
+    def _checkpointer(self):
+        if self.context is None or self.context.checkpointer is None:
+            return None
+        return self.context.checkpointer
+
+    @property
+    def checkpoint_name(self) -> str:
+        """
+        checkpoint 中的 Agent 标识；并发 task 中的同名 Agent 以 task 下标区分
+        """
+        task_index = self.context.task_index if self.context else None
+        return self.name if task_index is None else f"{self.name}#task{task_index}"
+
+    def save_checkpoint(self, last_result: Optional[str] = None) -> None:
+        """
+        step 完成后持久化 Memory / 状态 / 数字员工，失败只记录不影响主流程
+        Memory 只追加时只写上次 checkpoint 之后新增的消息，有删除 / 替换时全量重写
+        """
+        checkpointer = self._checkpointer()
+        if checkpointer is None:
+            return
+        generation, count = self.memory.generation, len(self.memory.messages)
+        offset = 0
+        if self._checkpointed is not None and self._checkpointed[0] == generation and self._checkpointed[1] <= count:
+            offset = self._checkpointed[1]
+        try:
+            checkpointer.save(
+                AgentCheckpoint(
+                    request_id=self.context.request_id,
+                    agent_name=self.checkpoint_name,
+                    current_step=self.current_step,
+                    state=self.state.value,
+                    messages=[msg.to_dict() for msg in self.memory.messages[offset:]],
+                    messages_offset=offset,
+                    current_task=self.available_tools.current_task,
+                    digital_employees=self.available_tools.digital_employees,
+                    last_result=last_result,
+                )
+            )
+            self.pending_tool_results.clear()
+            self._checkpointed = (generation, count)
+        except Exception as e:
+            print(f"{self.context.request_id} {self.name} save checkpoint failed: {e}")
+
+    def restore_checkpoint(self) -> Optional[AgentCheckpoint]:
+        """
+        存在 checkpoint 时恢复到最近一次完成的 step，返回 None 表示从头开始
+        """
+        checkpointer = self._checkpointer()
+        if checkpointer is None:
+            return None
+        try:
+            checkpoint = checkpointer.load(self.context.request_id, self.checkpoint_name)
+        except Exception as e:
+            print(f"{self.context.request_id} {self.name} load checkpoint failed: {e}")
+            return None
+        if checkpoint is None:
+            return None
+        self.pending_tool_results = dict(checkpoint.pending_tool_results)
+        if checkpoint.current_step == 0:
+            # 第一个 step 未提交（只落盘了工具结果）：从头开始，仅复用已完成的工具结果
+            print(
+                f"{self.context.request_id} {self.name} restart with "
+                f"{len(self.pending_tool_results)} pending tool results"
+            )
+            return None
+
+        self.memory.clear()
+        self.memory.add_messages([Message.from_dict(m) for m in checkpoint.messages])
+        self._checkpointed = (self.memory.generation, len(self.memory.messages))
+        self.current_step = checkpoint.current_step
+        self.state = AgentState(checkpoint.state)
+        if checkpoint.digital_employees is not None:
+            self.available_tools.update_digital_employee(checkpoint.digital_employees)
+        if checkpoint.current_task is not None:
+            self.available_tools.set_current_task(checkpoint.current_task)
+
+        print(
+            f"{self.context.request_id} {self.name} resume from step {self.current_step} "
+            f"with {len(self.pending_tool_results)} pending tool results"
+        )
+        return checkpoint
+
+    def complete_checkpoint(self) -> None:
+        checkpointer = self._checkpointer()
+        if checkpointer is None:
+            return
+        try:
+            checkpointer.complete(self.context.request_id, self.checkpoint_name)
+        except Exception as e:
+            print(f"{self.context.request_id} {self.name} complete checkpoint failed: {e}")
+
     # ===== memory =====
     def update_memory(
         self,
@@ -96,18 +274,21 @@ class BaseAgent:
         content: str,
         base64_image: Optional[str] = None,
         *args,
+        kind: Optional[MessageKind] = None,
     ):
         if role == RoleType.USER:
-            msg = Message.user(content, base64_image)
+            msg = Message.user_message(content, base64_image)
         elif role == RoleType.SYSTEM:
-            msg = Message.system(content, base64_image)
+            msg = Message.system_message(content, base64_image)
         elif role == RoleType.ASSISTANT:
-            msg = Message.assistant(content, base64_image)
+            msg = Message.assistant_message(content, base64_image)
         elif role == RoleType.TOOL:
-            msg = Message.tool(content, args[0], base64_image)
+            msg = Message.tool_message(content, args[0], base64_image)
         else:
             raise ValueError(f"Unsupported role type: {role}")
 
+        if kind is not None:
+            msg.kind = kind
         self.memory.add_message(msg)
 
     # ===== tool execution =====
@@ -118,19 +299,76 @@ class BaseAgent:
                 return "Error: Invalid function call format"
 
             name = func.name
-            args = json.loads(func.arguments or "{}")
+            # 请求已取消：排队中的工具不再执行
+            cancel_token = self.context.cancel_token if self.context else None
+            if cancel_token is not None and cancel_token.cancelled:
+                return f"Tool {name} cancelled."
+            try:
+                args = json.loads(func.arguments or "{}")
+            except json.JSONDecodeError as e:
+                return f"Tool {name} arguments are not valid JSON ({e.msg} at position {e.pos}), fix them and call again."
+            # 按 schema 本地校验（并修正 "5" -> 5 等类型偏差），错误参数不再发往工具服务
+            validator = self.available_tools.get_validator(name)
+            if validator is not None:
+                args = validator.validate(args)
+            # 崩溃恢复：同一 step 内相同工具与参数在上次运行中已完成，直接复用结果
+            call_key = tool_call_key(self.current_step, name, args)
+            if call_key in self.pending_tool_results:
+                return self.pending_tool_results[call_key]
 
-            result = await self.available_tools.execute(name, args)
+            session = self.context.session if self.context else None
+            if session is not None:
+                cached = session.get_tool_result(name, args)
+                if cached is not None:
+                    self._record_tool_result(call_key, cached)
+                    return cached
+
+            budget = self.context.budget if self.context else None
+            if budget is not None:
+                exceeded = budget.exceeded()
+                if exceeded:
+                    return f"Tool {name} skipped: budget exceeded ({exceeded})"
+                budget.record_tool_call()
+
+            with Tracer.span("tool.call", tool=name) as span:
+                result = await self.available_tools.execute(name, args)
+                span.set("result_chars", len(str(result)) if result is not None else 0)
             req_id = self.context.request_id if self.context else "-"
-            print(f"{req_id} execute tool: {name} {args} result {result}")
+            print(f"{req_id} execute tool: {name} {LogUtil.cap(args)} result {LogUtil.cap(result)}")
 
-            return str(result) if result is not None else ""
+            result = str(result) if result is not None else ""
+            self._record_tool_result(call_key, result)
+            if session is not None and result:
+                session.put_tool_result(name, args, result)
+            return result
 
+        except ToolArgumentError as e:
+            return f"Tool {name} arguments invalid: {e}. Fix the arguments and call again."
+        except CircuitOpenError as e:
+            # 依赖熔断中：未发起调用，告知模型改用其它工具或稍后重试
+            return f"Tool {name} unavailable: {e}"
+        except McpError as e:
+            return f"Tool {name} Error: {e}"
         except Exception as e:
             req_id = self.context.request_id if self.context else "-"
             print(f"{req_id} execute tool {name if 'name' in locals() else '-'} failed: {e}")
             return f"Tool {name if 'name' in locals() else ''} Error."
 
+    def _record_tool_result(self, call_key: str, result: str) -> None:
+        checkpointer = self._checkpointer()
+        if checkpointer is None:
+            return
+        try:
+            checkpointer.save_tool_result(
+                self.context.request_id,
+                self.checkpoint_name,
+                self.current_step,
+                call_key,
+                result,
+            )
+        except Exception as e:
+            print(f"{self.context.request_id} {self.name} save tool result failed: {e}")
+
     async def execute_tools(self, commands: List[ToolCall]):
         """
         并发执行多个工具调用命令并返回执行结果
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, List, Optional
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class CancelToken:
+    """
+    请求级取消信号
+    - 线程安全：可在事件循环与工具线程中检查 / 触发
+    - cancel() 只生效一次，触发时同步执行已注册的回调（取消 asyncio task、关闭上游连接等）
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        :return: 本次调用是否真正触发了取消
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("cancel callback failed: %s", e)
+        return True
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        注册取消回调，已取消时立即执行
+        :return: 注销函数
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise AgentCancelledError(self.reason or "cancelled")
+
+    def bind_task(self, task: "asyncio.Future") -> Callable[[], None]:
+        """
+        取消时一并取消 asyncio task（可从任意线程触发）
+        """
+        loop = task.get_loop()
+        return self.add_callback(lambda: loop.call_soon_threadsafe(task.cancel))
@@ -0,0 +1,47 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, ClassVar, Dict, Optional
+from agent_backend.agent.agent_prompts.prompt_template import compile_prompt
+
+
+class DigitalEmployeeCache:
+    """
+    数字员工映射的进程级 LRU 缓存
+    key = (task 文本哈希, 工具集版本, prompt 版本[, query 哈希])，任一变化即视为新映射；
+    prompt 模板引用 {{query}} 时渲染结果随 query 变化，query 也计入 key
+    """
+    MAX_ENTRIES: ClassVar[int] = 1024
+
+    _cache: ClassVar["OrderedDict[str, Dict[str, Any]]"] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @staticmethod
+    def build_key(task: str, tool_version: str, prompt: str, query: Optional[str] = None) -> str:
+        task_hash = hashlib.sha1(task.encode("utf-8")).hexdigest()
+        prompt_version = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+        key = f"{task_hash}:{tool_version}:{prompt_version}"
+        if "query" in compile_prompt(prompt).placeholders:
+            key += ":" + hashlib.sha1((query or "").encode("utf-8")).hexdigest()
+        return key
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Dict[str, Any]]:
+        with cls._lock:
+            value = cls._cache.get(key)
+            if value is not None:
+                cls._cache.move_to_end(key)
+            return value
+
+    @classmethod
+    def put(cls, key: str, digital_employees: Dict[str, Any]) -> None:
+        with cls._lock:
+            cls._cache[key] = digital_employees
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.MAX_ENTRIES:
+                cls._cache.popitem(last=False)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
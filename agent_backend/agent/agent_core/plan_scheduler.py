@@ -0,0 +1,292 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Set
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.task_scheduler import AgentFactory, fork_task_context
+from agent_backend.agent.agent_tracing.ordered_printer import OrderedPrinter
+from agent_backend.agent_model.response.agent_response import STEP_PATTERN
+
+logger = logging.getLogger(__name__)
+
+
+class PlanTaskStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    SKIPPED = "skipped"      # 前置 task 失败，未执行
+
+
+@dataclass
+class PlanTask:
+    """
+    计划 DAG 中的一个节点
+    order:      执行顺序编号，相同编号的 task 可并行
+    depends_on: 前一执行顺序的全部 task 下标
+    priority:   关键路径长度（自身耗时估计 + 最长后继链），越大越先调度
+    """
+    index: int
+    step: str
+    order: int
+    stage: str = ""
+    depends_on: List[int] = field(default_factory=list)
+    dependents: List[int] = field(default_factory=list)
+    cost: float = 1.0
+    priority: float = 0.0
+    status: PlanTaskStatus = PlanTaskStatus.PENDING
+    result: Optional[str] = None
+    error: Optional[str] = None
+    # 计时（monotonic 秒）
+    ready_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        if self.ready_at is None or self.started_at is None:
+            return None
+        return self.started_at - self.ready_at
+
+    @property
+    def run_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+def build_plan_dag(
+    steps: List[str],
+    cost_fn: Optional[Callable[[str], float]] = None,
+) -> List[PlanTask]:
+    """
+    把 "执行顺序N. 阶段：步骤" 形式的计划解析为 DAG
+    无法解析执行顺序的步骤视为独占一个新的执行顺序（与之前串行）
+    """
+    tasks: List[PlanTask] = []
+    last_order = 0
+    for i, step in enumerate(steps):
+        match = STEP_PATTERN.search(step)
+        if match:
+            order = int(match.group(1))
+            stage = match.group(2).strip()
+        else:
+            order = last_order + 1
+            stage = ""
+        last_order = max(last_order, order)
+        tasks.append(
+            PlanTask(
+                index=i,
+                step=step,
+                order=order,
+                stage=stage,
+                cost=cost_fn(step) if cost_fn else 1.0,
+            )
+        )
+
+    # 依赖：直接前一执行顺序的全部 task（更早的顺序经传递依赖覆盖）
+    orders = sorted({task.order for task in tasks})
+    by_order: Dict[int, List[PlanTask]] = {order: [] for order in orders}
+    for task in tasks:
+        by_order[task.order].append(task)
+    for prev_order, order in zip(orders, orders[1:]):
+        for task in by_order[order]:
+            for dep in by_order[prev_order]:
+                task.depends_on.append(dep.index)
+                dep.dependents.append(task.index)
+
+    # 关键路径优先级：倒序计算最长后继链
+    for order in reversed(orders):
+        for task in by_order[order]:
+            task.priority = task.cost + max(
+                (tasks[d].priority for d in task.dependents), default=0.0
+            )
+    return tasks
+
+
+@dataclass
+class PlanRunResult:
+    tasks: List[PlanTask]
+    started_at: float
+    finished_at: float
+
+    @property
+    def results(self) -> List[Optional[str]]:
+        return [task.result for task in self.tasks]
+
+    @property
+    def succeeded(self) -> bool:
+        return all(task.status == PlanTaskStatus.COMPLETED for task in self.tasks)
+
+    def timing_report(self) -> List[Dict[str, object]]:
+        """
+        每个 task 的排队 / 执行耗时，用于定位 wall-clock 消耗
+        """
+        return [
+            {
+                "index": task.index,
+                "order": task.order,
+                "stage": task.stage,
+                "status": task.status.value,
+                "priority": task.priority,
+                "wait_ms": None if task.wait_time is None else int(task.wait_time * 1000),
+                "run_ms": None if task.run_time is None else int(task.run_time * 1000),
+                "start_offset_ms": None
+                if task.started_at is None
+                else int((task.started_at - self.started_at) * 1000),
+            }
+            for task in self.tasks
+        ]
+
+
+class PlanScheduler:
+    """
+    计划 DAG 异步调度
+    - 关键路径优先：就绪 task 中 priority 最大的先执行
+    - 全局并发 max_parallel，按阶段 stage_limits 限制扇出
+    - 失败提前传播：失败 task 的全部后继标记为 SKIPPED；fail_fast 时取消所有运行中的 task
+    """
+
+    def __init__(
+        self,
+        max_parallel: int = 5,
+        stage_limits: Optional[Dict[str, int]] = None,
+        fail_fast: bool = False,
+    ):
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be >= 1")
+        self.max_parallel = max_parallel
+        self.stage_limits = stage_limits or {}
+        self.fail_fast = fail_fast
+
+    @classmethod
+    def from_config(cls, genie_config, **kwargs) -> "PlanScheduler":
+        return cls(max_parallel=genie_config.task_max_parallel, **kwargs)
+
+    async def run(
+        self,
+        context: AgentContext,
+        steps: List[str],
+        agent_factory: AgentFactory,
+        cost_fn: Optional[Callable[[str], float]] = None,
+    ) -> PlanRunResult:
+        tasks = build_plan_dag(steps, cost_fn)
+        started_at = time.monotonic()
+        if not tasks:
+            return PlanRunResult(tasks, started_at, started_at)
+
+        ordered: Optional[OrderedPrinter] = (
+            OrderedPrinter(context.printer, len(tasks)) if context.printer else None
+        )
+        remaining_deps = {task.index: len(task.depends_on) for task in tasks}
+        stage_running: Dict[str, int] = {}
+        ready: List[tuple] = []
+        running: Dict[asyncio.Task, PlanTask] = {}
+
+        def _push_ready(task: PlanTask) -> None:
+            task.ready_at = time.monotonic()
+            heapq.heappush(ready, (-task.priority, task.index))
+
+        def _finish_channel(task: PlanTask) -> None:
+            if ordered:
+                ordered.complete(task.index)
+
+        def _skip_descendants(task: PlanTask) -> None:
+            stack = list(task.dependents)
+            seen: Set[int] = set()
+            while stack:
+                index = stack.pop()
+                if index in seen:
+                    continue
+                seen.add(index)
+                child = tasks[index]
+                if child.status == PlanTaskStatus.PENDING:
+                    child.status = PlanTaskStatus.SKIPPED
+                    child.error = f"skipped: dependency {task.index} failed"
+                    _finish_channel(child)
+                stack.extend(child.dependents)
+
+        async def _execute(task: PlanTask) -> str:
+            printer = ordered.channel(task.index) if ordered else None
+            task_context = fork_task_context(context, task.step, printer, task.index)
+            agent = agent_factory(task_context)
+            return await agent.run(task.step)
+
+        def _launch() -> None:
+            blocked = []
+            while ready and len(running) < self.max_parallel:
+                item = heapq.heappop(ready)
+                task = tasks[item[1]]
+                limit = self.stage_limits.get(task.stage)
+                if limit is not None and stage_running.get(task.stage, 0) >= limit:
+                    blocked.append(item)
+                    continue
+                task.status = PlanTaskStatus.RUNNING
+                task.started_at = time.monotonic()
+                stage_running[task.stage] = stage_running.get(task.stage, 0) + 1
+                running[asyncio.create_task(_execute(task))] = task
+            for item in blocked:
+                heapq.heappush(ready, item)
+
+        for task in tasks:
+            if remaining_deps[task.index] == 0:
+                _push_ready(task)
+
+        try:
+            while ready or running:
+                _launch()
+                if not running:
+                    # 阶段限流为 0 时就绪 task 永远无法启动，剩余 task 在 finally 中标记为跳过
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                abort = False
+                for finished in done:
+                    task = running.pop(finished)
+                    task.finished_at = time.monotonic()
+                    stage_running[task.stage] -= 1
+                    error = finished.exception()
+                    if error is None:
+                        task.status = PlanTaskStatus.COMPLETED
+                        task.result = finished.result()
+                        _finish_channel(task)
+                        for index in task.dependents:
+                            remaining_deps[index] -= 1
+                            if remaining_deps[index] == 0 and tasks[index].status == PlanTaskStatus.PENDING:
+                                _push_ready(tasks[index])
+                    else:
+                        logger.error(
+                            "%s plan task %s failed", context.request_id, task.index, exc_info=error
+                        )
+                        task.status = PlanTaskStatus.FAILED
+                        task.error = str(error)
+                        _finish_channel(task)
+                        _skip_descendants(task)
+                        abort = abort or self.fail_fast
+                if abort:
+                    break
+        finally:
+            for pending, task in running.items():
+                pending.cancel()
+                task.status = PlanTaskStatus.SKIPPED
+                task.error = "cancelled"
+                task.finished_at = time.monotonic()
+                _finish_channel(task)
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            for task in tasks:
+                if task.status == PlanTaskStatus.PENDING:
+                    task.status = PlanTaskStatus.SKIPPED
+                    task.error = task.error or "cancelled"
+                    _finish_channel(task)
+
+        result = PlanRunResult(tasks, started_at, time.monotonic())
+        logger.info(
+            "%s plan finished in %sms: %s",
+            context.request_id,
+            int((result.finished_at - started_at) * 1000),
+            result.timing_report(),
+        )
+        return result
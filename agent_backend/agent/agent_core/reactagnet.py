@@ -1,3 +1,4 @@
+import asyncio
 import json
 import re
 import logging
@@ -5,7 +6,10 @@ from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List
 
 from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_core.digital_employee_cache import DigitalEmployeeCache
+from agent_backend.agent.agent_prompts.prompt_template import compile_prompt
 from agent_backend.agent.agent_schema.message import Message
+from agent_backend.agent.agent_tracing.tracer import Tracer
 
 class ReActAgent(BaseAgent, ABC):
     """
@@ -28,16 +32,77 @@ class ReActAgent(BaseAgent, ABC):
         raise NotImplementedError
 
     async def step(self) -> str:
-        should_act = await self.think()
+        with Tracer.span("agent.think") as span:
+            should_act = await self.think()
+            span.set("should_act", should_act)
         if not should_act:
             return "Thinking complete - no action needed"
-        return await self.act()
+        # 数字员工映射与 think 并行生成，act 输出前需要到位
+        await self.wait_digital_employee()
+        with Tracer.span("agent.act"):
+            return await self.act()
 
     async def generate_digital_employee(self, task: str):
+        """
+        为 task 生成 工具名 -> 数字员工 映射
+        命中缓存时立即生效；未命中时在后台调用 LLM，与首个 think() 并行，结果到达后再写入 ToolCollection
+        """
         # 1. 参数检查
         if not task:
             return
 
+        try:
+            # 同一会话内相同 task 直接复用上一轮的数字员工映射
+            session = self.context.session
+            if session is not None and task in session.digital_employees:
+                self._apply_digital_employee(task, session.digital_employees[task])
+                return
+
+            cache_key = DigitalEmployeeCache.build_key(
+                task,
+                self.context.tool_collection.get_version(),
+                self.digital_employee_prompt or "",
+                self.context.query,
+            )
+            cached = DigitalEmployeeCache.get(cache_key)
+            if cached is not None:
+                self._apply_digital_employee(task, cached)
+                if session is not None:
+                    session.digital_employees[task] = cached
+                return
+
+            # 先切换 current_task；上一个 task 的生成若未完成，其结果到达后不会覆盖当前 task
+            self.context.tool_collection.set_current_task(task)
+            self._digital_employee_task = asyncio.create_task(
+                self._generate_digital_employee(task, cache_key)
+            )
+            # 后台生成不随 Agent task 一起取消，需单独绑定取消信号
+            if self.context.cancel_token is not None:
+                self.context.cancel_token.bind_task(self._digital_employee_task)
+
+        except Exception as e:
+            print(
+                f"requestId: {self.context.request_id} "
+                f"in generateDigitalEmployee failed: {e}"
+            )
+
+    async def wait_digital_employee(self) -> None:
+        """
+        等待后台数字员工生成完成（未启动或已完成时立即返回）
+        """
+        pending = getattr(self, "_digital_employee_task", None)
+        if pending is None:
+            return
+        self._digital_employee_task = None
+        try:
+            await pending
+        except Exception as e:
+            print(
+                f"requestId: {self.context.request_id} "
+                f"wait generateDigitalEmployee failed: {e}"
+            )
+
+    async def _generate_digital_employee(self, task: str, cache_key: str) -> None:
         try:
             # 2. 构建系统 Prompt
             formatted_prompt = self._format_system_prompt(task)
@@ -63,11 +128,13 @@ class ReActAgent(BaseAgent, ABC):
                     f"requestId:{self.context.request_id} "
                     f"generateDigitalEmployee parsed: {json_obj}"
                 )
-                self.context.tool_collection.update_digital_employee(json_obj)
-                self.context.tool_collection.set_current_task(task)
-
-                # 更新可用工具
-                self.available_tools = self.context.tool_collection
+                DigitalEmployeeCache.put(cache_key, json_obj)
+                session = self.context.session
+                if session is not None:
+                    session.digital_employees[task] = json_obj
+                # 期间已切换到其它 task 时只写缓存，不覆盖当前映射
+                if self.context.tool_collection.current_task == task:
+                    self._apply_digital_employee(task, json_obj)
             else:
                 print(
                     f"requestId: {self.context.request_id} "
@@ -80,6 +147,13 @@ class ReActAgent(BaseAgent, ABC):
                 f"in generateDigitalEmployee failed: {e}"
             )
 
+    def _apply_digital_employee(self, task: str, digital_employees: Dict[str, Any]) -> None:
+        self.context.tool_collection.update_digital_employee(digital_employees)
+        self.context.tool_collection.set_current_task(task)
+
+        # 更新可用工具
+        self.available_tools = self.context.tool_collection
+
     def _parse_digital_employee(self, response: str):
         """
         支持：
@@ -117,15 +191,8 @@ class ReActAgent(BaseAgent, ABC):
             if not digital_employee_prompt:
                 raise RuntimeError("Digital employee prompt is not configured")
 
-            tool_desc = []
-            for tool in self.context.tool_collection.tool_map.values():
-                tool_desc.append(
-                    f"工具名：{tool.name} 工具描述：{tool.description}"
-                )
-
-            return (
-                digital_employee_prompt
-                .replace("{{task}}", task)
-                .replace("{{ToolsDesc}}", "\n".join(tool_desc))
-                .replace("{{query}}", self.context.query)
-            )
\ No newline at end of file
+            return compile_prompt(digital_employee_prompt).render(
+                task=task,
+                ToolsDesc=self.context.tool_collection.get_tools_desc(),
+                query=self.context.query,
+            )
@@ -0,0 +1,380 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from agent_backend.agent.agent_errors.agent_exception import SessionConflictError
+from agent_backend.agent.agent_schema.message import Message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgentSession:
+    """
+    跨请求会话状态，按 AgentContext.session_id 复用
+    history:            历轮对话消息（新请求直接装载进 Memory，无需从 AgentRequest.messages 重建）
+    formatted_cache:    消息 -> LLM 格式化结果（id(message), is_claude 为 key）
+    token_ledger:       消息 content -> token 数
+    tool_result_cache:  工具名 + 参数 -> (写入时间, 结果)，只缓存 cacheable_tools 中的幂等工具
+    digital_employees:  task -> 数字员工映射
+    owner:              创建会话的用户（erp），其它用户不能使用该会话
+    """
+    session_id: str
+    history: List[Message] = field(default_factory=list)
+    formatted_cache: Dict[Tuple[int, bool], Tuple[Message, Dict[str, Any]]] = field(default_factory=dict)
+    token_ledger: Dict[str, int] = field(default_factory=dict)
+    tool_result_cache: Dict[str, Tuple[float, str]] = field(default_factory=dict)
+    digital_employees: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    owner: Optional[str] = None
+    last_access: float = field(default_factory=time.time)
+    # 工具结果缓存有效期（秒），<= 0 表示不缓存
+    tool_cache_ttl: float = 0
+    # 允许缓存结果的工具（只读、幂等）；代码执行、写文件、MCP 动作等有副作用的工具不应加入
+    cacheable_tools: FrozenSet[str] = frozenset()
+
+    # =============================
+    # 对话历史
+    # =============================
+    def append_turn(self, query: Optional[str], answer: Optional[str]) -> None:
+        if query:
+            self.history.append(Message.user_message(query))
+        if answer:
+            self.history.append(Message.assistant_message(answer))
+
+    # =============================
+    # 格式化缓存
+    # =============================
+    def get_formatted(self, message: Message, is_claude: bool) -> Optional[Dict[str, Any]]:
+        cached = self.formatted_cache.get((id(message), is_claude))
+        # 校验对象身份，避免 id 复用命中旧消息
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        return None
+
+    def put_formatted(self, message: Message, is_claude: bool, formatted: Dict[str, Any]) -> None:
+        self.formatted_cache[(id(message), is_claude)] = (message, formatted)
+
+    # =============================
+    # 工具结果缓存
+    # =============================
+    @staticmethod
+    def tool_cache_key(tool_name: str, tool_input: Any) -> str:
+        return f"{tool_name}:{json.dumps(tool_input, ensure_ascii=False, sort_keys=True)}"
+
+    def is_tool_cacheable(self, tool_name: str) -> bool:
+        return self.tool_cache_ttl > 0 and tool_name in self.cacheable_tools
+
+    def get_tool_result(self, tool_name: str, tool_input: Any) -> Optional[str]:
+        if not self.is_tool_cacheable(tool_name):
+            return None
+        key = self.tool_cache_key(tool_name, tool_input)
+        cached = self.tool_result_cache.get(key)
+        if cached is None:
+            return None
+        if time.time() - cached[0] > self.tool_cache_ttl:
+            del self.tool_result_cache[key]
+            return None
+        return cached[1]
+
+    def put_tool_result(self, tool_name: str, tool_input: Any, result: str) -> None:
+        if not self.is_tool_cacheable(tool_name):
+            return
+        self.tool_result_cache[self.tool_cache_key(tool_name, tool_input)] = (time.time(), result)
+
+    def prune_caches(self) -> None:
+        """
+        请求结束后只保留历史消息相关的缓存，本轮的临时消息（工具输出等）随请求释放
+        """
+        history = {id(message): message for message in self.history}
+        self.formatted_cache = {
+            key: value
+            for key, value in self.formatted_cache.items()
+            if history.get(key[0]) is value[0]
+        }
+        contents = {message.content for message in self.history if message.content}
+        self.token_ledger = {k: v for k, v in self.token_ledger.items() if k in contents}
+
+    # =============================
+    # 内存估算
+    # =============================
+    def estimate_size(self) -> int:
+        size = 256
+        for message in self.history:
+            size += 64 + len(message.content or "") + len(message.base64_image or "")
+        # 格式化结果与 token 账本复用同一份 content 字符串，只计结构开销
+        size += 128 * len(self.formatted_cache)
+        size += 64 * len(self.token_ledger)
+        for _, result in self.tool_result_cache.values():
+            size += 64 + len(result)
+        size += 128 * len(self.digital_employees)
+        return size
+
+    # =============================
+    # 持久化
+    # =============================
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "history": [message.to_dict() for message in self.history],
+            "tool_result_cache": {k: list(v) for k, v in self.tool_result_cache.items()},
+            "digital_employees": self.digital_employees,
+            "owner": self.owner,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "AgentSession":
+        return AgentSession(
+            session_id=data["session_id"],
+            history=[Message.from_dict(m) for m in data.get("history", [])],
+            tool_result_cache={
+                k: (v[0], v[1]) for k, v in data.get("tool_result_cache", {}).items()
+            },
+            digital_employees=data.get("digital_employees", {}),
+            owner=data.get("owner"),
+        )
+
+
+class SqliteSessionBackend:
+    """
+    会话的本地持久化后端：每次请求结束（release）时落盘，未命中时回读
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS agent_session ("
+            " session_id TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def save(self, session: AgentSession) -> None:
+        payload = json.dumps(session.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO agent_session VALUES (?, ?, ?)",
+                (session.session_id, payload, time.time()),
+            )
+
+    def load(self, session_id: str) -> Optional[AgentSession]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM agent_session WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return AgentSession.from_dict(json.loads(row[0])) if row else None
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM agent_session WHERE session_id = ?", (session_id,))
+
+
+class SessionStore:
+    """
+    会话存储：按内存预算做 LRU 淘汰，可选本地持久化后端
+    get_or_create / release 成对调用并维护使用计数，请求进行中的会话不会被淘汰
+    """
+    _default: ClassVar[Optional["SessionStore"]] = None
+    _default_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        tool_cache_ttl: float = 0,
+        backend: Optional[SqliteSessionBackend] = None,
+        cacheable_tools: Optional[Iterable[str]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.tool_cache_ttl = tool_cache_ttl
+        self.cacheable_tools = frozenset(cacheable_tools or ())
+        self.backend = backend
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # session_id -> 进行中的请求数
+        self._in_use: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def init_default(cls, **kwargs) -> "SessionStore":
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(**kwargs)
+        return cls._default
+
+    @classmethod
+    def get_default(cls) -> Optional["SessionStore"]:
+        return cls._default
+
+    @classmethod
+    def from_config(cls, genie_config) -> "SessionStore":
+        """
+        按配置初始化进程级默认实例；session_db_path 为空时会话只保存在内存
+        """
+        if cls._default is not None:
+            return cls._default
+        backend = SqliteSessionBackend(genie_config.session_db_path) if genie_config.session_db_path else None
+        return cls.init_default(
+            max_bytes=genie_config.session_max_bytes,
+            tool_cache_ttl=genie_config.session_tool_cache_ttl,
+            backend=backend,
+            cacheable_tools=genie_config.session_cacheable_tools,
+        )
+
+    # =============================
+    # 获取 / 归还
+    # =============================
+    def get_or_create(
+        self,
+        session_id: str,
+        owner: Optional[str] = None,
+        exclusive: bool = False,
+    ) -> AgentSession:
+        """
+        取会话并增加使用计数，请求结束后必须调用 release
+        owner: 请求用户；新会话归属该用户，已有会话属于其它用户时抛出 SessionConflictError
+        exclusive: 已有请求在使用该会话时抛出 SessionConflictError
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._claim(session, owner, exclusive)
+                self._sessions.move_to_end(session_id)
+                session.last_access = time.time()
+                return session
+
+        session = self._load(session_id)
+        if session is None:
+            session = AgentSession(session_id=session_id)
+        session.tool_cache_ttl = self.tool_cache_ttl
+        session.cacheable_tools = self.cacheable_tools
+
+        with self._lock:
+            # 并发加载时以先放入的为准
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                session = existing
+            self._claim(session, owner, exclusive)
+            if existing is None:
+                self._sessions[session_id] = session
+                self._sizes[session_id] = 0
+            self._account(session)
+        return session
+
+    def check_access(self, session_id: str, owner: Optional[str]) -> None:
+        """
+        请求开始前检查会话能否使用（不增加使用计数），不可用时抛出 SessionConflictError
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._check(session, owner, exclusive=True)
+                return
+        session = self._load(session_id)
+        if session is not None:
+            self._check(session, owner, exclusive=False)
+
+    def _check(self, session: AgentSession, owner: Optional[str], exclusive: bool) -> None:
+        if session.owner is not None and session.owner != owner:
+            raise SessionConflictError("session belongs to another user")
+        if exclusive and self._in_use.get(session.session_id):
+            raise SessionConflictError("session is busy")
+
+    def _claim(self, session: AgentSession, owner: Optional[str], exclusive: bool) -> None:
+        # 调用方持有 _lock
+        self._check(session, owner, exclusive)
+        if session.owner is None:
+            session.owner = owner
+        self._in_use[session.session_id] = self._in_use.get(session.session_id, 0) + 1
+
+    def _load(self, session_id: str) -> Optional[AgentSession]:
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.load(session_id)
+        except Exception as e:
+            logger.error("load session %s failed", session_id, exc_info=e)
+            return None
+
+    def release(self, session: AgentSession) -> None:
+        """
+        请求结束后调用（本轮问答已追加）：减少使用计数、落盘，并重新估算会话大小、按预算淘汰
+        """
+        session.prune_caches()
+        with self._lock:
+            tracked = self._sessions.get(session.session_id) is session
+            count = self._in_use.get(session.session_id, 0) - 1
+            if count > 0:
+                self._in_use[session.session_id] = count
+            else:
+                self._in_use.pop(session.session_id, None)
+        # 被 remove 的会话不再写回
+        if tracked:
+            self._persist(session)
+            with self._lock:
+                self._account(session)
+
+    def _account(self, session: AgentSession) -> None:
+        """
+        更新会话大小并淘汰最久未使用的空闲会话（调用方持有 _lock）
+        最近使用的一个与进行中的会话不淘汰；空闲会话在 release 时已落盘，淘汰只释放内存
+        """
+        if self._sessions.get(session.session_id) is not session:
+            return
+        size = session.estimate_size()
+        self._total_bytes += size - self._sizes.get(session.session_id, 0)
+        self._sizes[session.session_id] = size
+        for session_id in list(self._sessions)[:-1]:
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._in_use.get(session_id):
+                continue
+            del self._sessions[session_id]
+            self._total_bytes -= self._sizes.pop(session_id, 0)
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self._total_bytes -= self._sizes.pop(session_id, 0)
+        if self.backend is not None:
+            self.backend.delete(session_id)
+
+    def flush(self) -> None:
+        """
+        停机前把内存中的会话全部落盘
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            self._persist(session)
+
+    def _persist(self, session: AgentSession) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.save(session)
+        except Exception as e:
+            logger.error("persist session %s failed", session.session_id, exc_info=e)
+
+    # =============================
+    # 监控
+    # =============================
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
@@ -0,0 +1,90 @@
+import asyncio
+import dataclasses
+import logging
+from typing import Callable, List, Optional
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_tracing.ordered_printer import OrderedPrinter
+
+logger = logging.getLogger(__name__)
+
+# 根据 task 级上下文创建执行 Agent（通常是 ExecutorAgent）
+AgentFactory = Callable[[AgentContext], BaseAgent]
+
+
+def fork_task_context(
+    context: AgentContext,
+    task: str,
+    printer=None,
+    index: Optional[int] = None,
+) -> AgentContext:
+    """
+    为单个 task 派生上下文：共享请求级信息与工具注册表，task 级可变状态独立
+    index 区分同一请求内同名 Agent 的 checkpoint
+    """
+    tool_collection = context.tool_collection.fork() if context.tool_collection else None
+    task_context = dataclasses.replace(
+        context,
+        task=task,
+        task_index=index,
+        tool_collection=tool_collection,
+        printer=printer if printer is not None else context.printer,
+        task_product_files=[],
+    )
+    if tool_collection is not None:
+        tool_collection.agent_context = task_context
+    return task_context
+
+
+class TaskScheduler:
+    """
+    相互独立的 task 并发执行
+    - 并发度受 max_parallel 限制
+    - 每个 task 使用独立的 ToolCollection 视图与 AgentContext
+    - 输出经 OrderedPrinter 按 task 顺序推送
+    """
+
+    def __init__(self, max_parallel: int = 5):
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be >= 1")
+        self.max_parallel = max_parallel
+
+    @classmethod
+    def from_config(cls, genie_config) -> "TaskScheduler":
+        return cls(max_parallel=genie_config.task_max_parallel)
+
+    async def run_tasks(
+        self,
+        context: AgentContext,
+        tasks: List[str],
+        agent_factory: AgentFactory,
+    ) -> List[str]:
+        """
+        :return: 与 tasks 一一对应的执行结果，失败的 task 返回错误描述
+        """
+        if not tasks:
+            return []
+
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        ordered: Optional[OrderedPrinter] = (
+            OrderedPrinter(context.printer, len(tasks)) if context.printer else None
+        )
+
+        async def _run_task(index: int, task: str) -> str:
+            try:
+                async with semaphore:
+                    # 取得并发名额后才打开 channel，OrderedPrinter 据此判断 head 是否在执行
+                    printer = ordered.channel(index) if ordered else None
+                    task_context = fork_task_context(context, task, printer, index)
+                    agent = agent_factory(task_context)
+                    return await agent.run(task)
+            except Exception as e:
+                logger.error("%s task %s failed", context.request_id, index, exc_info=e)
+                return f"Task Error: {e}"
+            finally:
+                if ordered:
+                    ordered.complete(index)
+
+        return list(
+            await asyncio.gather(*[_run_task(i, task) for i, task in enumerate(tasks)])
+        )
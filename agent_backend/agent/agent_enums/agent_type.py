@@ -65,4 +65,13 @@ class RoleType(Enum):
         for r in RoleType:
             if r.value == role:
                 return r
-        raise ValueError(f"Invalid role: {role}")
\ No newline at end of file
+        raise ValueError(f"Invalid role: {role}")
+
+"""
+消息类别：写入 Memory 时打标，替代按内容前缀匹配
+"""
+class MessageKind(Enum):
+    NORMAL = "normal"                  # 普通对话消息
+    TOOL_CALL = "tool_call"            # ASSISTANT 发起的工具调用
+    TOOL_RESULT = "tool_result"        # 工具执行结果
+    NEXT_STEP_PROMPT = "next_step"     # 驱动下一步的 planning / reflection 提示
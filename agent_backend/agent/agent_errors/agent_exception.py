@@ -0,0 +1,75 @@
+"""
+Agent 运行期异常
+"""
+from typing import List, Optional
+
+
+class AgentException(Exception):
+    """
+    Agent 运行期异常基类
+    """
+    pass
+
+
+class BudgetExceededError(AgentException):
+    """
+    请求级预算（token / 耗时 / 工具调用次数 / 成本）耗尽
+    """
+
+    def __init__(self, dimension: str, used: float, limit: float):
+        self.dimension = dimension
+        self.used = used
+        self.limit = limit
+        super().__init__(f"budget exceeded: {dimension} used {used} / limit {limit}")
+
+
+class AgentCancelledError(AgentException):
+    """
+    请求已取消（如 SSE 客户端断开），后续 LLM / 工具调用不再执行
+    """
+
+    def __init__(self, reason: str = "cancelled"):
+        self.reason = reason
+        super().__init__(f"request cancelled: {reason}")
+
+
+class McpError(AgentException):
+    """
+    MCP 调用失败（JSON-RPC error / HTTP 错误 / 响应格式不符）
+    """
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        self.code = code
+        super().__init__(message if code is None else f"[{code}] {message}")
+
+
+class CircuitOpenError(AgentException):
+    """
+    依赖服务熔断中：不发起调用直接失败，retry_after 秒后放行探测请求
+    """
+
+    def __init__(self, endpoint: str, retry_after: float, reason: Optional[str] = None):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        self.reason = reason
+        detail = f", last error: {reason}" if reason else ""
+        super().__init__(
+            f"service {endpoint} is temporarily unavailable (circuit open, retry after {retry_after:.0f}s{detail})"
+        )
+
+
+class ToolArgumentError(AgentException):
+    """
+    工具参数不符合 schema（在本地校验，不发起调用）
+    """
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+class SessionConflictError(AgentException):
+    """
+    会话不可用：属于其它用户，或已有请求在使用（同一会话同时只运行一个请求）
+    """
+    pass
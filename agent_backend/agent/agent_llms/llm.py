@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 import copy
 from dataclasses import dataclass
 from enum import Enum
@@ -12,9 +13,14 @@ from typing import Any, List, Dict, Optional
 import tiktoken
 from agent_backend.agent.agent_llms.llm_setting_params import LLMParams
 from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.session_store import AgentSession
+from agent_backend.agent.agent_schema.memory_spill import SpilledMessage
 from agent_backend.agent.agent_schema.message import Message
 from agent_backend.agent.agent_schema.tool.tool_choise import ToolChoice
 from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_tracing.tracer import Tracer
+from agent_backend.agent.agent_util.log_util import LogUtil
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine
 from agent_backend.agent.agent_util.string_util import text_desensitization
 from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
 from tenacity import (
@@ -25,7 +31,7 @@ from tenacity import (
 )
 from openai import RateLimitError, APIConnectionError, Timeout
 
-from agent_backend.agent.agent_llms.prompt import SENSITIVE_PATTERNS, STRUCT_PARSE_TOOL_SYSTEM_PROMPT
+from agent_backend.agent.agent_llms.prompt import STRUCT_PARSE_TOOL_SYSTEM_PROMPT
 logger = logging.getLogger(__name__)
 
 
@@ -53,15 +59,24 @@ class LLMClient:
             api_key=params.api_key,
             base_url=params.base_url,
         )
+        self._encoding = None
 
     #格式化消息
     def format_messages(
         self,
         messages: List[Message],
         is_claude: bool,
+        session: Optional[AgentSession] = None,
     ):
         formatted = []
         for msg in messages:
+            # 会话历史消息跨请求复用格式化结果；已落盘的消息不缓存，否则正文又常驻内存
+            cacheable = session is not None and not isinstance(msg, SpilledMessage)
+            if cacheable:
+                cached = session.get_formatted(msg, is_claude)
+                if cached is not None:
+                    formatted.append(cached)
+                    continue
             message_map: Dict[str, Any] = {}
             # ===== multimodal =====
             # 1.处理 base64 图像
@@ -112,11 +127,8 @@ class LLMClient:
             # ===== tool result =====
                 #工具执行结果重新喂给大模型
             elif msg.tool_call_id:
-                #执行结果脱敏
-                content = text_desensitization(
-                    msg.content,
-                    SENSITIVE_PATTERNS,
-                )
+                #执行结果脱敏：内置规则 + genie_config.sensitive_patterns
+                content = text_desensitization(msg.content)
 
                 if is_claude:
                     message_map["role"] = "user"
@@ -136,22 +148,39 @@ class LLMClient:
                 message_map["content"] = msg.content
 
             formatted.append(message_map)
+            if cacheable:
+                session.put_formatted(msg, is_claude, message_map)
 
         return formatted
     
-    def count_message_tokens(self, message: Dict[str, Any]) -> int:
+    def _get_encoding(self):
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.params.model_name)
+            except KeyError:
+                # fallback（非常重要，避免模型名不识别）
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+
+    def count_message_tokens(
+        self,
+        message: Dict[str, Any],
+        token_ledger: Optional[Dict[str, int]] = None,
+    ) -> int:
         """
         统计单条 message 的 token 数
+        token_ledger: 会话级 content -> token 数账本，命中时跳过编码
         """
-        try:
-            encoding = tiktoken.encoding_for_model(self.params.model_name)
-        except KeyError:
-            # fallback（非常重要，避免模型名不识别）
-            encoding = tiktoken.get_encoding("cl100k_base")
+        content = message.get("content", "")
+        if token_ledger is not None and isinstance(content, str):
+            cached = token_ledger.get(content)
+            if cached is not None:
+                return cached
+
+        encoding = self._get_encoding()
         tokens = 0
         # role tokens（OpenAI 固定开销）
         tokens += 4  # 每条 message 的结构开销
-        content = message.get("content", "")
         if isinstance(content, list):
             for item in content:
                 if item.get("type") == "text":
@@ -161,6 +190,8 @@ class LLMClient:
         else:
             tokens += len(encoding.encode(str(content)))
 
+        if token_ledger is not None and isinstance(content, str):
+            token_ledger[content] = tokens
         return tokens    
 
     #token截断:倒序贪心+user边界对齐
@@ -173,22 +204,17 @@ class LLMClient:
         if not messages or max_input_tokens < 0:
             return messages
 
-        logger.info(
-            "%s before truncate %s",
-            context.request_id,
-            json.dumps(messages, ensure_ascii=False),
-        )
-
         truncated_messages: List[Dict[str, Any]] = []
         remaining_tokens = max_input_tokens
+        token_ledger = context.session.token_ledger if context.session else None
 
         system = messages[0]
         if system.get("role") == "system":
-            remaining_tokens -= self.count_message_tokens(system)
+            remaining_tokens -= self.count_message_tokens(system, token_ledger)
 
         # 从后往前取
         for message in reversed(messages):
-            message_tokens = self.count_message_tokens(message)
+            message_tokens = self.count_message_tokens(message, token_ledger)
             if remaining_tokens >= message_tokens:
                 truncated_messages.insert(0, message)
                 remaining_tokens -= message_tokens
@@ -206,45 +232,111 @@ class LLMClient:
         if system.get("role") == "system":
             truncated_messages.insert(0, system)
 
+        # 只记录条数；完整内容仅在 DEBUG 下惰性序列化（截断 + 采样）
         logger.info(
-            "%s after truncate %s",
+            "%s truncate messages %s -> %s, max_input_tokens=%s",
             context.request_id,
-            json.dumps(truncated_messages, ensure_ascii=False),
+            len(messages),
+            len(truncated_messages),
+            max_input_tokens,
         )
+        logger.debug("%s after truncate %s", context.request_id, LogUtil.payload(truncated_messages))
 
         return truncated_messages
 
+    @staticmethod
+    def _dropped_count(
+        formatted: List[Dict[str, Any]],
+        truncated: List[Dict[str, Any]],
+        system_count: int,
+    ) -> int:
+        """
+        截断丢弃的前导消息条数（不含 system_msgs）
+        """
+        kept = {id(message) for message in truncated}
+        count = 0
+        for message in formatted[system_count:]:
+            if id(message) in kept:
+                break
+            count += 1
+        return count
+
     def _prepare_messages(
         self,
         context: AgentContext,
         messages: List[Message],
         system_msgs: Optional[Message],
     ) -> List[dict]:
-        # -------- 1.1 格式化 messages --------
-        if system_msgs:
-            formatted_system_msgs = self.format_messages(
-                [system_msgs],
-                is_claude=self.is_claude,
-            )
-            formatted_messages = list(formatted_system_msgs)
-            formatted_messages.extend(
-                self.format_messages(messages, is_claude=self.is_claude)
-            )
-        else:
-            formatted_messages = self.format_messages(
-                messages,
-                is_claude=self.is_claude,
-            )
-        # -------- 1.2 截断输入 --------
-        if self.params.max_tokens is not None:
-            formatted_messages = self.truncate_message(
-                context=context,
-                messages=formatted_messages,
-                max_input_tokens=self.params.max_tokens,
-            )
+        with Tracer.span("llm.prepare_messages", messages=len(messages)) as span:
+            # -------- 1.1 格式化 messages --------
+            session = context.session if context else None
+            if system_msgs:
+                formatted_system_msgs = self.format_messages(
+                    [system_msgs],
+                    is_claude=self.is_claude,
+                )
+                formatted_messages = list(formatted_system_msgs)
+                formatted_messages.extend(
+                    self.format_messages(messages, is_claude=self.is_claude, session=session)
+                )
+            else:
+                formatted_messages = self.format_messages(
+                    messages,
+                    is_claude=self.is_claude,
+                    session=session,
+                )
+            # -------- 1.2 截断输入 --------
+            if self.params.max_tokens is not None:
+                system_count = len(formatted_messages) - len(messages)
+                untruncated = formatted_messages
+                formatted_messages = self.truncate_message(
+                    context=context,
+                    messages=formatted_messages,
+                    max_input_tokens=self.params.max_tokens,
+                )
+                # 被截断丢弃的前导消息回报给 Memory（见 Memory.context_messages），之后可以落盘
+                drop_leading = getattr(messages, "drop_leading", None)
+                if drop_leading is not None:
+                    drop_leading(self._dropped_count(untruncated, formatted_messages, system_count))
+            span.set("formatted", len(formatted_messages))
 
         return formatted_messages
 
+    # =============================
+    # 请求级预算
+    # =============================
+    def _check_budget(self, context: AgentContext) -> None:
+        """
+        调用 LLM 前检查取消信号与预算，
+        已取消抛出 AgentCancelledError，预算耗尽抛出 BudgetExceededError
+        """
+        if context and context.cancel_token is not None:
+            context.cancel_token.raise_if_cancelled()
+        budget = context.budget if context else None
+        if budget is not None:
+            budget.check()
+
+    def _record_tokens(self, context: AgentContext, tokens: Optional[int]) -> None:
+        budget = context.budget if context else None
+        if budget is not None:
+            budget.record_tokens(tokens)
+
+    def _estimate_stream_tokens(
+        self,
+        context: AgentContext,
+        formatted_messages: List[Dict[str, Any]],
+        output: str,
+    ) -> Optional[int]:
+        """
+        流式响应不返回 usage，仅在设置了 token / 成本上限时按 tiktoken 估算
+        """
+        budget = context.budget if context else None
+        if budget is None or (not budget.max_total_tokens and not budget.max_cost):
+            return None
+        token_ledger = context.session.token_ledger if context.session else None
+        tokens = sum(self.count_message_tokens(m, token_ledger) for m in formatted_messages)
+        return tokens + self.count_message_tokens({"content": output})
+
     #function_call-param
     def add_function_name_param(
         self,
@@ -305,13 +397,19 @@ class LLMClient:
         system_msgs: Optional[List[Message]] = None,
     ) -> str:
         try:
+            self._check_budget(context)
             formatted_messages = self._prepare_messages(
                 context, messages, system_msgs
             )
 
             params = {"messages": formatted_messages, "stream": False}
 
-            response = await self.call_openai(params)
+            with Tracer.span("llm.call", model=self.params.model_name, stream=False) as span:
+                response = await self.call_openai(params)
+                if response is not None and response.usage:
+                    span.set("tokens", response.usage.total_tokens)
+            if response is not None and response.usage:
+                self._record_tokens(context, response.usage.total_tokens)
 
             if (
                 not response
@@ -333,19 +431,111 @@ class LLMClient:
         system_msgs: Optional[List[Message]] = None,
     ):
         try:
+            self._check_budget(context)
             formatted_messages = self._prepare_messages(
                 context, messages, system_msgs
             )
 
             params = {"messages": formatted_messages, "stream": True}
 
-            async for chunk in self.call_openai_stream(params):
-                yield chunk
+            output: List[str] = []
+            # 脱敏只保留可能跨 chunk 的尾部，其余内容立即下发；规则为内置规则 + genie_config.sensitive_patterns
+            redactor = RedactionEngine.default().stream() if self.params.stream_redaction else None
+            # 跨 yield 的区间不进入上下文，避免 span 泄漏给调用方
+            span = Tracer.start("llm.call", model=self.params.model_name, stream=True)
+            try:
+                # 调用方提前结束迭代时同步关闭上游流
+                async with contextlib.aclosing(self.call_openai_stream(params)) as stream:
+                    async for chunk in stream:
+                        if not output:
+                            span.set("ttft_ms", round(span.elapsed_ms(), 1))
+                        output.append(chunk)
+                        if redactor is not None:
+                            chunk = redactor.feed(chunk)
+                            if not chunk:
+                                continue
+                        yield chunk
+                if redactor is not None:
+                    tail = redactor.close()
+                    if tail:
+                        yield tail
+                tokens = self._estimate_stream_tokens(context, formatted_messages, "".join(output))
+                span.set("chunks", len(output))
+                span.set("tokens", tokens)
+                self._record_tokens(context, tokens)
+            finally:
+                span.finish()
 
         except Exception:
             logger.exception("%s ask_llm_stream failed", context.request_id)
             raise
 
+    # =============================
+    # 工具 schema 编译
+    # =============================
+    def compile_struct_parse_prompt(self, tools: ToolCollection) -> str:
+        """
+        struct_parse：工具定义以文本形式拼入 system prompt
+        """
+        string_builder: list[str] = [STRUCT_PARSE_TOOL_SYSTEM_PROMPT]
+        # ---------- base tool ----------
+        for tool in tools.tool_map.values():
+            function_map = {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": self.add_function_name_param(
+                    tool.to_params(),
+                    tool.name,
+                ),
+            }
+            string_builder.append(
+                f"- `{tool.name}`\n```json {json.dumps(function_map, ensure_ascii=False)} ```\n"
+            )
+
+        # ---------- mcp tool ----------
+        for tool in tools.mcp_tool_map.values():
+            parameters = json.loads(tool.parameters)
+            function_map = {
+                "name": tool.name,
+                "description": tool.desc,
+                "parameters": self.add_function_name_param(
+                    parameters,
+                    tool.name,
+                ),
+            }
+            string_builder.append(
+                f"- `{tool.name}`\n```json {json.dumps(function_map, ensure_ascii=False)} ```\n"
+            )
+        return "\n".join(string_builder)
+
+    def compile_function_tools(self, tools: ToolCollection) -> List[Dict[str, Any]]:
+        """
+        function_call：OpenAI tools 参数
+        """
+        formatted_tools: List[Dict[str, Any]] = []
+        # ========= base tool =========
+        for tool in tools.tool_map.values():
+            formatted_tools.append({
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.to_params(),  # 注意：没有 add_function_name_param
+                },
+            })
+
+        # ========= mcp tool =========
+        for tool in tools.mcp_tool_map.values():
+            formatted_tools.append({
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.desc,
+                    "parameters": json.loads(tool.parameters),
+                },
+            })
+        return formatted_tools
+
     async def ask_tool(
         self,
         context: AgentContext,
@@ -359,96 +549,46 @@ class LLMClient:
             # ===== 1. ToolChoice 校验=====
             if not ToolChoice.is_valid(tool_choice):
                 raise ValueError(f"Invalid tool_choice: {tool_choice}")
+            self._check_budget(context)
             start_time = time.time()
-            # ===== 2. 构造 OpenAI tools（对齐 function_call 分支） =====
+            # ===== 2. 构造 OpenAI tools（按工具集版本缓存，同一工具集只编译一次） =====
             formatted_tools: list[dict] = []
-            string_builder: list[str] = []
             if function_call_type is FunctionCallType.STRUCT_PARSE:
                 # ===== struct_parse 分支 =====
-                string_builder.append(STRUCT_PARSE_TOOL_SYSTEM_PROMPT)
-                # ---------- base tool ----------
-                for tool in tools.tool_map.values():
-                    function_map = {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": self.add_function_name_param(
-                            tool.to_params(),
-                            tool.name,
-                        ),
-                    }
-                    string_builder.append(
-                        f"- `{tool.name}`\n```json {json.dumps(function_map, ensure_ascii=False)} ```\n"
-                    )
-
-                # ---------- mcp tool ----------
-                for tool in tools.mcp_tool_map.values():
-                    parameters = json.loads(tool.parameters)
-                    function_map = {
-                        "name": tool.name,
-                        "description": tool.desc,
-                        "parameters": self.add_function_name_param(
-                            parameters,
-                            tool.name,
-                        ),
-                    }
-                    string_builder.append(
-                        f"- `{tool.name}`\n```json {json.dumps(function_map, ensure_ascii=False)} ```\n"
-                    )
-                struct_prompt = "\n".join(string_builder)
+                struct_prompt = tools.get_compiled(
+                    FunctionCallType.STRUCT_PARSE.value,
+                    lambda: self.compile_struct_parse_prompt(tools),
+                )
                 system_msgs.content = (
                     (system_msgs.content or "")
                     + "\n"
                     + struct_prompt
                 )
             else:
-                # ========= base tool =========
-                for tool in tools.tool_map.values():
-                    function_map = {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.to_params(),  # 注意：没有 add_function_name_param
-                    }
-
-                    tool_map = {
-                        "type": "function",
-                        "function": function_map,
-                    }
-
-                    formatted_tools.append(tool_map)
-
-                # ========= mcp tool =========
-                for tool in tools.mcp_tool_map.values():
-                    parameters = json.loads(tool.parameters)
-
-                    function_map = {
-                        "name": tool.name,
-                        "description": tool.desc,
-                        "parameters": parameters,
-                    }
-
-                    tool_map = {
-                        "type": "function",
-                        "function": function_map,
-                    }
+                formatted_tools = tools.get_compiled(
+                    FunctionCallType.FUNCTION_CALL.value,
+                    lambda: self.compile_function_tools(tools),
+                )
 
-                    formatted_tools.append(tool_map)
-            
             # ===== 3. 格式化消息 =====
             formatted_messages = self._prepare_messages(
                 context, messages, system_msgs
             )
 
             # ===== 4. 调用 OpenAI =====
-            response =  await asyncio.wait_for(self.client.chat.completions.create(
-                model=self.params.model_name,
-                messages=formatted_messages,
-                tools=formatted_tools,
-                tool_choice=self.to_openai_tool_choice(tool_choice),   
-                temperature=self.params.temperature,
-                max_tokens=self.params.max_tokens,
-                ),
-                timeout=240,
-            )
+            with Tracer.span("llm.call", model=self.params.model_name, stream=False, tools=len(formatted_tools)) as span:
+                response =  await asyncio.wait_for(self.client.chat.completions.create(
+                    model=self.params.model_name,
+                    messages=formatted_messages,
+                    tools=formatted_tools,
+                    tool_choice=self.to_openai_tool_choice(tool_choice),   
+                    temperature=self.params.temperature,
+                    max_tokens=self.params.max_tokens,
+                    ),
+                    timeout=240,
+                )
+                if response.usage:
+                    span.set("tokens", response.usage.total_tokens)
 
             # ===== 5. 解析响应 =====
             if not response.choices or response.choices[0].message is None:
@@ -498,6 +638,7 @@ class LLMClient:
             finish_reason = choice.finish_reason
             # ===== usage =====
             total_tokens = response.usage.total_tokens if response.usage else None
+            self._record_tokens(context, total_tokens)
             # ===== duration =====
             duration_ms = int((time.time() - start_time) * 1000)
             return ToolCallResponse(
@@ -569,11 +710,17 @@ class LLMClient:
             stream=params["stream"],
         ),timeout=240)
 
-        async for event in response:
-            choice = event.choices[0]
-            delta = choice.delta
-
-            if delta and delta.content:
-                yield delta.content
+        try:
+            async for event in response:
+                if not event.choices:
+                    continue
+                choice = event.choices[0]
+                delta = choice.delta
+
+                if delta and delta.content:
+                    yield delta.content
+        finally:
+            # 取消 / 提前退出时立即关闭上游连接，不再消耗 token
+            await response.close()
 
 
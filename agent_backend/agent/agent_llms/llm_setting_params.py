@@ -18,5 +18,7 @@ class LLMParams(BaseModel):
         default=1, description="生成多个候选回复(默认 1,增加会提高成本)")
     stream: Optional[bool] = Field(
         default=False, description="是否流式传输结果（实时逐字返回，适用于聊天界面)")
+    stream_redaction: Optional[bool] = Field(
+        default=True, description="流式输出是否脱敏（跨 chunk 的手机号 / 身份证同样命中）")
     is_claude:Optional[bool] = Field(
         default=False, description="claude和openai在tool_call方面存在一定差异")
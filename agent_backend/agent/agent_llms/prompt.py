@@ -36,6 +36,9 @@ STRUCT_PARSE_TOOL_SYSTEM_PROMPT = """
       有如下工具名和工具入参的介绍如下：
 """
 
-SENSITIVE_PATTERNS = {
-    "id_card": r"\b\d{17}[\dXx]\b",
-}
\ No newline at end of file
+# 预算即将耗尽时的收尾 Prompt：不再调用工具，直接基于已有信息给出结论
+BUDGET_SUMMARY_PROMPT = (
+    "当前任务的资源预算即将耗尽，请不要再调用任何工具，"
+    "直接基于以上已获得的信息，给出对用户问题尽可能完整的最终回答；"
+    "对于尚未完成的部分，请明确说明。"
+)
@@ -0,0 +1,53 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+# {{name}} 形式的占位符
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    预编译的 Prompt 模板
+    构建时把文本切分为字面量 / 占位符片段，渲染时一次拼接，
+    替代逐个占位符的 str.replace 链；未提供值的占位符原样保留
+    parts: 偶数下标为字面量，奇数下标为占位符名
+    """
+    source: str
+    parts: Tuple[str, ...]
+
+    @classmethod
+    def compile(cls, source: str) -> "PromptTemplate":
+        return cls(source=source, parts=tuple(PLACEHOLDER_PATTERN.split(source or "")))
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        return self.parts[1::2]
+
+    def render(self, **values: str) -> str:
+        if len(self.parts) == 1:
+            return self.parts[0]
+        out = []
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                out.append(part)
+            else:
+                value = values.get(part)
+                out.append("{{" + part + "}}" if value is None else str(value))
+        return "".join(out)
+
+    def partial(self, **values: str) -> "PromptTemplate":
+        """
+        提前填充静态占位符（配置项等），返回新的模板
+        """
+        return PromptTemplate.compile(self.render(**values))
+
+
+@lru_cache(maxsize=256)
+def compile_prompt(source: str) -> PromptTemplate:
+    """
+    按文本缓存编译结果，同一份配置 prompt 只编译一次
+    """
+    return PromptTemplate.compile(source)
@@ -1,24 +1,259 @@
-from typing import List, Optional
-from enum import Enum
-from agent_backend.agent.agent_enums.agent_type import RoleType
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from agent_backend.agent.agent_enums.agent_type import MessageKind, RoleType
 from agent_backend.agent.agent_schema.message import Message
+from agent_backend.agent.agent_schema.memory_spill import (
+    MessageSpillStore,
+    SpillSegment,
+    SpilledMessage,
+    message_payload_size,
+)
+
+# 旧版本通过内容前缀识别的 planning / reflection 消息
+NEXT_STEP_PROMPT_PREFIX = "根据当前状态和可用工具，确定下一步行动"
+
+
+class MemorySnapshot(Sequence):
+    """
+    Memory 的只读视图
+    messages 列表只追加、整体替换，不原地修改（冷消息落盘也是复制后整体替换），
+    因此记录 (list, start, end) 即可得到稳定快照，创建开销 O(1)、无拷贝
+    """
+    __slots__ = ("_messages", "_start", "_end", "_memory", "_generation")
+
+    def __init__(
+        self,
+        messages: List[Message],
+        start: int,
+        end: int,
+        memory: Optional["Memory"] = None,
+    ):
+        self._messages = messages
+        self._start = start
+        self._end = end
+        # 来源 Memory（仅 context_messages 设置），用于回报 LLM 截断
+        self._memory = memory
+        self._generation = memory.generation if memory is not None else 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._messages[i] for i in range(self._start, self._end)[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("memory snapshot index out of range")
+        return self._messages[self._start + index]
+
+    def __iter__(self) -> Iterator[Message]:
+        for i in range(self._start, self._end):
+            yield self._messages[i]
+
+    def to_list(self) -> List[Message]:
+        return self._messages[self._start:self._end]
+
+    def drop_leading(self, count: int) -> None:
+        """
+        LLM 截断丢弃了视图中的前 count 条：通知 Memory 这些消息已移出上下文
+        """
+        memory = self._memory
+        if memory is not None and count > 0 and memory.generation == self._generation:
+            memory.mark_out_of_context(self._start + count)
 
 
 class Memory:
     """
     记忆类 - 管理代理的消息历史
+    在消息列表之上维护 role / kind / step 索引与格式化缓存，
+    常用查询（最后一条某角色消息、某 step 之后的消息、最近 N 条）均为 O(1) 或 O(log n)
+
+    配置了 MessageSpillStore 时，已被 LLM 截断移出上下文、且不在最近 hot_window 条内的大消息落盘，
+    内存中只保留桩，读取 content / base64_image 时透明换入；
+    调用 LLM 时传入 context_messages()，移出上下文的消息不再格式化、也不从磁盘换入
     """
-    def __init__(self):
+    def __init__(self, spill_store: Optional[MessageSpillStore] = None):
         self.messages: List[Message] = []
+        self._spill_store = spill_store or MessageSpillStore.get_default()
+        # 落盘分段，随最后一个桩释放（见 SpillSegment）
+        self._segment: Optional[SpillSegment] = None
+        self._spill_seq = 0
+        # 消息被删除或整体替换的次数，见 generation
+        self._generation = 0
+        self._reset_index()
+
+    # ----------------------------
+    # 索引维护
+    # ----------------------------
+    def _reset_index(self) -> None:
+        self._role_index: Dict[RoleType, List[int]] = {}
+        self._kind_count: Dict[MessageKind, int] = {}
+        # step 标记与该 step 第一条消息的下标，step 单调递增
+        self._step_starts: List[int] = []
+        self._step_offsets: List[int] = []
+        self._current_step = 0
+        # (role, content, 格式化行)；已落盘的消息为 None
+        self._format_lines: List[Optional[Tuple[Optional[RoleType], Optional[str], str]]] = []
+        self._format_cache: Optional[str] = None
+        # 记录已建立索引的列表对象与长度，外部直接改 messages 时可感知并重建
+        self._indexed_list: List[Message] = self.messages
+        self._indexed_len = 0
+        # 该下标之前的消息都已检查过是否需要落盘
+        self._spill_cursor = 0
+        # 该下标之前的消息已被 LLM 截断移出上下文
+        self._context_start = 0
+
+    @staticmethod
+    def _classify(message: Message) -> MessageKind:
+        if message.kind is not None:
+            return message.kind
+        if message.role == RoleType.TOOL:
+            return MessageKind.TOOL_RESULT
+        if message.role == RoleType.ASSISTANT and message.tool_calls:
+            return MessageKind.TOOL_CALL
+        # 兼容未打标的历史消息，仅在写入时判断一次
+        if message.content is not None and message.content.startswith(NEXT_STEP_PROMPT_PREFIX):
+            return MessageKind.NEXT_STEP_PROMPT
+        return MessageKind.NORMAL
+
+    def _index_message(self, index: int, message: Message) -> None:
+        message.kind = self._classify(message)
+        self._role_index.setdefault(message.role, []).append(index)
+        self._kind_count[message.kind] = self._kind_count.get(message.kind, 0) + 1
+        # 已落盘的消息不缓存格式化结果，需要时再换入
+        self._format_lines.append(None if isinstance(message, SpilledMessage) else self._format_entry(message))
+
+    @staticmethod
+    def _format_line(message: Message) -> str:
+        return f"role:{message.role} content:{message.content}"
+
+    @classmethod
+    def _format_entry(cls, message: Message) -> Tuple[Optional[RoleType], Optional[str], str]:
+        return message.role, message.content, cls._format_line(message)
+
+    def _refresh_format_lines(self) -> bool:
+        """
+        消息写入后被原地修改（content / role 重新赋值）时重建对应行，返回是否有变化
+        只做引用比较，不重新格式化未变化的消息
+        """
+        changed = False
+        for i, entry in enumerate(self._format_lines):
+            if entry is None:
+                continue
+            message = self.messages[i]
+            if entry[0] is not message.role or entry[1] is not message.content:
+                self._format_lines[i] = self._format_entry(message)
+                changed = True
+        return changed
+
+    def _ensure_index(self) -> None:
+        if self._indexed_list is self.messages and self._indexed_len == len(self.messages):
+            return
+        # messages 被外部整体替换或原地修改，全量重建
+        self._generation += 1
+        current_step = self._current_step
+        self._reset_index()
+        for i, message in enumerate(self.messages):
+            self._index_message(i, message)
+        self._indexed_len = len(self.messages)
+        self._current_step = current_step
 
     # ----------------------------
     # 添加消息
     # ----------------------------
     def add_message(self, message: Message):
+        self._ensure_index()
         self.messages.append(message)
+        self._index_message(self._indexed_len, message)
+        self._indexed_len += 1
+        self._format_cache = None
+        self._spill_cold_messages()
 
     def add_messages(self, new_messages: List[Message]) -> None:
-        self.messages.extend(new_messages)
+        for message in new_messages:
+            self.add_message(message)
+
+    def mark_step(self, step: int) -> None:
+        """
+        标记新 step 开始，之后写入的消息归属该 step
+        """
+        self._ensure_index()
+        if self._step_starts and step <= self._step_starts[-1]:
+            return
+        self._step_starts.append(step)
+        self._step_offsets.append(len(self.messages))
+        self._current_step = step
+
+    # ----------------------------
+    # 冷消息落盘
+    # ----------------------------
+    def _spill_cold_messages(self) -> None:
+        store = self._spill_store
+        if store is None:
+            return
+        boundary = min(len(self.messages) - store.hot_window, self._context_start)
+        spilled: List[Tuple[int, SpilledMessage]] = []
+        while self._spill_cursor < boundary:
+            index = self._spill_cursor
+            self._spill_cursor += 1
+            message = self.messages[index]
+            if isinstance(message, SpilledMessage):
+                continue
+            if message_payload_size(message) < store.min_spill_bytes:
+                continue
+            if self._segment is None:
+                self._segment = SpillSegment(store)
+            self._spill_seq += 1
+            try:
+                spilled.append((index, SpilledMessage.spill(message, self._segment, self._spill_seq)))
+            except Exception:
+                # 落盘失败时保留原消息，不影响主流程
+                continue
+        if not spilled:
+            return
+        # 复制后整体替换，已发出的快照仍指向原消息
+        messages = list(self.messages)
+        for index, stub in spilled:
+            messages[index] = stub
+            self._format_lines[index] = None
+        self.messages = messages
+        self._indexed_list = messages
+        self._format_cache = None
+
+    def mark_out_of_context(self, end: int) -> None:
+        """
+        end 之前的消息已被 LLM 截断丢弃；截断保留的是后缀，历史只增不减，这些消息之后也不会再进入上下文
+        """
+        self._ensure_index()
+        end = min(end, len(self.messages))
+        if end <= self._context_start:
+            return
+        self._context_start = end
+        self._spill_cold_messages()
+
+    def context_messages(self) -> MemorySnapshot:
+        """
+        仍在 LLM 上下文中的消息（调用 LLM 时传入；LLMClient 截断后通过 drop_leading 回报）
+        """
+        self._ensure_index()
+        return MemorySnapshot(self.messages, self._context_start, len(self.messages), memory=self)
+
+    @property
+    def generation(self) -> int:
+        """
+        消息被删除或整体替换的次数；只追加（及冷消息落盘）时不变，
+        持久化方据此判断能否只写新增的消息
+        """
+        self._ensure_index()
+        return self._generation
+
+    def spilled_count(self) -> int:
+        return sum(
+            1
+            for message in self.messages
+            if isinstance(message, SpilledMessage) and message.is_spilled
+        )
 
     # ----------------------------
     # 读取消息
@@ -26,6 +261,40 @@ class Memory:
     def get_last_message(self):
         return self.messages[-1] if self.messages else None
 
+    def get_last_message_by_role(self, role: RoleType) -> Optional[Message]:
+        self._ensure_index()
+        positions = self._role_index.get(role)
+        return self.messages[positions[-1]] if positions else None
+
+    def get_last_user_message(self) -> Optional[Message]:
+        return self.get_last_message_by_role(RoleType.USER)
+
+    def get_messages_since_step(self, step: int) -> MemorySnapshot:
+        """
+        返回 step（含）之后写入的消息；step 早于首个标记时返回全部
+        """
+        self._ensure_index()
+        if not self._step_starts or step < self._step_starts[0]:
+            start = 0
+        else:
+            pos = bisect_left(self._step_starts, step)
+            start = self._step_offsets[pos] if pos < len(self._step_offsets) else len(self.messages)
+        return MemorySnapshot(self.messages, start, len(self.messages))
+
+    def get_window(self, size: int) -> MemorySnapshot:
+        """
+        最近 size 条消息的只读视图
+        """
+        end = len(self.messages)
+        return MemorySnapshot(self.messages, max(0, end - size), end)
+
+    def snapshot(self) -> MemorySnapshot:
+        return MemorySnapshot(self.messages, 0, len(self.messages))
+
+    def count_by_kind(self, kind: MessageKind) -> int:
+        self._ensure_index()
+        return self._kind_count.get(kind, 0)
+
     def get(self, index: int):
         return self.messages[index]
 
@@ -35,11 +304,22 @@ class Memory:
     def is_empty(self):
         return not self.messages
 
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self.messages)
+
     # ----------------------------
     # 清理逻辑
     # ----------------------------
     def clear(self) -> None:
-        self.messages.clear()
+        # 整体替换而非原地 clear，保证已发出的快照不受影响
+        self.messages = []
+        self._generation += 1
+        self._reset_index()
+        # 磁盘数据在仍被快照引用的桩释放后删除
+        self._segment = None
 
     def clear_tool_context(self):
         """
@@ -48,27 +328,38 @@ class Memory:
         2. ASSISTANT 且包含 tool_calls 的消息
         3. 特定前缀的 planning / reflection 消息
         """
-        filtered_messages = []
-        for message in self.messages:
-            # 1. 移除 TOOL 消息
-            if message.role == RoleType.TOOL:
-                continue
-            # 2. 移除带 tool_calls 的 ASSISTANT 消息
-            if (
-                message.role == RoleType.ASSISTANT
-                and message.tool_calls
-            ):
-                continue
-            # 3. 移除特定 planning 文本
-            if (
-                message.content is not None
-                and message.content.startswith("根据当前状态和可用工具，确定下一步行动")
-            ):
-                continue
+        self._ensure_index()
+        if (
+            self._kind_count.get(MessageKind.TOOL_RESULT, 0) == 0
+            and self._kind_count.get(MessageKind.TOOL_CALL, 0) == 0
+            and self._kind_count.get(MessageKind.NEXT_STEP_PROMPT, 0) == 0
+        ):
+            return
+
+        removed_kinds = (MessageKind.TOOL_RESULT, MessageKind.TOOL_CALL, MessageKind.NEXT_STEP_PROMPT)
+        kept: List[Tuple[int, Message]] = [
+            (i, message)
+            for i, message in enumerate(self.messages)
+            if message.kind not in removed_kinds
+        ]
 
-            filtered_messages.append(message)
+        # 旧下标 -> 新下标，用于平移 step 边界
+        step_starts, step_offsets = self._step_starts, self._step_offsets
+        current_step = self._current_step
+        context_start = self._context_start
+        old_positions = [i for i, _ in kept]
 
-        self.messages = filtered_messages
+        self.messages = [message for _, message in kept]
+        self._generation += 1
+        self._reset_index()
+        for i, message in enumerate(self.messages):
+            self._index_message(i, message)
+        self._indexed_len = len(self.messages)
+        self._step_starts = list(step_starts)
+        self._step_offsets = [bisect_left(old_positions, offset) for offset in step_offsets]
+        self._current_step = current_step
+        self._context_start = bisect_left(old_positions, context_start)
+        self._spill_cold_messages()
 
     # ----------------------------
     # 格式化输出
@@ -76,10 +367,19 @@ class Memory:
     def get_format_message(self) -> str:
         """
         返回格式化后的 message 字符串
+        每条消息只在写入（或被原地修改）后格式化一次，整体结果在消息变化前复用
         """
-        lines = []
-        for message in self.messages:
-            lines.append(
-                f"role:{message.role} content:{message.content}"
-            )
-        return "\n".join(lines)
+        self._ensure_index()
+        if self._refresh_format_lines():
+            self._format_cache = None
+        if self._format_cache is not None:
+            return self._format_cache
+        lines = [
+            entry[2] if entry is not None else self._format_line(self.messages[i])
+            for i, entry in enumerate(self._format_lines)
+        ]
+        result = "\n".join(lines)
+        # 存在落盘消息时不缓存整段结果，否则冷数据又会常驻内存
+        if all(entry is not None for entry in self._format_lines):
+            self._format_cache = result
+        return result
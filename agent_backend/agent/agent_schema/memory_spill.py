@@ -0,0 +1,211 @@
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import ClassVar, Optional, Tuple
+from agent_backend.agent.agent_schema.message import Message
+
+logger = logging.getLogger(__name__)
+
+# Message 是 slots dataclass，直接使用父类的 slot 描述符读写底层字段
+_CONTENT_SLOT = Message.__dict__["content"]
+_IMAGE_SLOT = Message.__dict__["base64_image"]
+
+
+class MessageSpillStore:
+    """
+    冷消息落盘存储（本地 SQLite segment）
+    每个 Memory 对应一个 segment，消息按 seq 存取；
+    带一个很小的 LRU 读缓存，避免同一条消息被连续读取时反复访问磁盘
+    """
+    _default: ClassVar[Optional["MessageSpillStore"]] = None
+    _default_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        db_path: str,
+        hot_window: int = 20,
+        min_spill_bytes: int = 2048,
+        cache_size: int = 32,
+    ):
+        self.db_path = db_path
+        # 保留在内存中的最近消息条数
+        self.hot_window = hot_window
+        # 小于该字节数的消息不落盘（落盘收益不抵开销）
+        self.min_spill_bytes = min_spill_bytes
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[Optional[str], Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_segment ("
+            " segment_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " content TEXT,"
+            " base64_image TEXT,"
+            " PRIMARY KEY (segment_id, seq))"
+        )
+
+    # =============================
+    # 全局默认实例（启动时按配置初始化）
+    # =============================
+    @classmethod
+    def init_default(cls, db_path: str, **kwargs) -> "MessageSpillStore":
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(db_path, **kwargs)
+        return cls._default
+
+    @classmethod
+    def get_default(cls) -> Optional["MessageSpillStore"]:
+        return cls._default
+
+    @classmethod
+    def from_config(cls, genie_config) -> Optional["MessageSpillStore"]:
+        """
+        memory_spill_db_path 为空时不开启落盘，消息全部常驻内存
+        """
+        if not genie_config.memory_spill_db_path:
+            return cls._default
+        return cls.init_default(
+            genie_config.memory_spill_db_path,
+            hot_window=genie_config.memory_hot_window,
+            min_spill_bytes=genie_config.memory_spill_min_bytes,
+        )
+
+    # =============================
+    # 读写
+    # =============================
+    def put(
+        self,
+        segment_id: str,
+        seq: int,
+        content: Optional[str],
+        base64_image: Optional[str],
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory_segment VALUES (?, ?, ?, ?)",
+                (segment_id, seq, content, base64_image),
+            )
+
+    def get(self, segment_id: str, seq: int) -> Tuple[Optional[str], Optional[str]]:
+        key = (segment_id, seq)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+            row = self._conn.execute(
+                "SELECT content, base64_image FROM memory_segment"
+                " WHERE segment_id = ? AND seq = ?",
+                key,
+            ).fetchone()
+            value = (row[0], row[1]) if row else (None, None)
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return value
+
+    def drop(self, segment_id: str) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM memory_segment WHERE segment_id = ?", (segment_id,)
+                )
+                for key in [k for k in self._cache if k[0] == segment_id]:
+                    del self._cache[key]
+        except Exception as e:
+            logger.error("drop memory segment %s failed", segment_id, exc_info=e)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SpillSegment:
+    """
+    一个 Memory 的落盘分段
+    Memory 与其中的每个桩都持有引用，最后一个引用释放时才删除磁盘数据，
+    Memory.clear() 之后仍被快照引用的桩可以继续换入
+    """
+    __slots__ = ("store", "segment_id", "__weakref__")
+
+    def __init__(self, store: MessageSpillStore):
+        self.store = store
+        self.segment_id = uuid.uuid4().hex
+        weakref.finalize(self, store.drop, self.segment_id)
+
+
+class SpilledMessage(Message):
+    """
+    已落盘消息的内存桩
+    只保留 role / tool_call_id / tool_calls / kind，
+    content 与 base64_image 在读取时透明地从 MessageSpillStore 换入，不回写内存
+    """
+    __slots__ = ("_segment", "_seq", "_loaded")
+
+    @classmethod
+    def spill(cls, message: Message, segment: SpillSegment, seq: int) -> "SpilledMessage":
+        segment.store.put(segment.segment_id, seq, message.content, message.base64_image)
+        stub = cls.__new__(cls)
+        stub.role = message.role
+        stub.tool_call_id = message.tool_call_id
+        stub.tool_calls = message.tool_calls
+        stub.kind = message.kind
+        _CONTENT_SLOT.__set__(stub, None)
+        _IMAGE_SLOT.__set__(stub, None)
+        stub._segment = segment
+        stub._seq = seq
+        # 被重新赋值后不再从磁盘读取
+        stub._loaded = False
+        return stub
+
+    def _page_in(self) -> Tuple[Optional[str], Optional[str]]:
+        return self._segment.store.get(self._segment.segment_id, self._seq)
+
+    @property
+    def content(self) -> Optional[str]:
+        if self._loaded:
+            return _CONTENT_SLOT.__get__(self, Message)
+        return self._page_in()[0]
+
+    @content.setter
+    def content(self, value: Optional[str]) -> None:
+        if not self._loaded:
+            _IMAGE_SLOT.__set__(self, self._page_in()[1])
+            self._loaded = True
+        _CONTENT_SLOT.__set__(self, value)
+
+    @property
+    def base64_image(self) -> Optional[str]:
+        if self._loaded:
+            return _IMAGE_SLOT.__get__(self, Message)
+        return self._page_in()[1]
+
+    @base64_image.setter
+    def base64_image(self, value: Optional[str]) -> None:
+        if not self._loaded:
+            _CONTENT_SLOT.__set__(self, self._page_in()[0])
+            self._loaded = True
+        _IMAGE_SLOT.__set__(self, value)
+
+    @property
+    def is_spilled(self) -> bool:
+        return not self._loaded
+
+
+def message_payload_size(message: Message) -> int:
+    """
+    估算消息正文占用（字符数近似字节数）
+    """
+    return len(message.content or "") + len(message.base64_image or "")
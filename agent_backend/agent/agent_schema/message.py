@@ -1,9 +1,9 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
-from agent_backend.agent.agent_enums.agent_type import RoleType
+from agent_backend.agent.agent_enums.agent_type import MessageKind, RoleType
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """
     消息类 - 表示代理系统中的各种消息
@@ -14,6 +14,7 @@ class Message:
     base64_image: Optional[str] = None       # 图片数据（base64 编码）
     tool_call_id: Optional[str] = None       # 工具调用 ID
     tool_calls: Optional[List[ToolCall]] = None  # 工具调用列表
+    kind: Optional[MessageKind] = None       # 消息类别，为空时由 Memory 写入时推断
 
     # =============================
     # 静态工厂方法（对齐 Java）
@@ -54,6 +55,7 @@ class Message:
             content=content,
             tool_call_id=tool_call_id,
             base64_image=base64_image,
+            kind=MessageKind.TOOL_RESULT,
         )
 
     @staticmethod
@@ -65,4 +67,35 @@ class Message:
             role=RoleType.ASSISTANT,
             content=content,
             tool_calls=tool_calls,
-        )
\ No newline at end of file
+            kind=MessageKind.TOOL_CALL,
+        )
+
+    # =============================
+    # 序列化（checkpoint / 持久化使用）
+    # =============================
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "role": self.role.value if self.role else None,
+            "content": self.content,
+            "base64_image": self.base64_image,
+            "tool_call_id": self.tool_call_id,
+            "tool_calls": [tc.to_dict() for tc in self.tool_calls]
+            if self.tool_calls is not None
+            else None,
+            "kind": self.kind.value if self.kind else None,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "Message":
+        tool_calls = data.get("tool_calls")
+        return Message(
+            role=RoleType.from_string(data["role"]) if data.get("role") else None,
+            content=data.get("content"),
+            base64_image=data.get("base64_image"),
+            tool_call_id=data.get("tool_call_id"),
+            tool_calls=[ToolCall.from_dict(tc) for tc in tool_calls]
+            if tool_calls is not None
+            else None,
+            kind=MessageKind(data["kind"]) if data.get("kind") else None,
+        )
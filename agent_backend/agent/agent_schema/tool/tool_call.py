@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -19,3 +19,29 @@ class ToolCall:
         """
         name: Optional[str] = None
         arguments: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "function": {
+                "name": self.function.name,
+                "arguments": self.function.arguments,
+            }
+            if self.function
+            else None,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "ToolCall":
+        function = data.get("function")
+        return ToolCall(
+            id=data.get("id"),
+            type=data.get("type"),
+            function=ToolCall.Function(
+                name=function.get("name"),
+                arguments=function.get("arguments"),
+            )
+            if function
+            else None,
+        )
@@ -0,0 +1,113 @@
+"""
+同一 MCP 服务的工具调用合并
+一个 step 中模型对同一服务发起的多个 tools/call（execute_tools 并发执行）在 window 秒内到达时，
+合并为一次 JSON-RPC 批量请求，响应按 JSON-RPC id 到达一条即分发回对应调用，不等待整批；
+批量请求失败（如超时）时只有尚未拿到响应的调用失败；
+熔断（guard）按实际发出的请求统计，一次批量请求只计一次；
+服务端拒绝批量请求时记住该服务不支持，之后改为并发调用（共享连接池上复用连接）
+"""
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from agent_backend.agent.agent_errors.agent_exception import McpError
+
+if TYPE_CHECKING:
+    from agent_backend.agent.agent_tools.mcp.mcp_client import McpSession
+logger = logging.getLogger(__name__)
+
+# 表示服务端不接受批量请求的 HTTP 状态码 / JSON-RPC 错误码（-32600 Invalid Request）
+BATCH_REJECTED_CODES = frozenset({400, 405, 413, 415, 422, -32600})
+
+_PendingCall = Tuple[str, Optional[Dict[str, Any]], asyncio.Future]
+_Guard = Callable[[Callable[[], Awaitable[Any]]], Awaitable[Any]]
+
+
+class McpBatcher:
+    def __init__(
+        self,
+        session: "McpSession",
+        window: float = 0.002,
+        max_batch: int = 32,
+        guard: Optional[_Guard] = None,
+    ):
+        """
+        guard: 包装每次实际请求（如按服务熔断），参数为发起请求的无参协程函数
+        """
+        self.session = session
+        self.window = window
+        self.max_batch = max_batch
+        self.guard: _Guard = guard or (lambda call: call())
+        # None: 尚未探测；False: 服务端不支持批量
+        self.supported: Optional[bool] = None
+        self._pending: List[_PendingCall] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, name: str, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((name, arguments, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush) if self.window > 0 else loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # 已取消的调用不再发送
+        batch = [call for call in batch if not call[2].done()]
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[_PendingCall]) -> None:
+        if len(batch) > 1 and self.supported is not False:
+            def _deliver(index: int, result: Any) -> None:
+                future = batch[index][2]
+                if future.done():
+                    return
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            calls = [(name, arguments) for name, arguments, _ in batch]
+            try:
+                await self.guard(lambda: self.session.call_tools(calls, _deliver))
+            except McpError as e:
+                if e.code not in BATCH_REJECTED_CODES:
+                    self._fail(batch, e)
+                    return
+                logger.info("mcp batch not supported by %s (%s), fall back to concurrent calls",
+                            self.session.server_url, e)
+                self.supported = False
+            except Exception as e:
+                self._fail(batch, e)
+                return
+            else:
+                self.supported = True
+                return
+            batch = [call for call in batch if not call[2].done()]
+        await asyncio.gather(*(self._call_one(*call) for call in batch))
+
+    async def _call_one(self, name: str, arguments: Optional[Dict[str, Any]], future: asyncio.Future) -> None:
+        try:
+            result = await self.guard(lambda: self.session.call_tool(name, arguments))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: List[_PendingCall], error: Exception) -> None:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
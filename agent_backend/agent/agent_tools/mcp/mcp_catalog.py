@@ -0,0 +1,195 @@
+"""
+MCP 工具目录
+- 启动时并发发现全部 MCP 服务，最多等待 discovery_timeout 秒；慢服务在后台继续发现，不阻塞启动
+- 工具 schema 解析为 McpToolInfo 后常驻内存，请求直接从目录派生工具集，不再逐请求调用 list_tool
+- 后台按 TTL 条件刷新（ETag / 内容摘要未变化时不重建）；刷新失败保留上一次成功的工具列表，按指数退避重试
+- freshness() 暴露每个服务的工具数、数据年龄与最近错误
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from agent_backend.agent.agent_schema.tool.mcp_tool_info import McpToolInfo
+from agent_backend.agent.agent_tools.mcp.mcp_client import McpClient
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+
+logger = logging.getLogger(__name__)
+
+# 刷新失败后的最长重试间隔（秒）
+MAX_RETRY_DELAY = 60
+
+
+@dataclass
+class CatalogEntry:
+    server_url: str
+    tools: List[McpToolInfo] = field(default_factory=list)
+    etag: Optional[str] = None
+    fetched_at: Optional[float] = None  # 最近一次成功获取（monotonic）
+    checked_at: Optional[float] = None  # 最近一次尝试（monotonic）
+    error: Optional[str] = None
+    failures: int = 0
+
+    def next_check(self, ttl: float) -> float:
+        if self.checked_at is None:
+            return 0.0
+        if self.failures:
+            return self.checked_at + min(ttl, MAX_RETRY_DELAY, 2 ** (self.failures - 1))
+        return self.checked_at + ttl
+
+
+def _to_info(server_url: str, tool: Dict[str, Any]) -> McpToolInfo:
+    return McpToolInfo(
+        mcp_server_url=server_url,
+        name=tool.get("name"),
+        desc=tool.get("description") or "",
+        parameters=json.dumps(tool.get("inputSchema") or {}, ensure_ascii=False),
+    )
+
+
+class McpToolCatalog:
+    """
+    mcp_server_url_arr -> 工具目录
+    工具重名时以配置中靠后的服务为准（与逐个 add_mcp_tool 的覆盖顺序一致）
+    """
+
+    def __init__(self, server_urls: List[str], ttl: float = 300, discovery_timeout: float = 5):
+        self.ttl = ttl
+        self.discovery_timeout = discovery_timeout
+        self.entries: Dict[str, CatalogEntry] = {url: CatalogEntry(url) for url in server_urls}
+        # 任一服务的工具列表变化时递增
+        self.version = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        # base 工具集 -> (目录版本, 派生工具集)；原型重建后旧工具集随之释放
+        self._extended: "weakref.WeakKeyDictionary[ToolCollection, Tuple[int, ToolCollection]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @classmethod
+    def from_config(cls, genie_config) -> Optional["McpToolCatalog"]:
+        if not genie_config.mcp_server_url_arr:
+            return None
+        return cls(
+            genie_config.mcp_server_url_arr,
+            ttl=genie_config.mcp_catalog_ttl,
+            discovery_timeout=genie_config.mcp_discovery_timeout,
+        )
+
+    # =============================
+    # 生命周期
+    # =============================
+    async def start(self) -> None:
+        """
+        并发发现全部服务，最多等待 discovery_timeout 秒，随后启动后台刷新
+        """
+        tasks = [self._refresh_once(url) for url in self.entries]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.discovery_timeout)
+            if pending:
+                slow = [url for url, task in self._inflight.items() if task in pending]
+                logger.warning("mcp discovery still pending after %ss: %s", self.discovery_timeout, slow)
+        if self._refresher is None and self.entries:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        tasks = list(self._inflight.values())
+        if self._refresher is not None:
+            tasks.append(self._refresher)
+            self._refresher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # =============================
+    # 刷新
+    # =============================
+    def _refresh_once(self, server_url: str) -> asyncio.Task:
+        """
+        同一服务同时只有一个刷新在途
+        """
+        task = self._inflight.get(server_url)
+        if task is None:
+            task = asyncio.create_task(self.refresh(server_url))
+            self._inflight[server_url] = task
+            task.add_done_callback(lambda _, url=server_url: self._inflight.pop(url, None))
+        return task
+
+    async def refresh(self, server_url: str) -> bool:
+        """
+        :return: 工具列表是否变化
+        """
+        entry = self.entries[server_url]
+        try:
+            tools, etag = await McpClient.list_tools_if_changed(server_url, entry.etag)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            entry.checked_at = time.monotonic()
+            entry.failures += 1
+            entry.error = f"{type(e).__name__}: {e}"
+            logger.warning("mcp list tools failed (%s): %s", server_url, entry.error)
+            return False
+
+        now = time.monotonic()
+        entry.checked_at = entry.fetched_at = now
+        entry.failures = 0
+        entry.error = None
+        if tools is None:
+            return False
+        entry.tools = [_to_info(server_url, tool) for tool in tools if tool.get("name")]
+        entry.etag = etag
+        self.version += 1
+        logger.info("mcp catalog updated: %s tools=%s", server_url, len(entry.tools))
+        return True
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            idle = [entry for url, entry in self.entries.items() if url not in self._inflight]
+            due = [entry.server_url for entry in idle if entry.next_check(self.ttl) <= now]
+            if due:
+                await asyncio.gather(*(self._refresh_once(url) for url in due), return_exceptions=True)
+            elif idle:
+                await asyncio.sleep(min(entry.next_check(self.ttl) for entry in idle) - now)
+            else:
+                # 全部在途（如启动时的慢服务），等待任一完成
+                await asyncio.wait(list(self._inflight.values()), return_when=asyncio.FIRST_COMPLETED)
+
+    # =============================
+    # 查询
+    # =============================
+    def tools(self) -> List[McpToolInfo]:
+        merged: Dict[str, McpToolInfo] = {}
+        for entry in self.entries.values():
+            for info in entry.tools:
+                merged[info.name] = info
+        return list(merged.values())
+
+    def extend(self, base: ToolCollection) -> ToolCollection:
+        """
+        base 工具集 + 目录中的 MCP 工具；按目录版本缓存，调用方需 fork() 后使用
+        """
+        cached = self._extended.get(base)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        tools = base.fork()
+        for info in self.tools():
+            tools.add_mcp_tool(info.name, info.desc, info.parameters, info.mcp_server_url)
+        self._extended[base] = (self.version, tools)
+        return tools
+
+    def freshness(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            url: {
+                "tools": len(entry.tools),
+                "ageSeconds": None if entry.fetched_at is None else round(now - entry.fetched_at, 1),
+                "stale": entry.fetched_at is None or now - entry.fetched_at > self.ttl,
+                "refreshing": url in self._inflight,
+                "error": entry.error,
+            }
+            for url, entry in self.entries.items()
+        }
@@ -0,0 +1,531 @@
+"""
+异步 MCP 客户端
+- 进程内共享一个 httpx.AsyncClient：keep-alive 连接池，安装了 h2 时启用 HTTP/2 多路复用
+- 每个 host 的并发请求数受 per_host_limit 限制，单个慢服务不会占满整个连接池
+- 两种通道：
+  - 代理：经 mcp_client_url 的 /v1/tool/list、/v1/tool/call（与 McpTool 原有协议一致）
+  - 直连：按 MCP streamable HTTP 协议与 MCP 服务建立会话，initialize 一次后复用 Mcp-Session-Id，
+    响应可以是 application/json 或 text/event-stream
+- 直连会话按 server_url 缓存，跨调用、跨请求复用；会话过期（404）时重新初始化一次
+- 直连时同一服务在 batch_window 内的 tools/call 合并为一次 JSON-RPC 批量请求（见 McpBatcher），
+  各调用在自己的响应到达时即返回
+- 每个 server_url 独立熔断（见 CircuitBreakerRegistry），故障服务快速失败，不拖慢其它服务
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+import httpx
+from agent_backend.agent.agent_errors.agent_exception import McpError
+from agent_backend.agent.agent_tools.mcp.mcp_batch import McpBatcher
+from agent_backend.agent.agent_util.app_context import ApplicationContextHolder
+from agent_backend.agent.agent_util.circuit_breaker import CircuitBreakerRegistry
+from agent_backend.agent.agent_util.log_util import LogUtil
+
+if TYPE_CHECKING:
+    from agent_backend.agent.agent_core.cancel_token import CancelToken
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+PROTOCOL_VERSION = "2025-03-26"
+CLIENT_INFO = {"name": "genie-agent", "version": "1.0"}
+SESSION_HEADER = "Mcp-Session-Id"
+T = TypeVar("T")
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _parse_tool_list(text: str) -> List[Dict[str, Any]]:
+    """
+    代理 / 直连两种 tools 列表格式统一为 [{"name", "description", "inputSchema"}]
+    代理返回 {"code": 200, "data": [...] | "<json>" | {"tools": [...]}}
+    """
+    data: Any = json.loads(text) if text else []
+    if isinstance(data, dict) and "data" in data:
+        data = data["data"]
+    if isinstance(data, str):
+        data = json.loads(data)
+    if isinstance(data, dict):
+        data = data.get("tools", [])
+    if not isinstance(data, list):
+        raise McpError(f"unexpected tool list: {LogUtil.cap(text, 200)}")
+    return data
+
+
+def _result_text(result: Dict[str, Any]) -> str:
+    """
+    tools/call 结果：拼接文本内容，其它类型内容按 JSON 输出
+    """
+    parts = []
+    for item in result.get("content") or []:
+        if item.get("type") == "text":
+            parts.append(item.get("text", ""))
+        else:
+            parts.append(json.dumps(item, ensure_ascii=False))
+    if not parts and result.get("structuredContent") is not None:
+        parts.append(json.dumps(result["structuredContent"], ensure_ascii=False))
+    return "\n".join(parts)
+
+
+class McpSession:
+    """
+    与单个 MCP 服务的 streamable HTTP 会话
+    """
+
+    def __init__(self, server_url: str):
+        self.server_url = server_url
+        self.session_id: Optional[str] = None
+        self.initialized = False
+        self._init_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {
+            "Accept": "application/json, text/event-stream",
+            "Content-Type": "application/json",
+            "MCP-Protocol-Version": PROTOCOL_VERSION,
+        }
+        if self.session_id:
+            headers[SESSION_HEADER] = self.session_id
+        return headers
+
+    async def ensure_initialized(self) -> None:
+        if self.initialized:
+            return
+        async with self._init_lock:
+            if self.initialized:
+                return
+            self.session_id = None
+            await self._rpc("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": CLIENT_INFO,
+            })
+            self.initialized = True
+            await self._notify("notifications/initialized")
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._with_session(lambda: self._rpc(method, params))
+
+    async def _with_session(self, send: Callable[[], Awaitable[T]]) -> T:
+        await self.ensure_initialized()
+        try:
+            return await send()
+        except McpError as e:
+            if e.code != 404:
+                raise
+        # 会话已被服务端回收：重新初始化后重试一次
+        logger.info("mcp session expired, reinitialize: %s", self.server_url)
+        self.initialized = False
+        await self.ensure_initialized()
+        return await send()
+
+    async def list_tools(self) -> List[Dict[str, Any]]:
+        tools: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            result = await self.request("tools/list", {"cursor": cursor} if cursor else None)
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.request("tools/call", {"name": name, "arguments": arguments or {}})
+
+    async def call_tools(
+        self,
+        calls: List[Tuple[str, Optional[Dict[str, Any]]]],
+        on_result: Optional[Callable[[int, Any], None]] = None,
+    ) -> List[Any]:
+        """
+        JSON-RPC 批量 tools/call，一次往返；结果按 calls 顺序返回，单个调用失败时对应位置为 McpError
+        on_result(index, result) 在该调用的响应到达时立即回调（SSE 逐条到达），不等待整批
+        服务端拒绝批量请求时抛出 code 属于 BATCH_REJECTED_CODES 的 McpError
+        """
+        async def _send() -> List[Any]:
+            ids = [next(self._ids) for _ in calls]
+            body = [
+                self._body(request_id, "tools/call", {"name": name, "arguments": arguments or {}})
+                for request_id, (name, arguments) in zip(ids, calls)
+            ]
+            index_of = {request_id: index for index, request_id in enumerate(ids)}
+            results: List[Any] = [None] * len(ids)
+
+            def _on_message(message: Dict[str, Any]) -> None:
+                index = index_of[message["id"]]
+                try:
+                    results[index] = self._result(message)
+                except McpError as e:
+                    results[index] = e
+                if on_result is not None:
+                    on_result(index, results[index])
+
+            await self._post(body, "tools/call batch", ids, _on_message)
+            return results
+
+        return await self._with_session(_send)
+
+    async def close(self) -> None:
+        if not self.session_id:
+            return
+        try:
+            await McpClient.get_client().delete(self.server_url, headers=self._headers())
+        except httpx.HTTPError as e:
+            logger.debug("mcp session close error: %s", e)
+        self.session_id = None
+        self.initialized = False
+
+    # =============================
+    # JSON-RPC
+    # =============================
+    async def _notify(self, method: str) -> None:
+        body = {"jsonrpc": "2.0", "method": method}
+        async with McpClient.host_slot(self.server_url):
+            response = await McpClient.get_client().post(self.server_url, json=body, headers=self._headers())
+        if response.status_code >= 400:
+            raise McpError(f"{method} failed: HTTP {response.status_code}", response.status_code)
+
+    @staticmethod
+    def _body(request_id: int, method: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            body["params"] = params
+        return body
+
+    @staticmethod
+    def _result(message: Dict[str, Any]) -> Dict[str, Any]:
+        error = message.get("error")
+        if error:
+            raise McpError(error.get("message", "unknown error"), error.get("code"))
+        return message.get("result") or {}
+
+    async def _rpc(self, method: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        request_id = next(self._ids)
+        messages = await self._post(self._body(request_id, method, params), method, [request_id])
+        return self._result(messages[request_id])
+
+    async def _post(
+        self,
+        body: Any,
+        label: str,
+        ids: List[int],
+        on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        client = McpClient.get_client()
+        async with McpClient.host_slot(self.server_url):
+            async with client.stream("POST", self.server_url, json=body, headers=self._headers()) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise McpError(
+                        f"{label} failed: HTTP {response.status_code} {LogUtil.cap(response.text, 200)}",
+                        response.status_code,
+                    )
+                session_id = response.headers.get(SESSION_HEADER)
+                if session_id:
+                    self.session_id = session_id
+                return await self._read_messages(response, ids, on_message)
+
+    @staticmethod
+    async def _read_messages(
+        response: httpx.Response,
+        ids: List[int],
+        on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        按 id 收集响应消息：JSON 响应直接解析（单条或批量数组）；
+        SSE 响应读齐全部 id 即返回，不等待服务端关闭流；每条消息到达时回调 on_message
+        """
+        pending = set(ids)
+        found: Dict[int, Dict[str, Any]] = {}
+
+        def _collect(payload: Any) -> None:
+            for message in payload if isinstance(payload, list) else [payload]:
+                if not isinstance(message, dict):
+                    continue
+                if message.get("id") in pending:
+                    pending.discard(message["id"])
+                    found[message["id"]] = message
+                    if on_message is not None:
+                        on_message(message)
+                elif message.get("id") is None and message.get("error"):
+                    # 无 id 的错误：整个请求被拒绝（如不支持批量）
+                    error = message["error"]
+                    raise McpError(error.get("message", "invalid request"), error.get("code"))
+
+        if not response.headers.get("content-type", "").startswith("text/event-stream"):
+            await response.aread()
+            _collect(response.json())
+        else:
+            data: List[str] = []
+            async for line in response.aiter_lines():
+                if line.startswith("data"):
+                    data.append(line.partition(":")[2].strip())
+                    continue
+                if line or not data:
+                    continue
+                _collect(json.loads("\n".join(data)))
+                data = []
+                if not pending:
+                    break
+            if data and pending:
+                _collect(json.loads("\n".join(data)))
+        if pending:
+            raise McpError(f"no response for request {sorted(pending)}")
+        return found
+
+
+class McpClient:
+    """
+    进程级 MCP 客户端（类级单例）
+    """
+
+    proxy_url: str = ""
+    direct: bool = False
+    timeout: float = 30
+    max_connections: int = 100
+    per_host_limit: int = 32
+    # None 表示不合并
+    batch_window: Optional[float] = 0.002
+
+    _client: Optional[httpx.AsyncClient] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _transport: Optional[httpx.AsyncBaseTransport] = None
+    _sessions: Dict[str, McpSession] = {}
+    _batchers: Dict[str, McpBatcher] = {}
+    _host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def __init__(self):
+        raise RuntimeError("McpClient cannot be instantiated")
+
+    @classmethod
+    def configure(
+        cls,
+        proxy_url: str = "",
+        direct: bool = False,
+        timeout: float = 30,
+        max_connections: int = 100,
+        per_host_limit: int = 32,
+        batch_window: Optional[float] = 0.002,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        """
+        transport 仅用于测试注入
+        """
+        cls.proxy_url = proxy_url
+        cls.direct = direct
+        cls.timeout = timeout
+        cls.max_connections = max_connections
+        cls.per_host_limit = per_host_limit
+        cls.batch_window = batch_window
+        cls._transport = transport
+        cls._reset()
+
+    @classmethod
+    def from_config(cls, genie_config) -> None:
+        cls.configure(
+            proxy_url=genie_config.mcp_client_url,
+            direct=genie_config.mcp_direct,
+            timeout=genie_config.mcp_timeout,
+            max_connections=genie_config.mcp_max_connections,
+            per_host_limit=genie_config.mcp_per_host_limit,
+            batch_window=genie_config.mcp_batch_window_ms / 1000 if genie_config.mcp_batch_enable else None,
+        )
+
+    @classmethod
+    def _reset(cls) -> None:
+        cls._client = None
+        cls._loop = None
+        cls._sessions = {}
+        cls._batchers = {}
+        cls._host_slots = {}
+
+    # =============================
+    # 连接池
+    # =============================
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._loop is not loop:
+            # 连接绑定事件循环，换循环（如测试中多次 asyncio.run）时重建
+            cls._reset()
+            cls._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE and cls._transport is None,
+                timeout=httpx.Timeout(cls.timeout),
+                limits=httpx.Limits(
+                    max_connections=cls.max_connections,
+                    max_keepalive_connections=cls.max_connections,
+                    keepalive_expiry=60,
+                ),
+                transport=cls._transport,
+            )
+            cls._loop = loop
+        return cls._client
+
+    @classmethod
+    def host_slot(cls, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slot = cls._host_slots.get(host)
+        if slot is None:
+            slot = cls._host_slots[host] = asyncio.Semaphore(cls.per_host_limit)
+        return slot
+
+    @classmethod
+    def session(cls, server_url: str) -> McpSession:
+        cls.get_client()
+        session = cls._sessions.get(server_url)
+        if session is None:
+            session = cls._sessions[server_url] = McpSession(server_url)
+        return session
+
+    @classmethod
+    def batcher(cls, server_url: str) -> McpBatcher:
+        batcher = cls._batchers.get(server_url)
+        if batcher is None:
+            batcher = cls._batchers[server_url] = McpBatcher(
+                cls.session(server_url),
+                cls.batch_window,
+                guard=lambda call: cls._guarded(server_url, call),
+            )
+        return batcher
+
+    @classmethod
+    def _proxy(cls) -> str:
+        if cls.proxy_url:
+            return cls.proxy_url
+        if ApplicationContextHolder.contains("genie_config"):
+            return ApplicationContextHolder.get("genie_config").mcp_client_url
+        return ""
+
+    @classmethod
+    def is_direct(cls) -> bool:
+        return cls.direct or not cls._proxy()
+
+    # =============================
+    # 工具接口
+    # =============================
+    @classmethod
+    async def list_tools(cls, server_url: str) -> List[Dict[str, Any]]:
+        tools, _ = await cls.list_tools_if_changed(server_url)
+        return tools
+
+    @classmethod
+    async def list_tools_if_changed(
+        cls,
+        server_url: str,
+        etag: Optional[str] = None,
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """
+        条件获取工具列表：未变化时返回 (None, etag)
+        代理通道使用 If-None-Match / ETag（代理不支持时退化为内容摘要）；直连通道比较内容摘要
+        """
+        return await cls._guarded(server_url, lambda: cls._list_tools_if_changed(server_url, etag))
+
+    @classmethod
+    async def _list_tools_if_changed(
+        cls,
+        server_url: str,
+        etag: Optional[str],
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        if cls.is_direct():
+            tools = await cls.session(server_url).list_tools()
+            digest = _digest(json.dumps(tools, sort_keys=True, ensure_ascii=False))
+            return (None, etag) if digest == etag else (tools, digest)
+
+        headers = {"If-None-Match": etag} if etag else None
+        response = await cls._proxy_request("/v1/tool/list", {"server_url": server_url}, headers)
+        if response.status_code == 304:
+            return None, etag
+        new_etag = response.headers.get("etag") or _digest(response.text)
+        if new_etag == etag:
+            return None, etag
+        return _parse_tool_list(response.text), new_etag
+
+    @classmethod
+    async def call_tool(
+        cls,
+        server_url: str,
+        name: str,
+        arguments: Optional[Dict[str, Any]],
+        cancel_token: Optional["CancelToken"] = None,
+    ) -> str:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if cls.is_direct() and cls.batch_window is not None:
+            # 熔断由 McpBatcher 按实际请求统计：一次批量请求只计一次
+            return _result_text(await cls.batcher(server_url).submit(name, arguments))
+        return await cls._guarded(server_url, lambda: cls._call_tool(server_url, name, arguments))
+
+    @classmethod
+    async def _call_tool(cls, server_url: str, name: str, arguments: Optional[Dict[str, Any]]) -> str:
+        if cls.is_direct():
+            return _result_text(await cls.session(server_url).call_tool(name, arguments))
+        body = {"server_url": server_url, "name": name}
+        if arguments is not None:
+            body["arguments"] = arguments
+        return await cls._post_proxy("/v1/tool/call", body)
+
+    @classmethod
+    async def _guarded(cls, server_url: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        按 server_url 熔断（熔断中直接抛出 CircuitOpenError）
+        JSON-RPC 错误说明服务正常响应，不计入失败；网络错误转换为 McpError
+        """
+        rpc_error: Optional[McpError] = None
+        try:
+            with CircuitBreakerRegistry.get(server_url).track():
+                try:
+                    return await call()
+                except McpError as e:
+                    if e.code is None or e.code >= 0:
+                        raise
+                    rpc_error = e
+        except httpx.HTTPError as e:
+            raise McpError(f"{type(e).__name__}: {e}") from e
+        raise rpc_error
+
+    @classmethod
+    async def _post_proxy(cls, path: str, body: Dict[str, Any]) -> str:
+        response = await cls._proxy_request(path, body)
+        return response.text
+
+    @classmethod
+    async def _proxy_request(
+        cls,
+        path: str,
+        body: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        url = f"{cls._proxy()}{path}"
+        payload = json.dumps(body, ensure_ascii=False)
+        async with cls.host_slot(url):
+            response = await cls.get_client().post(
+                url, content=payload, headers={**(headers or {}), "Content-Type": "application/json"}
+            )
+        logger.info("mcp %s request: %s response: %s", path, LogUtil.payload(payload), LogUtil.payload(response.text))
+        if response.status_code >= 400:
+            raise McpError(f"{path} failed: HTTP {response.status_code}", response.status_code)
+        return response
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """
+        关闭直连会话与连接池（进程退出前调用）
+        """
+        client, sessions = cls._client, list(cls._sessions.values())
+        if client is None:
+            return
+        for session in sessions:
+            await session.close()
+        cls._reset()
+        await client.aclose()
@@ -1,10 +1,13 @@
 import json
 import logging
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError
 from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.mcp.mcp_client import McpClient
 from agent_backend.agent.agent_util.ok_http_util import OkHttpUtil
 from agent_backend.agent.agent_util.app_context import ApplicationContextHolder
+from agent_backend.agent.agent_util.log_util import LogUtil
 from agent_backend.agent_config.genie_config import GenieConfig
 if TYPE_CHECKING:
     from agent_backend.agent.agent_core.agent_context import AgentContext
@@ -97,22 +100,22 @@ class McpTool(BaseTool):
 
             response = OkHttpUtil.post_json(
                 url=mcp_client_url,
-                body=payload,
+                json_params=payload,
                 headers=None,
                 timeout=30,
             )
 
             logger.info(
                 "list tool request: %s response: %s",
-                payload,
-                response,
+                LogUtil.payload(payload),
+                LogUtil.payload(response),
             )
             return response
 
         except Exception as e:
             logger.error(
                 "%s list tool error",
-                self.agent_context.request_id,
+                self.agent_context.request_id if self.agent_context else None,
                 exc_info=e,
             )
             return ""
@@ -140,22 +143,60 @@ class McpTool(BaseTool):
 
             response = OkHttpUtil.post_json(
                 url=mcp_client_url,
-                body=payload,
+                json_params=payload,
                 headers=None,
                 timeout=30,
+                cancel_token=self.agent_context.cancel_token if self.agent_context else None,
             )
 
             logger.info(
                 "call tool request: %s response: %s",
-                payload,
-                response,
+                LogUtil.payload(payload),
+                LogUtil.payload(response),
             )
             return response
 
         except Exception as e:
             logger.error(
                 "%s call tool error",
-                self.agent_context.request_id,
+                self.agent_context.request_id if self.agent_context else None,
                 exc_info=e,
             )
-            return ""
\ No newline at end of file
+            return ""
+
+    # =============================
+    # 异步接口（共享连接池 / 直连会话，见 McpClient）
+    # =============================
+    async def list_tool_async(self, mcp_server_url: str) -> List[Dict[str, Any]]:
+        try:
+            return await McpClient.list_tools(mcp_server_url)
+        except Exception as e:
+            logger.error(
+                "%s list tool error",
+                self.agent_context.request_id if self.agent_context else None,
+                exc_info=e,
+            )
+            return []
+
+    async def call_tool_async(
+        self,
+        mcp_server_url: str,
+        tool_name: str,
+        input: Dict[str, Any],
+    ) -> str:
+        """
+        失败时抛出 McpError / CircuitOpenError，由调用方转换为模型可理解的错误结果
+        """
+        cancel_token = self.agent_context.cancel_token if self.agent_context else None
+        try:
+            return await McpClient.call_tool(mcp_server_url, tool_name, input, cancel_token)
+        except AgentCancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                "%s call tool %s error: %s",
+                self.agent_context.request_id if self.agent_context else None,
+                tool_name,
+                e,
+            )
+            raise
@@ -0,0 +1,386 @@
+"""
+工具参数 JSON Schema 校验
+schema 在工具集版本内只编译一次（见 ToolCollection.get_validator），编译结果是一组闭包，
+校验时不再解释 schema 字典，单次校验为微秒级
+
+支持：type（含类型列表）/ properties / required / additionalProperties / items / enum / const /
+minimum / maximum / exclusiveMinimum / exclusiveMaximum / minLength / maxLength / pattern /
+minItems / maxItems / anyOf / oneOf / allOf / nullable / 本地 $ref（#/definitions、#/$defs）
+
+模型常见的类型偏差按 schema 修正后再下发："5" -> 5、"true" -> True、3.0 -> 3、
+JSON 字符串形式的对象 / 数组 -> 解析后的值、数字 -> 字符串
+"""
+import json
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional
+from agent_backend.agent.agent_errors.agent_exception import ToolArgumentError
+
+# (值, 路径, 错误列表) -> 修正后的值
+Check = Callable[[Any, str, List[str]], Any]
+
+# 单次校验最多报告的错误数
+MAX_ERRORS = 10
+
+_INTEGER = re.compile(r"[-+]?\d+")
+_MISSING = object()
+
+
+def _describe(value: Any) -> str:
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    return text if len(text) <= 40 else text[:40] + "..."
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return type(value).__name__
+
+
+# =============================
+# 类型判断与修正
+# =============================
+def _is_type(value: Any, name: str) -> bool:
+    if name == "string":
+        return isinstance(value, str)
+    if name == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if name == "boolean":
+        return isinstance(value, bool)
+    if name == "object":
+        return isinstance(value, dict)
+    if name == "array":
+        return isinstance(value, list)
+    if name == "null":
+        return value is None
+    return True
+
+
+def _coerce(value: Any, name: str) -> Any:
+    """
+    按目标类型修正，无法修正时返回 _MISSING
+    """
+    if name == "integer":
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and _INTEGER.fullmatch(value.strip()):
+            return int(value)
+    elif name == "number":
+        if isinstance(value, str):
+            try:
+                number = float(value)
+            except ValueError:
+                return _MISSING
+            if math.isfinite(number):
+                return int(number) if _INTEGER.fullmatch(value.strip()) else number
+    elif name == "boolean":
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+    elif name == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+    elif name in ("object", "array"):
+        if isinstance(value, str) and value.strip()[:1] in ("{", "["):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                return _MISSING
+            if _is_type(parsed, name):
+                return parsed
+    return _MISSING
+
+
+class _Compiler:
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self._refs: Dict[str, Check] = {}
+
+    def compile(self, schema: Any) -> Check:
+        if not isinstance(schema, dict) or not schema:
+            # true / {} / 非法 schema：不做约束
+            return lambda value, path, errors: value
+        if "$ref" in schema:
+            return self._ref(schema["$ref"])
+
+        checks: List[Check] = []
+        types = schema.get("type")
+        if isinstance(types, str):
+            types = [types]
+        if types:
+            if schema.get("nullable") and "null" not in types:
+                types = list(types) + ["null"]
+            checks.append(self._type(types))
+        if "enum" in schema:
+            checks.append(self._enum(schema["enum"]))
+        if "const" in schema:
+            checks.append(self._enum([schema["const"]]))
+        if any(key in schema for key in ("properties", "required", "additionalProperties")):
+            checks.append(self._object(schema))
+        if "items" in schema or "minItems" in schema or "maxItems" in schema:
+            checks.append(self._array(schema))
+        if any(key in schema for key in ("minLength", "maxLength", "pattern")):
+            checks.append(self._string(schema))
+        if any(key in schema for key in ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum")):
+            checks.append(self._number(schema))
+        if isinstance(schema.get("anyOf"), list):
+            checks.append(self._any_of([self.compile(branch) for branch in schema["anyOf"]]))
+        if isinstance(schema.get("oneOf"), list):
+            checks.append(self._one_of([self.compile(branch) for branch in schema["oneOf"]]))
+        if isinstance(schema.get("allOf"), list):
+            checks.extend(self.compile(branch) for branch in schema["allOf"])
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def _all(value: Any, path: str, errors: List[str]) -> Any:
+            for check in checks:
+                before = len(errors)
+                value = check(value, path, errors)
+                if len(errors) > before:
+                    break
+            return value
+
+        return _all
+
+    # =============================
+    # 各关键字
+    # =============================
+    def _ref(self, ref: str) -> Check:
+        check = self._refs.get(ref)
+        if check is not None:
+            return check
+        target: Any = None
+        if ref.startswith("#/"):
+            target = self.root
+            for part in ref[2:].split("/"):
+                target = target.get(part.replace("~1", "/").replace("~0", "~")) if isinstance(target, dict) else None
+        compiled: List[Check] = []
+        # 先登记间接引用，递归 schema 不会无限展开
+        self._refs[ref] = lambda value, path, errors: compiled[0](value, path, errors)
+        compiled.append(self.compile(target))
+        return self._refs[ref]
+
+    @staticmethod
+    def _type(types: List[str]) -> Check:
+        expected = " or ".join(types)
+
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            for name in types:
+                if _is_type(value, name) and not (name == "number" and isinstance(value, float)
+                                                   and not math.isfinite(value)):
+                    return value
+            for name in types:
+                coerced = _coerce(value, name)
+                if coerced is not _MISSING:
+                    return coerced
+            errors.append(f"{path}: expected {expected}, got {_type_name(value)} {_describe(value)}")
+            return value
+
+        return _check
+
+    @staticmethod
+    def _enum(options: List[Any]) -> Check:
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            for option in options:
+                # 1 == True 在 Python 中成立，需同时比较类型
+                if value == option and isinstance(value, bool) == isinstance(option, bool):
+                    return value
+            allowed = ", ".join(_describe(option) for option in options[:10])
+            errors.append(f"{path}: {_describe(value)} is not one of [{allowed}]")
+            return value
+
+        return _check
+
+    def _object(self, schema: Dict[str, Any]) -> Check:
+        properties = {
+            name: self.compile(sub) for name, sub in (schema.get("properties") or {}).items()
+        }
+        required = [name for name in schema.get("required") or [] if isinstance(name, str)]
+        additional = schema.get("additionalProperties", True)
+        additional_check = self.compile(additional) if isinstance(additional, dict) else None
+
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            if not isinstance(value, dict):
+                return value
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property '{name}'")
+            result = value
+            for key, item in value.items():
+                check = properties.get(key)
+                if check is None:
+                    if additional is False:
+                        errors.append(f"{path}: unexpected property '{key}'")
+                        continue
+                    check = additional_check
+                    if check is None:
+                        continue
+                coerced = check(item, f"{path}.{key}", errors)
+                if coerced is not item:
+                    if result is value:
+                        result = dict(value)
+                    result[key] = coerced
+            return result
+
+        return _check
+
+    def _array(self, schema: Dict[str, Any]) -> Check:
+        items = schema.get("items")
+        item_check = self.compile(items) if isinstance(items, dict) else None
+        tuple_checks = [self.compile(sub) for sub in items] if isinstance(items, list) else None
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            if not isinstance(value, list):
+                return value
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: expected at least {min_items} items, got {len(value)}")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: expected at most {max_items} items, got {len(value)}")
+            result = value
+            for index, item in enumerate(value):
+                if tuple_checks is not None:
+                    if index >= len(tuple_checks):
+                        break
+                    check = tuple_checks[index]
+                else:
+                    check = item_check
+                    if check is None:
+                        break
+                coerced = check(item, f"{path}[{index}]", errors)
+                if coerced is not item:
+                    if result is value:
+                        result = list(value)
+                    result[index] = coerced
+            return result
+
+        return _check
+
+    @staticmethod
+    def _string(schema: Dict[str, Any]) -> Check:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if isinstance(schema.get("pattern"), str) else None
+
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            if not isinstance(value, str):
+                return value
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: expected at least {min_length} characters, got {len(value)}")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: expected at most {max_length} characters, got {len(value)}")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{path}: {_describe(value)} does not match pattern {pattern.pattern}")
+            return value
+
+        return _check
+
+    @staticmethod
+    def _number(schema: Dict[str, Any]) -> Check:
+        bounds = []
+        minimum, maximum = schema.get("minimum"), schema.get("maximum")
+        exclusive_min, exclusive_max = schema.get("exclusiveMinimum"), schema.get("exclusiveMaximum")
+        # draft-04：exclusiveMinimum / exclusiveMaximum 为布尔值，修饰 minimum / maximum
+        if exclusive_min is True:
+            exclusive_min, minimum = minimum, None
+        if exclusive_max is True:
+            exclusive_max, maximum = maximum, None
+        if isinstance(minimum, (int, float)):
+            bounds.append((lambda v, b=minimum: v >= b, f">= {minimum}"))
+        if isinstance(maximum, (int, float)):
+            bounds.append((lambda v, b=maximum: v <= b, f"<= {maximum}"))
+        if isinstance(exclusive_min, (int, float)) and not isinstance(exclusive_min, bool):
+            bounds.append((lambda v, b=exclusive_min: v > b, f"> {exclusive_min}"))
+        if isinstance(exclusive_max, (int, float)) and not isinstance(exclusive_max, bool):
+            bounds.append((lambda v, b=exclusive_max: v < b, f"< {exclusive_max}"))
+
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return value
+            for ok, text in bounds:
+                if not ok(value):
+                    errors.append(f"{path}: expected {text}, got {value}")
+            return value
+
+        return _check
+
+    @staticmethod
+    def _any_of(branches: List[Check]) -> Check:
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            reasons: List[str] = []
+            for branch in branches:
+                branch_errors: List[str] = []
+                coerced = branch(value, path, branch_errors)
+                if not branch_errors:
+                    return coerced
+                reasons.append(branch_errors[0])
+            errors.append(f"{path}: does not match any anyOf branch ({' | '.join(reasons[:3])})")
+            return value
+
+        return _check
+
+    @staticmethod
+    def _one_of(branches: List[Check]) -> Check:
+        """
+        oneOf：必须恰好匹配一个分支；原值直接匹配的分支优先，都不匹配时才考虑需要修正类型的分支
+        """
+        def _check(value: Any, path: str, errors: List[str]) -> Any:
+            exact: List[Any] = []
+            coerced_matches: List[Any] = []
+            reasons: List[str] = []
+            for branch in branches:
+                branch_errors: List[str] = []
+                coerced = branch(value, path, branch_errors)
+                if branch_errors:
+                    reasons.append(branch_errors[0])
+                elif coerced is value:
+                    exact.append(coerced)
+                else:
+                    coerced_matches.append(coerced)
+            matches = exact or coerced_matches
+            if len(matches) == 1:
+                return matches[0]
+            if matches:
+                errors.append(f"{path}: matches {len(matches)} oneOf branches, expected exactly one")
+            else:
+                errors.append(f"{path}: does not match any oneOf branch ({' | '.join(reasons[:3])})")
+            return value
+
+        return _check
+
+
+class SchemaValidator:
+    """
+    编译后的工具参数校验器
+    """
+    __slots__ = ("schema", "_check")
+
+    def __init__(self, schema: Optional[Dict[str, Any]]):
+        self.schema = schema or {}
+        self._check = _Compiler(self.schema).compile(self.schema)
+
+    def validate(self, arguments: Any) -> Any:
+        """
+        :return: 修正类型后的参数（无需修正时返回原对象）
+        :raises ToolArgumentError: 参数不符合 schema
+        """
+        errors: List[str] = []
+        value = self._check(arguments, "arguments", errors)
+        if errors:
+            raise ToolArgumentError(errors[:MAX_ERRORS])
+        return value
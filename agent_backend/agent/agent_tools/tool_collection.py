@@ -1,8 +1,12 @@
+import hashlib
+import inspect
+import json
 import logging
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
 from agent_backend.agent.agent_schema.tool.mcp_tool_info import McpToolInfo
 from agent_backend.agent.agent_tools.mcp.mcp_tool import McpTool
 from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.schema_validator import SchemaValidator
 logger = logging.getLogger(__name__)
 if TYPE_CHECKING:
     from agent_backend.agent.agent_core.agent_context import AgentContext
@@ -11,6 +15,9 @@ class ToolCollection:
     """
     工具集合类 - 管理可用的工具
     严格对齐 Java: ToolCollection
+
+    并发执行多个 task 时通过 fork() 得到任务级视图：
+    工具注册表（tool_map / mcp_tool_map）共享，数字员工等可变状态每个 task 独立
     """
 
     def __init__(self):
@@ -19,17 +26,54 @@ class ToolCollection:
         self.agent_context: Optional["AgentContext"] = None
 
         # ===== 数字员工相关 =====
-        # task 未并发的情况下：
-        # 每一个 task 执行时，数字员工列表会更新
-        # TODO: 并发情况下需要处理
+        # 每一个 task 执行时，数字员工列表会更新；并发 task 各自持有 fork() 出的视图
         self.current_task: Optional[str] = None
         self.digital_employees: Optional[Dict[str, Any]] = None
 
+        # 工具集版本（按工具名与描述计算），增删工具后失效
+        self._version: Optional[str] = None
+        # 注册表是否与其它视图共享（共享时写入前先复制）
+        self._shared_registry = False
+        # 按工具集版本缓存的编译产物（tool schema / 工具描述等），与注册表一同共享
+        self._compiled: Dict[Tuple[str, str], Any] = {}
+        self._mcp_tool: Optional[McpTool] = None
+
+    # =============================
+    # 任务级视图
+    # =============================
+    def fork(self) -> "ToolCollection":
+        """
+        返回共享工具注册表、独立数字员工状态的任务级视图
+        """
+        overlay = ToolCollection.__new__(ToolCollection)
+        overlay.tool_map = self.tool_map
+        overlay.mcp_tool_map = self.mcp_tool_map
+        overlay.agent_context = self.agent_context
+        overlay.current_task = None
+        overlay.digital_employees = None
+        overlay._version = self._version
+        overlay._shared_registry = True
+        overlay._compiled = self._compiled
+        overlay._mcp_tool = None
+        self._shared_registry = True
+        return overlay
+
+    def _own_registry(self) -> None:
+        # copy-on-write：共享的注册表不可原地修改
+        if self._shared_registry:
+            self.tool_map = dict(self.tool_map)
+            self.mcp_tool_map = dict(self.mcp_tool_map)
+            self._compiled = {}
+            self._shared_registry = False
+
     # =============================
     # 添加工具
     # =============================
     def add_tool(self, tool: BaseTool) -> None:
+        self._own_registry()
         self.tool_map[tool.name] = tool
+        self._version = None
+        self._compiled.clear()
 
     # =============================
     # 获取工具
@@ -47,12 +91,81 @@ class ToolCollection:
         parameters: str,
         mcp_server_url: str,
     ) -> None:
+        self._own_registry()
         self.mcp_tool_map[name] = McpToolInfo(
             name=name,
             desc=desc,
             parameters=parameters,
             mcp_server_url=mcp_server_url,
         )
+        self._version = None
+        self._compiled.clear()
+
+    # =============================
+    # 工具集版本
+    # =============================
+    def get_version(self) -> str:
+        if self._version is None:
+            digest = hashlib.sha1()
+            for name in sorted(self.tool_map):
+                digest.update(f"{name}\x00{self.tool_map[name].description}\x01".encode("utf-8"))
+            for name in sorted(self.mcp_tool_map):
+                digest.update(f"mcp:{name}\x00{self.mcp_tool_map[name].desc}\x01".encode("utf-8"))
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    # =============================
+    # 编译产物缓存
+    # =============================
+    def get_compiled(self, name: str, builder: Callable[[], Any]) -> Any:
+        """
+        获取按当前工具集版本缓存的编译产物，未命中时调用 builder 生成
+        产物在 fork 出的视图间共享，调用方不得原地修改
+        """
+        key = (name, self.get_version())
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = builder()
+            self._compiled[key] = compiled
+        return compiled
+
+    def get_tools_desc(self) -> str:
+        """
+        数字员工 prompt 使用的工具描述
+        """
+        return self.get_compiled(
+            "tools_desc",
+            lambda: "\n".join(
+                f"工具名：{tool.name} 工具描述：{tool.description}"
+                for tool in self.tool_map.values()
+            ),
+        )
+
+    # =============================
+    # 参数校验
+    # =============================
+    def get_validator(self, name: str) -> Optional[SchemaValidator]:
+        """
+        工具参数校验器，按工具集版本与 tool schema 一同缓存；未知工具返回 None
+        """
+        if name in self.tool_map:
+            tool = self.tool_map[name]
+            load = lambda: tool.to_params()
+        elif name in self.mcp_tool_map:
+            info = self.mcp_tool_map[name]
+            load = lambda: json.loads(info.parameters) if info.parameters else {}
+        else:
+            return None
+
+        def _build() -> SchemaValidator:
+            try:
+                return SchemaValidator(load())
+            except Exception as e:
+                # schema 本身有误时不拦截调用，由工具服务自行校验
+                logger.warning("compile schema of tool %s failed: %s", name, e)
+                return SchemaValidator(None)
+
+        return self.get_compiled(f"validator:{name}", _build)
 
     # =============================
     # 获取 MCP 工具
@@ -63,18 +176,21 @@ class ToolCollection:
     # =============================
     # 执行工具
     # =============================
-    def execute(self, name: str, tool_input: Any) -> Any:
+    async def execute(self, name: str, tool_input: Any) -> Any:
         if name in self.tool_map:
             tool = self.get_tool(name)
-            return tool.execute(tool_input)
+            result = tool.execute(tool_input)
+            # 兼容同步 / 异步两种工具实现
+            if inspect.isawaitable(result):
+                result = await result
+            return result
 
         elif name in self.mcp_tool_map:
             tool_info = self.mcp_tool_map.get(name)
-
-            mcp_tool = McpTool()
-            mcp_tool.agent_context = self.agent_context
-
-            return mcp_tool.call_tool(
+            if self._mcp_tool is None or self._mcp_tool.agent_context is not self.agent_context:
+                self._mcp_tool = McpTool(self.agent_context)
+            # 共享连接池上的异步调用，不再占用线程池
+            return await self._mcp_tool.call_tool_async(
                 tool_info.mcp_server_url,
                 name,
                 tool_input,
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional
+from agent_backend.agent.agent_tracing.printer import Printer
+from agent_backend.agent.agent_tracing.tracer import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    """
+    队列满时的处理策略
+    """
+    BLOCK = "block"                  # 不丢消息；Agent 在 step 边界等待队列腾出空间
+    DROP_PARTIAL = "drop_partial"    # 丢弃新的中间态 partial（is_final 非 True），其余照常入队
+    COALESCE = "coalesce"            # 流式增量合并到队列中同一 message_id 的上一条 partial
+
+    @classmethod
+    def from_value(cls, value: str) -> "OverflowPolicy":
+        for policy in cls:
+            if policy.value == value:
+                return policy
+        raise ValueError(f"Invalid overflow policy: {value}")
+
+
+class _Event:
+    __slots__ = ("method", "args", "enqueued_at")
+
+    def __init__(self, method: str, args: List[Any]):
+        self.method = method
+        self.args = args
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def partial_key(self) -> Optional[str]:
+        """
+        可合并的流式增量：带 message_id、非 final、文本内容的 partial
+        """
+        if self.method != "send_partial":
+            return None
+        message_id, message_type, message, is_final = self.args
+        if is_final or not message_id or not isinstance(message, str):
+            return None
+        return f"{message_id}\x00{message_type}"
+
+
+_CLOSE = object()
+
+
+class AsyncPrinter(Printer):
+    """
+    非阻塞 Printer
+    Agent 侧的 send* 只入队（O(1)），由写出 task 依次交给下游 Printer（如 SSEPrinter），
+    每批写完后等待下游 flush()，客户端带宽只影响队列深度，不再阻塞 Agent 执行
+    同一 message_id 的消息顺序保持不变；COALESCE 合并时不同 message 之间的相对顺序可能前移
+    """
+
+    # 每写出一批等待一次下游 flush，避免发送缓冲无限增长
+    BATCH_SIZE = 64
+
+    def __init__(
+        self,
+        printer: Printer,
+        max_queue: int = 1000,
+        policy: OverflowPolicy = OverflowPolicy.COALESCE,
+    ):
+        self.printer = printer
+        self.max_queue = max_queue
+        self.policy = policy
+        self._queue: Deque[Any] = deque()
+        # partial_key -> 队列中该 message 最后一条可合并的 partial
+        self._tail_partials: Dict[str, _Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._ready = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._writer: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # ========= 指标 =========
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflowed = 0      # BLOCK 策略下超出上限仍入队的条数
+        self.errors = 0
+        self.max_depth = 0
+        self.max_latency = 0.0   # 入队到写出的最大延迟（秒）
+
+    # =============================
+    # 生命周期
+    # =============================
+    def start(self) -> "AsyncPrinter":
+        if self._writer is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._writer = self._loop.create_task(self._run())
+        return self
+
+    async def aclose(self) -> None:
+        """
+        等待队列写完并关闭下游 Printer
+        """
+        self.close()
+        if self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._queue),
+            "maxDepth": self.max_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflowed": self.overflowed,
+            "errors": self.errors,
+            "maxLatencyMs": int(self.max_latency * 1000),
+        }
+
+    async def wait_writable(self) -> None:
+        """
+        BLOCK 策略的背压点：队列达到上限时等待写出
+        """
+        if self.policy is OverflowPolicy.BLOCK:
+            await self._writable.wait()
+
+    # =============================
+    # 入队
+    # =============================
+    def _submit(self, method: str, args: List[Any]) -> None:
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            # 工具线程中的调用转回事件循环
+            self._loop.call_soon_threadsafe(self._enqueue, _Event(method, args))
+        else:
+            self._enqueue(_Event(method, args))
+
+    def _enqueue(self, event: Any) -> None:
+        if self._closed and event is not _CLOSE:
+            self.dropped += 1
+            return
+        if event is not _CLOSE and len(self._queue) >= self.max_queue and self._overflow(event):
+            return
+        self._queue.append(event)
+        if event is not _CLOSE:
+            self.enqueued += 1
+            key = event.partial_key
+            if key is not None:
+                self._tail_partials[key] = event
+            self.max_depth = max(self.max_depth, len(self._queue))
+            if len(self._queue) >= self.max_queue:
+                self._writable.clear()
+        self._ready.set()
+
+    def _overflow(self, event: _Event) -> bool:
+        """
+        :return: True 表示事件已被合并或丢弃，无需入队
+        """
+        key = event.partial_key
+        if self.policy is OverflowPolicy.COALESCE and key is not None:
+            tail = self._tail_partials.get(key)
+            if tail is not None:
+                tail.args[2] = tail.args[2] + event.args[2]
+                self.coalesced += 1
+                return True
+        if self.policy is OverflowPolicy.DROP_PARTIAL and key is not None:
+            self.dropped += 1
+            return True
+        # 无可合并对象的增量与非 partial 消息不丢弃，允许暂时超出上限
+        self.overflowed += 1
+        return False
+
+    # =============================
+    # 写出
+    # =============================
+    async def _run(self) -> None:
+        flush = getattr(self.printer, "flush", None)
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            closing = False
+            batch = 0
+            while self._queue and batch < self.BATCH_SIZE:
+                batch += 1
+                event = self._queue.popleft()
+                if event is _CLOSE:
+                    closing = True
+                    break
+                self._dispatch(event)
+            if len(self._queue) < self.max_queue:
+                self._writable.set()
+            if flush is not None:
+                try:
+                    with Tracer.span("printer.flush", batch=batch, depth=len(self._queue)):
+                        await flush()
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("async printer flush failed: %s", e)
+            if closing:
+                self._close_downstream()
+                return
+
+    def _dispatch(self, event: _Event) -> None:
+        key = event.partial_key
+        if key is not None and self._tail_partials.get(key) is event:
+            del self._tail_partials[key]
+        self.max_latency = max(self.max_latency, time.monotonic() - event.enqueued_at)
+        try:
+            getattr(self.printer, event.method)(*event.args)
+            self.sent += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error("async printer %s failed", event.method, exc_info=e)
+
+    def _close_downstream(self) -> None:
+        self._writable.set()
+        try:
+            self.printer.close()
+        except Exception as e:
+            logger.warning("async printer close failed: %s", e)
+        logger.info("async printer closed %s", self.metrics())
+
+    # =============================
+    # Printer 接口
+    # =============================
+    def send(
+        self,
+        message_id: Optional[str],
+        message_type: str,
+        message: Any,
+        digital_employee: Optional[str] = None,
+        is_final: Optional[bool] = None,
+    ):
+        self._submit("send", [message_id, message_type, message, digital_employee, is_final])
+
+    def send_simple(
+        self,
+        message_type: str,
+        message: Any,
+        digital_employee: Optional[str] = None,
+    ) -> None:
+        self._submit("send_simple", [message_type, message, digital_employee])
+
+    def send_partial(
+        self,
+        message_id: str,
+        message_type: str,
+        message: Any,
+        is_final: Optional[bool] = None,
+    ) -> None:
+        self._submit("send_partial", [message_id, message_type, message, is_final])
+
+    def update_agent_type(self, agent_type) -> None:
+        self._submit("update_agent_type", [agent_type])
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is None:
+            # 未启动写出 task：同步写完
+            while self._queue:
+                self._dispatch(self._queue.popleft())
+            self._close_downstream()
+            return
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self._enqueue, _CLOSE)
+        else:
+            self._enqueue(_CLOSE)
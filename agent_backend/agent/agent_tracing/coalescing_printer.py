@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from agent_backend.agent.agent_tracing.printer import Printer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024
+
+
+@dataclass(frozen=True)
+class CoalesceRule:
+    window: float      # 秒，同一 message 首个增量到达后最多等待多久
+    max_bytes: int     # 累积达到该字节数立即下发
+
+    @classmethod
+    def parse(cls, value: Any) -> "CoalesceRule":
+        """
+        stream_coalesce 配置值："窗口毫秒,最大字节数" 或 "窗口毫秒"
+        （message_interval 是 Java 版的 "首包,间隔" 分片数，语义不同，不在此解析）
+        """
+        parts = [p.strip() for p in str(value).split(",") if p.strip()]
+        if not parts:
+            raise ValueError(f"empty message interval: {value!r}")
+        window_ms = float(parts[0])
+        max_bytes = int(parts[1]) if len(parts) > 1 else DEFAULT_MAX_BYTES
+        return cls(window=window_ms / 1000, max_bytes=max_bytes)
+
+
+def parse_coalesce_rules(stream_coalesce: Dict[str, Any]) -> Dict[str, CoalesceRule]:
+    rules: Dict[str, CoalesceRule] = {}
+    for message_type, value in (stream_coalesce or {}).items():
+        try:
+            rules[message_type] = CoalesceRule.parse(value)
+        except (TypeError, ValueError) as e:
+            logger.error("invalid stream_coalesce %s=%s: %s", message_type, value, e)
+    return rules
+
+
+class _Pending:
+    __slots__ = ("parts", "size", "first_at", "timer")
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.first_at = time.monotonic()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class CoalescingPrinter(Printer):
+    """
+    流式增量合并
+    对 stream_coalesce 中配置的 message_type，同一 message_id 的 partial 文本增量
+    在时间窗口 / 字节上限内合并为一帧下发；is_final 时立即连同缓存一起下发
+    其它消息下发前先清空全部缓存，保证与串行输出的相对顺序一致
+    """
+
+    def __init__(self, printer: Printer, rules: Dict[str, CoalesceRule]):
+        self.printer = printer
+        self.rules = rules
+        self._pending: Dict[Tuple[str, str], _Pending] = {}
+        self._lock = threading.RLock()
+        # ========= 指标 =========
+        self.chunks_in = 0
+        self.frames_out = 0
+
+    @classmethod
+    def wrap(cls, printer: Printer, stream_coalesce: Dict[str, Any]) -> Printer:
+        """
+        未配置合并规则时直接返回原 Printer
+        """
+        rules = parse_coalesce_rules(stream_coalesce)
+        return cls(printer, rules) if rules else printer
+
+    # =============================
+    # 合并
+    # =============================
+    def _coalesce(self, message_id: str, message_type: str, delta: str, is_final: Optional[bool]) -> None:
+        key = (message_id, message_type)
+        rule = self.rules[message_type]
+        with self._lock:
+            self.chunks_in += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _Pending()
+                self._schedule(key, pending, rule)
+            pending.parts.append(delta)
+            pending.size += len(delta.encode("utf-8"))
+            if is_final or pending.size >= rule.max_bytes:
+                self._flush_key(key, is_final)
+
+    def _schedule(self, key: Tuple[str, str], pending: _Pending, rule: CoalesceRule) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 非事件循环线程：不设定时器，依赖后续增量 / 下一条消息 / close 触发下发
+            return
+        pending.timer = loop.call_later(rule.window, self._on_timer, key, pending)
+
+    def _on_timer(self, key: Tuple[str, str], pending: _Pending) -> None:
+        with self._lock:
+            if self._pending.get(key) is pending:
+                self._flush_key(key, None)
+
+    def _flush_key(self, key: Tuple[str, str], is_final: Optional[bool]) -> None:
+        pending = self._pending.pop(key)
+        if pending.timer is not None:
+            pending.timer.cancel()
+        self.frames_out += 1
+        self.printer.send_partial(key[0], key[1], "".join(pending.parts), is_final)
+
+    def flush(self) -> None:
+        """
+        下发全部缓存的增量
+        """
+        with self._lock:
+            for key in list(self._pending):
+                self._flush_key(key, None)
+
+    def _is_coalescable(self, message_id: Optional[str], message_type: str, message: Any) -> bool:
+        return bool(message_id) and message_type in self.rules and isinstance(message, str)
+
+    # =============================
+    # Printer 接口
+    # =============================
+    def send(
+        self,
+        message_id: Optional[str],
+        message_type: str,
+        message: Any,
+        digital_employee: Optional[str] = None,
+        is_final: Optional[bool] = None,
+    ):
+        if digital_employee is None and self._is_coalescable(message_id, message_type, message):
+            self._coalesce(message_id, message_type, message, is_final)
+            return
+        with self._lock:
+            self.flush()
+            self.printer.send(message_id, message_type, message, digital_employee, is_final)
+
+    def send_simple(
+        self,
+        message_type: str,
+        message: Any,
+        digital_employee: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self.flush()
+            self.printer.send_simple(message_type, message, digital_employee)
+
+    def send_partial(
+        self,
+        message_id: str,
+        message_type: str,
+        message: Any,
+        is_final: Optional[bool] = None,
+    ) -> None:
+        if self._is_coalescable(message_id, message_type, message):
+            self._coalesce(message_id, message_type, message, is_final)
+            return
+        with self._lock:
+            self.flush()
+            self.printer.send_partial(message_id, message_type, message, is_final)
+
+    def update_agent_type(self, agent_type) -> None:
+        with self._lock:
+            self.flush()
+            self.printer.update_agent_type(agent_type)
+
+    async def wait_writable(self) -> None:
+        wait_writable = getattr(self.printer, "wait_writable", None)
+        if wait_writable is not None:
+            await wait_writable()
+
+    def close(self) -> None:
+        self.flush()
+        logger.debug("coalescing printer chunks=%s frames=%s", self.chunks_in, self.frames_out)
+        self.printer.close()
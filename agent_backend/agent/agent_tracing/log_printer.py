@@ -1,7 +1,7 @@
 import json
 import logging
 from typing import Any, Optional
-from agent_model.req.agent_request import AgentRequest
+from agent_backend.agent_model.req.agent_request import AgentRequest
 from agent_backend.agent.agent_tracing.printer import Printer
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from agent_backend.agent.agent_tracing.printer import Printer
+
+
+class OrderedPrinter:
+    """
+    并发 task 的有序输出
+    每个 task 拿到一个 channel：排在最前的未完成 task 直接透传，
+    其余 task 的消息先缓存，前序 task 全部完成后按顺序补发，
+    前端看到的消息顺序与串行执行一致
+    背压（wait_writable）：缓存达到 max_buffer 的 task 在 step 边界等待 head 推进；
+    head task 尚未开始执行（未取 channel）时不等待，避免占满并发度的后续 task 与未启动的 head 互等
+    """
+    MAX_BUFFER = 256
+
+    def __init__(self, printer: Printer, channels: int, max_buffer: int = MAX_BUFFER):
+        self.printer = printer
+        self.max_buffer = max_buffer
+        self._head = 0
+        self._opened = [False] * channels
+        self._done = [False] * channels
+        self._buffers: Dict[int, List[Tuple[str, tuple, dict]]] = {
+            i: [] for i in range(channels)
+        }
+        self._lock = threading.Lock()
+        # head 推进时唤醒等待缓存腾出的 task
+        self._advanced: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def channel(self, index: int) -> "TaskChannelPrinter":
+        """
+        task 开始执行时调用
+        """
+        with self._lock:
+            self._opened[index] = True
+        return TaskChannelPrinter(self, index)
+
+    async def wait_writable(self, index: int) -> None:
+        while True:
+            with self._lock:
+                if not self._should_wait(index):
+                    break
+                if self._advanced is None:
+                    self._advanced = asyncio.Event()
+                    self._loop = asyncio.get_running_loop()
+                advanced = self._advanced
+            await advanced.wait()
+        wait_writable = getattr(self.printer, "wait_writable", None)
+        if wait_writable is not None:
+            await wait_writable()
+
+    def _should_wait(self, index: int) -> bool:
+        return (
+            index > self._head
+            and len(self._buffers[index]) >= self.max_buffer
+            and self._opened[self._head]
+        )
+
+    def _emit(self, index: int, method: str, args: tuple, kwargs: dict) -> None:
+        with self._lock:
+            if index != self._head:
+                self._buffers[index].append((method, args, kwargs))
+                return
+            # head 直接透传；持锁保证与补发不交错
+            getattr(self.printer, method)(*args, **kwargs)
+
+    def complete(self, index: int) -> None:
+        """
+        task 结束（成功或失败）后调用，推进 head 并补发后续 task 的缓存
+        """
+        with self._lock:
+            self._done[index] = True
+            head = self._head
+            while self._head < len(self._done) and self._done[self._head]:
+                self._head += 1
+                if self._head < len(self._done):
+                    self._flush(self._head)
+            if self._head != head and self._advanced is not None:
+                advanced, self._advanced = self._advanced, None
+                self._loop.call_soon_threadsafe(advanced.set)
+
+    def _flush(self, index: int) -> None:
+        buffered = self._buffers[index]
+        self._buffers[index] = []
+        for method, args, kwargs in buffered:
+            getattr(self.printer, method)(*args, **kwargs)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(buffer) for buffer in self._buffers.values())
+
+
+class TaskChannelPrinter(Printer):
+    """
+    单个 task 使用的 Printer，消息经 OrderedPrinter 排序后输出
+    """
+
+    def __init__(self, ordered: OrderedPrinter, index: int):
+        self.ordered = ordered
+        self.index = index
+
+    def send(
+        self,
+        message_id: Optional[str],
+        message_type: str,
+        message: Any,
+        digital_employee: Optional[str] = None,
+        is_final: Optional[bool] = None,
+    ):
+        self.ordered._emit(
+            self.index,
+            "send",
+            (message_id, message_type, message, digital_employee, is_final),
+            {},
+        )
+
+    def send_simple(
+        self,
+        message_type: str,
+        message: Any,
+        digital_employee: Optional[str] = None,
+    ) -> None:
+        self.ordered._emit(
+            self.index, "send_simple", (message_type, message, digital_employee), {}
+        )
+
+    def send_partial(
+        self,
+        message_id: str,
+        message_type: str,
+        message: Any,
+        is_final: Optional[bool] = None,
+    ) -> None:
+        self.ordered._emit(
+            self.index, "send_partial", (message_id, message_type, message, is_final), {}
+        )
+
+    def close(self) -> None:
+        # 底层连接由请求级 Printer 负责关闭，这里只标记 task 输出结束
+        self.ordered.complete(self.index)
+
+    async def wait_writable(self) -> None:
+        """
+        step 边界的背压：本 task 缓存已满时等待前序 task 完成，再转发底层 Printer 的背压
+        """
+        await self.ordered.wait_writable(self.index)
+
+    def update_agent_type(self, agent_type) -> None:
+        self.ordered._emit(self.index, "update_agent_type", (agent_type,), {})
@@ -3,17 +3,56 @@ import json
 import logging
 import time
 import uuid
+from dataclasses import fields, is_dataclass
 from typing import Any, Optional, Dict
 from agent_backend.agent.agent_tracing.printer import Printer
-from agent_model.req.agent_request import AgentRequest
-from agent_model.response.agent_response import AgentResponse
+from agent_backend.agent.agent_util.log_util import LogUtil
+from agent_backend.agent_model.req.agent_request import AgentRequest
+from agent_backend.agent_model.response.agent_response import AgentResponse
 logger = logging.getLogger(__name__)
 
+# 直接以 message 作为 resultMap 的消息类型
+RESULT_MAP_TYPES = frozenset({
+    "browser",
+    "code",
+    "html",
+    "markdown",
+    "ppt",
+    "file",
+    "knowledge",
+    "deep_search",
+    "data_analysis",
+})
+
+
+# 参与增量比较的计划字段
+PLAN_LIST_FIELDS = ("stages", "steps", "step_status", "notes")
+
+
+def _as_dict(message: Any) -> Dict[str, Any]:
+    """
+    浅拷贝为 dict（调用方的对象不被修改），替代 json.loads(json.dumps(...)) 往返
+    """
+    if isinstance(message, dict):
+        return dict(message)
+    if is_dataclass(message):
+        return {f.name: getattr(message, f.name) for f in fields(message)}
+    if hasattr(message, "__dict__"):
+        return dict(vars(message))
+    return json.loads(json.dumps(message, ensure_ascii=False))
+
+
 class SSEPrinter(Printer):
-    def __init__(self, emitter, request:AgentRequest, agent_type: int):
+    def __init__(self, emitter, request:AgentRequest, agent_type: int, plan_patch: bool = False):
         self.emitter = emitter
         self.request = request
         self.agent_type = agent_type
+        # 客户端断开后不再序列化 / 发送
+        self.disconnected = False
+        # 计划增量（客户端声明支持时开启）：缓存最近一次下发的计划，后续更新只发送变化的下标
+        self.plan_patch = plan_patch
+        self._last_plan: Optional[AgentResponse.Plan] = None
+        self._plan_version = 0
 
     # =============================
     # 核心 send（完整参数）
@@ -26,15 +65,28 @@ class SSEPrinter(Printer):
         digital_employee: Optional[str] = None,
         is_final: Optional[bool] = None,
     ):
+        if self.disconnected:
+            return
         try:
             if message_id is None:
                 message_id = str(uuid.uuid4())
 
+            if message_type == "agent_stream":
+                # 逐 token 的增量不在 INFO 记录
+                logger.debug(
+                    "%s sse send %s %s", self.request.request_id, message_id, LogUtil.payload(message)
+                )
+                # 流式增量是最高频的消息：直接构造协议字典，不创建完整的 AgentResponse
+                self.emitter.send(
+                    self._stream_payload(message_id, message, digital_employee, is_final)
+                )
+                return
+
             logger.info(
                 "%s sse send %s %s %s",
                 self.request.request_id,
                 message_type,
-                message,
+                LogUtil.payload(message),
                 digital_employee,
             )
 
@@ -81,37 +133,29 @@ class SSEPrinter(Printer):
                 response.plan_thought = str(message)
 
             elif message_type == "plan":
-                plan = AgentResponse.Plan()
-                # 等价 BeanUtils.copyProperties
-                for k, v in vars(message).items():
-                    setattr(plan, k, v)
-                response.plan = AgentResponse.format_steps(plan)
+                # format_steps 只读取 title / steps / step_status / notes，生成新的 Plan，无需先复制
+                plan = AgentResponse.format_steps(message)
+                patch = self._diff_plan(plan)
+                if patch is not None and not self._has_changes(patch):
+                    return
+                self._plan_version += 1
+                plan.version = self._plan_version
+                self._last_plan = plan
+                if patch is None:
+                    response.plan = plan
+                else:
+                    patch.version = plan.version
+                    response.message_type = "plan_patch"
+                    response.plan_patch = patch
 
             elif message_type == "tool_result":
                 response.tool_result = message
 
-            elif message_type in {
-                "browser",
-                "code",
-                "html",
-                "markdown",
-                "ppt",
-                "file",
-                "knowledge",
-                "deep_search",
-                "data_analysis",
-            }:
-                parsed = (
-                    message
-                    if isinstance(message, dict)
-                    else json.loads(json.dumps(message, ensure_ascii=False))
-                )
+            elif message_type in RESULT_MAP_TYPES:
+                parsed = _as_dict(message)
                 parsed["agentType"] = self.agent_type
                 response.result_map = parsed
 
-            elif message_type == "agent_stream":
-                response.result = str(message)
-
             elif message_type == "result":
                 if isinstance(message, str):
                     response.result = message
@@ -123,7 +167,7 @@ class SSEPrinter(Printer):
                         else None
                     )
                 else:
-                    parsed = json.loads(json.dumps(message, ensure_ascii=False))
+                    parsed = _as_dict(message)
                     response.result_map = parsed
                     response.result = str(parsed.get("taskSummary"))
 
@@ -132,9 +176,85 @@ class SSEPrinter(Printer):
             # 发送 SSE
             self.emitter.send(response)
 
+        except ConnectionError as e:
+            self.disconnected = True
+            logger.info("%s sse client disconnected: %s", self.request.request_id, e)
+
         except Exception as e:
             logger.error("sse send error", exc_info=e)
 
+    # =============================
+    # 计划增量
+    # =============================
+    def _diff_plan(self, plan: AgentResponse.Plan) -> Optional[AgentResponse.PlanPatch]:
+        """
+        与上一次下发的计划比较
+        :return: None 表示需要完整计划（首次 / 关闭增量 / 步骤数变化），否则为变化的下标
+        """
+        last = self._last_plan
+        if not self.plan_patch or last is None:
+            return None
+        patch = AgentResponse.PlanPatch(base_version=last.version)
+        for name in PLAN_LIST_FIELDS:
+            old, new = getattr(last, name), getattr(plan, name)
+            if len(old) != len(new):
+                return None
+            changed = {str(i): value for i, (prev, value) in enumerate(zip(old, new)) if prev != value}
+            if changed:
+                setattr(patch, name, changed)
+        if plan.title != last.title:
+            patch.title = plan.title
+        return patch
+
+    @staticmethod
+    def _has_changes(patch: AgentResponse.PlanPatch) -> bool:
+        return patch.title is not None or any(getattr(patch, name) for name in PLAN_LIST_FIELDS)
+
+    def send_plan_snapshot(self) -> None:
+        """
+        重新下发当前完整计划（客户端重连后调用），版本号不变
+        """
+        if self._last_plan is None or self.disconnected:
+            return
+        try:
+            self.emitter.send(AgentResponse(
+                request_id=self.request.request_id,
+                message_id=str(uuid.uuid4()),
+                message_type="plan",
+                message_time=str(int(time.time() * 1000)),
+                plan=self._last_plan,
+                result_map={"agentType": self.agent_type},
+                finish=False,
+            ))
+        except ConnectionError as e:
+            self.disconnected = True
+            logger.info("%s sse client disconnected: %s", self.request.request_id, e)
+
+    def _stream_payload(
+        self,
+        message_id: str,
+        message: Any,
+        digital_employee: Optional[str],
+        is_final: Optional[bool],
+    ) -> Dict[str, Any]:
+        """
+        与 AgentResponse(message_type="agent_stream").to_dict() 字段与顺序一致
+        """
+        payload: Dict[str, Any] = {
+            "requestId": self.request.request_id,
+            "messageId": message_id,
+        }
+        if is_final is not None:
+            payload["isFinal"] = is_final
+        payload["messageType"] = "agent_stream"
+        if digital_employee:
+            payload["digitalEmployee"] = digital_employee
+        payload["messageTime"] = str(int(time.time() * 1000))
+        payload["resultMap"] = {"agentType": self.agent_type}
+        payload["result"] = str(message)
+        payload["finish"] = False
+        return payload
+
     # =============================
     # send_simple
     # =============================
@@ -170,6 +290,14 @@ class SSEPrinter(Printer):
             is_final=is_final,
         )
 
+    async def flush(self) -> None:
+        """
+        等待已写出的数据发送到客户端（AsyncPrinter 写出 task 调用）
+        """
+        flush = getattr(self.emitter, "flush", None)
+        if flush is not None and not self.disconnected:
+            await flush()
+
     def close(self) -> None:
         self.emitter.complete()
 
@@ -0,0 +1,288 @@
+"""
+轻量级 span 追踪
+- span 通过 contextvar 传递父子关系，asyncio task / to_thread 自动继承
+- 时间戳使用 perf_counter_ns（单调），导出时换算为墙上时间（微秒）
+- 采样在根 span 决定，未采样的 trace 下所有 span 均为空操作
+- 结束的 span 先缓冲，根 span 结束或缓冲满时批量写出，文件 IO 不在每个 span 上发生
+
+用法：
+    with Tracer.span("agent.step", step=1) as span:
+        span.set("tokens", 128)
+"""
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# perf_counter_ns -> 墙上时间
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+_span_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attrs", "thread_id", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self._token = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter_ns() - self.start_ns) / 1e6
+
+    def finish(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        Tracer.on_finish(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.finish()
+        _current_span.reset(self._token)
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "ts": (self.start_ns + _EPOCH_OFFSET_NS) // 1000,
+            "dur": (self.end_ns - self.start_ns) // 1000,
+            "tid": self.thread_id,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """
+    未启用 / 未采样时的空 span
+    """
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def elapsed_ms(self) -> float:
+        return 0.0
+
+    def finish(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _UnsampledRoot(_NoopSpan):
+    """
+    未采样的根 span：进入后将上下文标记为未采样，子 span 不再重新采样
+    """
+    __slots__ = ("_token",)
+
+    def __enter__(self) -> "_UnsampledRoot":
+        self._token = _current_span.set(NOOP_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+
+
+_current_span: ContextVar[Any] = ContextVar("agent_current_span", default=None)
+
+
+# =============================
+# 导出
+# =============================
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    """
+    每个 span 一行 JSON
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _header(self) -> str:
+        return ""
+
+    def _format(self, span: Span) -> str:
+        return json.dumps(span.to_record(), ensure_ascii=False, default=str)
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(self._format(span) + "\n" for span in spans)
+        with self._lock:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", encoding="utf-8") as f:
+                if new_file:
+                    f.write(self._header())
+                f.write(lines)
+
+
+class ChromeTraceExporter(JsonLinesExporter):
+    """
+    Chrome Trace Event 格式（chrome://tracing / Perfetto 可直接打开）
+    JSON 数组允许不闭合，因此同样可以逐行追加；每个 trace 一行（tid = 根 span）
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._pid = os.getpid()
+        # trace_id -> 泳道号；泳道号单调递增，已结束 trace 的号不复用，避免与仍在进行的 trace 重叠
+        self._lanes: Dict[str, int] = {}
+        self._next_lane = 1
+
+    def _header(self) -> str:
+        return "[\n"
+
+    def _format(self, span: Span) -> str:
+        lane = self._lanes.get(span.trace_id)
+        if lane is None:
+            lane = self._lanes[span.trace_id] = self._next_lane
+            self._next_lane += 1
+        args = dict(span.attrs)
+        args["traceId"] = span.trace_id
+        return json.dumps({
+            "name": span.name,
+            "cat": span.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (span.start_ns + _EPOCH_OFFSET_NS) // 1000,
+            "dur": (span.end_ns - span.start_ns) // 1000,
+            "pid": self._pid,
+            "tid": lane,
+            "args": args,
+        }, ensure_ascii=False, default=str) + ","
+
+    def export(self, spans: List[Span]) -> None:
+        super().export(spans)
+        # 已结束的 trace 不再需要泳道号
+        for span in spans:
+            if span.parent_id is None:
+                self._lanes.pop(span.trace_id, None)
+
+
+# =============================
+# Tracer
+# =============================
+class Tracer:
+    """
+    进程级 Tracer（类级单例），未配置导出器时所有 span 均为空操作
+    """
+
+    _exporter: Optional[SpanExporter] = None
+    _sample_rate: float = 1.0
+    _buffer: List[Span] = []
+    _lock = threading.Lock()
+    # 缓冲上限：长时间运行的 trace 也按批写出
+    BATCH_SIZE = 512
+
+    @classmethod
+    def configure(cls, exporter: Optional[SpanExporter], sample_rate: float = 1.0) -> None:
+        cls.flush()
+        cls._exporter = exporter
+        cls._sample_rate = max(0.0, min(1.0, sample_rate))
+
+    @classmethod
+    def from_config(cls, genie_config) -> None:
+        if not genie_config.trace_file:
+            cls.configure(None)
+            return
+        exporter_cls = ChromeTraceExporter if genie_config.trace_format == "chrome" else JsonLinesExporter
+        cls.configure(exporter_cls(genie_config.trace_file), genie_config.trace_sample_rate)
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls._exporter is not None
+
+    @classmethod
+    def current(cls) -> Any:
+        span = _current_span.get()
+        return span if span is not None else NOOP_SPAN
+
+    @classmethod
+    def span(cls, name: str, **attrs: Any) -> Any:
+        """
+        创建 span（with 语句进入后成为当前 span）
+        """
+        if cls._exporter is None:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            if cls._sample_rate < 1.0 and random.random() >= cls._sample_rate:
+                return _UnsampledRoot()
+            return Span(name, uuid.uuid4().hex, None, attrs)
+        if parent is NOOP_SPAN:
+            return NOOP_SPAN
+        return Span(name, parent.trace_id, parent.span_id, attrs)
+
+    @classmethod
+    def start(cls, name: str, **attrs: Any) -> Any:
+        """
+        创建不进入上下文的 span，需手动 finish()
+        用于异步生成器等跨 yield 的区间，避免 contextvar 泄漏到调用方
+        """
+        span = cls.span(name, **attrs)
+        return span if isinstance(span, Span) else NOOP_SPAN
+
+    @classmethod
+    def on_finish(cls, span: Span) -> None:
+        with cls._lock:
+            cls._buffer.append(span)
+            if span.parent_id is not None and len(cls._buffer) < cls.BATCH_SIZE:
+                return
+            spans, cls._buffer = cls._buffer, []
+        cls._export(spans)
+
+    @classmethod
+    def flush(cls) -> None:
+        with cls._lock:
+            spans, cls._buffer = cls._buffer, []
+        if spans:
+            cls._export(spans)
+
+    @classmethod
+    def _export(cls, spans: List[Span]) -> None:
+        exporter = cls._exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export(spans)
+        except Exception as e:
+            logger.warning("trace export failed: %s", e)
@@ -0,0 +1,224 @@
+"""
+按依赖端点（MCP 服务 / 工具服务 URL）的熔断器
+- 滑动时间窗口内统计调用数、失败数与慢调用数；调用数达到 min_calls 后，
+  失败率或慢调用率超过阈值即打开熔断，open_seconds 内直接抛出 CircuitOpenError，不再等待超时
+- 冷却结束后进入半开状态，只放行一个探测请求：成功则关闭，失败则重新打开
+- 取消（AgentCancelledError / asyncio.CancelledError）不计入统计
+- CircuitBreakerRegistry.metrics() 暴露各端点的状态与窗口统计
+
+用法（同步与异步代码均可）：
+    with CircuitBreakerRegistry.get(url).track() as call:
+        response = ...
+        if not response.ok:
+            call.fail("HTTP 502")
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError, CircuitOpenError
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def endpoint_of(url: str) -> str:
+    """
+    熔断粒度：scheme://host/path（忽略查询串）
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}" if parts.netloc else url
+
+
+class _Call:
+    """
+    一次受保护的调用；call.fail() 将未抛异常的调用（如 HTTP 5xx）记为失败
+    """
+    __slots__ = ("breaker", "start", "error", "probe")
+
+    def __init__(self, breaker: "CircuitBreaker", probe: bool):
+        self.breaker = breaker
+        self.probe = probe
+        self.error: Optional[str] = None
+        self.start = time.monotonic()
+
+    def fail(self, reason: str) -> None:
+        self.error = reason
+
+    def __enter__(self) -> "_Call":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and issubclass(exc_type, (AgentCancelledError, asyncio.CancelledError)):
+            self.breaker._release(self)
+            return
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.breaker._record(self, time.monotonic() - self.start)
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        endpoint: str,
+        window: float = 30,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 10,
+        slow_rate: float = 0.8,
+        open_seconds: float = 15,
+    ):
+        self.endpoint = endpoint
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+
+        self.state = BreakerState.CLOSED
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.open_count = 0
+        self.rejected = 0
+        # (结束时间, 是否失败, 耗时)
+        self._outcomes: Deque[Tuple[float, bool, float]] = deque()
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def track(self) -> _Call:
+        """
+        放行则返回调用上下文，熔断中抛出 CircuitOpenError
+        """
+        with self._lock:
+            if self.state is BreakerState.CLOSED:
+                return _Call(self, probe=False)
+            now = time.monotonic()
+            retry_after = self.opened_at + self.open_seconds - now
+            if self.state is BreakerState.OPEN and retry_after <= 0:
+                self.state = BreakerState.HALF_OPEN
+            if self.state is BreakerState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return _Call(self, probe=True)
+            self.rejected += 1
+            raise CircuitOpenError(self.endpoint, max(retry_after, 0.0), self.last_error)
+
+    # =============================
+    # 统计
+    # =============================
+    def _release(self, call: _Call) -> None:
+        if call.probe:
+            with self._lock:
+                self._probing = False
+
+    def _record(self, call: _Call, elapsed: float) -> None:
+        failed = call.error is not None
+        now = time.monotonic()
+        with self._lock:
+            if failed:
+                self.last_error = call.error
+            if call.probe:
+                self._probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = BreakerState.CLOSED
+                    self._outcomes.clear()
+                return
+            if self.state is not BreakerState.CLOSED:
+                # 打开前已放行的调用，结果不再影响状态
+                return
+            self._outcomes.append((now, failed, elapsed))
+            self._trim(now)
+            total, failures, slow = self._counts()
+            if total < self.min_calls:
+                return
+            if failures / total >= self.error_rate or slow / total >= self.slow_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = BreakerState.OPEN
+        self.opened_at = now
+        self.open_count += 1
+        self._outcomes.clear()
+
+    def _trim(self, now: float) -> None:
+        outcomes = self._outcomes
+        while outcomes and outcomes[0][0] < now - self.window:
+            outcomes.popleft()
+
+    def _counts(self) -> Tuple[int, int, int]:
+        failures = slow = 0
+        for _, failed, elapsed in self._outcomes:
+            failures += failed
+            slow += elapsed >= self.slow_call_seconds
+        return len(self._outcomes), failures, slow
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            total, failures, slow = self._counts()
+            latencies = sorted(elapsed for _, _, elapsed in self._outcomes)
+            return {
+                "state": self.state.value,
+                "calls": total,
+                "failures": failures,
+                "slowCalls": slow,
+                "errorRate": round(failures / total, 3) if total else 0.0,
+                "p95Ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+                if latencies else None,
+                "openCount": self.open_count,
+                "rejected": self.rejected,
+                "lastError": self.last_error,
+            }
+
+
+class CircuitBreakerRegistry:
+    """
+    进程级熔断器注册表（类级单例），端点首次使用时按当前配置创建
+    """
+
+    settings: Dict[str, Any] = {}
+    _breakers: Dict[str, CircuitBreaker] = {}
+    _lock = threading.Lock()
+
+    def __init__(self):
+        raise RuntimeError("CircuitBreakerRegistry cannot be instantiated")
+
+    @classmethod
+    def configure(cls, **settings: Any) -> None:
+        with cls._lock:
+            cls.settings = settings
+            cls._breakers = {}
+
+    @classmethod
+    def from_config(cls, genie_config) -> None:
+        cls.configure(
+            window=genie_config.breaker_window,
+            min_calls=genie_config.breaker_min_calls,
+            error_rate=genie_config.breaker_error_rate,
+            slow_call_seconds=genie_config.breaker_slow_call_seconds,
+            slow_rate=genie_config.breaker_slow_rate,
+            open_seconds=genie_config.breaker_open_seconds,
+        )
+
+    @classmethod
+    def get(cls, url: str) -> CircuitBreaker:
+        endpoint = endpoint_of(url)
+        breaker = cls._breakers.get(endpoint)
+        if breaker is None:
+            with cls._lock:
+                breaker = cls._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = cls._breakers[endpoint] = CircuitBreaker(endpoint, **cls.settings)
+        return breaker
+
+    @classmethod
+    def metrics(cls) -> Dict[str, Dict[str, Any]]:
+        return {endpoint: breaker.metrics() for endpoint, breaker in list(cls._breakers.items())}
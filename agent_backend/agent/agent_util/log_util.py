@@ -0,0 +1,141 @@
+import json
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+DEFAULT_MAX_CHARS = 2000
+
+
+def _cap(text: str, max_chars: int) -> str:
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...(+{len(text) - max_chars} chars)"
+
+
+def _size_hint(value: Any) -> str:
+    if isinstance(value, (str, bytes, list, tuple, dict)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+class LazyPayload:
+    """
+    日志参数占位：仅在日志记录真正输出时才序列化，且限制长度
+    sampled=False 时只输出类型与长度
+    """
+    __slots__ = ("value", "max_chars", "as_json", "sampled")
+
+    def __init__(self, value: Any, max_chars: int, as_json: bool, sampled: bool):
+        self.value = value
+        self.max_chars = max_chars
+        self.as_json = as_json
+        self.sampled = sampled
+
+    def __str__(self) -> str:
+        if not self.sampled:
+            return _size_hint(self.value)
+        value = self.value
+        if self.as_json and not isinstance(value, str):
+            try:
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            except (TypeError, ValueError):
+                value = str(value)
+        return _cap(str(value), self.max_chars)
+
+    __repr__ = __str__
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """
+    只在调用线程完成 % 插值（参数已截断，开销小，且避免对象后续被修改），
+    Formatter 格式化与写出在 QueueListener 线程完成
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class LogUtil:
+    """
+    热路径日志工具（类级配置）
+    - payload(): 惰性序列化 + 字段长度上限 + 按比例采样完整内容
+    - cap(): 立即截断（用于 print 等非 logging 输出）
+    - install_queue_handler(): root logger 改为 QueueHandler，写出由后台线程完成
+    """
+
+    max_chars: int = DEFAULT_MAX_CHARS
+    sample_rate: float = 1.0
+    _listener: Optional[QueueListener] = None
+    _queue_handler: Optional[QueueHandler] = None
+    _logger: Optional[logging.Logger] = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        raise RuntimeError("LogUtil cannot be instantiated")
+
+    @classmethod
+    def configure(cls, max_chars: int = DEFAULT_MAX_CHARS, sample_rate: float = 1.0) -> None:
+        cls.max_chars = max_chars
+        cls.sample_rate = max(0.0, min(1.0, sample_rate))
+
+    @classmethod
+    def from_config(cls, genie_config) -> None:
+        cls.configure(genie_config.log_payload_max_chars, genie_config.log_payload_sample_rate)
+        if genie_config.log_async:
+            cls.install_queue_handler()
+
+    @classmethod
+    def payload(cls, value: Any, max_chars: Optional[int] = None, as_json: bool = True) -> LazyPayload:
+        """
+        作为 logger 参数使用：logger.info("body=%s", LogUtil.payload(body))
+        """
+        sampled = cls.sample_rate >= 1.0 or random.random() < cls.sample_rate
+        return LazyPayload(value, cls.max_chars if max_chars is None else max_chars, as_json, sampled)
+
+    @classmethod
+    def cap(cls, value: Any, max_chars: Optional[int] = None) -> str:
+        return _cap(str(value), cls.max_chars if max_chars is None else max_chars)
+
+    # =============================
+    # 异步写出
+    # =============================
+    @classmethod
+    def install_queue_handler(cls, logger: Optional[logging.Logger] = None) -> None:
+        """
+        将 logger（默认 root）现有 handler 移入 QueueListener 后台线程
+        """
+        logger = logger or logging.getLogger()
+        with cls._lock:
+            if cls._listener is not None:
+                return
+            handlers = list(logger.handlers)
+            if not handlers:
+                handlers = [logging.StreamHandler()]
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+            cls._queue_handler = _PreparedQueueHandler(log_queue)
+            cls._logger = logger
+            logger.addHandler(cls._queue_handler)
+            cls._listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            cls._listener.start()
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        停止后台线程并写完队列中剩余日志，恢复原 handler
+        """
+        with cls._lock:
+            listener, cls._listener = cls._listener, None
+            if listener is None:
+                return
+            listener.stop()
+            cls._logger.removeHandler(cls._queue_handler)
+            for handler in listener.handlers:
+                cls._logger.addHandler(handler)
+            cls._logger = cls._queue_handler = None
@@ -1,11 +1,17 @@
 
 import threading
 import logging
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
 import requests
 import httpx
 from abc import ABC, abstractmethod
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError
+from agent_backend.agent.agent_util.circuit_breaker import CircuitBreakerRegistry
+from agent_backend.agent.agent_util.log_util import LogUtil
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine
 
+if TYPE_CHECKING:
+    from agent_backend.agent.agent_core.cancel_token import CancelToken
 logger = logging.getLogger(__name__)
 
 
@@ -55,8 +61,11 @@ class OkHttpUtil:
     # 强约束调用（失败即错误）
     @staticmethod
     def post_json_body(url: str, headers: Dict[str, str], json_body: str) -> str:
-        logger.info("POST %s payload=%s headers=%s", url, json_body, headers)
-        response = OkHttpUtil.post_new(url, headers, json_body)
+        logger.info("POST %s payload=%s", url, LogUtil.payload(json_body))
+        with CircuitBreakerRegistry.get(url).track() as call:
+            response = OkHttpUtil.post_new(url, headers, json_body)
+            if response.status_code >= 500:
+                call.fail(f"HTTP {response.status_code}")
         if not response.ok:
             raise RuntimeError(f"调用接口 {url} 失败: {response.text}")
         return response.text
@@ -68,14 +77,22 @@ class OkHttpUtil:
         json_params: str,
         headers: Optional[Dict[str, str]],
         timeout: int,
+        cancel_token: Optional["CancelToken"] = None,
     ) -> Optional[str]:
+        # 请求已取消时不再发起调用
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         client = OkHttpUtil.get_http_client()
-        response = client.post(
-            url,
-            data=json_params,
-            headers=headers,
-            timeout=(timeout, timeout),
-        )
+        # 熔断中直接抛出 CircuitOpenError，不再等待超时
+        with CircuitBreakerRegistry.get(url).track() as call:
+            response = client.post(
+                url,
+                data=json_params,
+                headers=headers,
+                timeout=(timeout, timeout),
+            )
+            if response.status_code >= 500:
+                call.fail(f"HTTP {response.status_code}")
         return response.text if response.ok else None
 
     class SseEventListener(ABC):
@@ -88,6 +105,12 @@ class OkHttpUtil:
         @abstractmethod
         def on_error(self, e: Exception): ...
 
+    @staticmethod
+    def _emit_redacted(event_listener: "OkHttpUtil.SseEventListener", payload: str) -> None:
+        # 流式脱敏器暂存了全部内容时不回调空事件
+        if payload:
+            event_listener.on_event(payload)
+
     # 同步 SSE
     @staticmethod
     def request_sse(
@@ -95,13 +118,25 @@ class OkHttpUtil:
         json_body: str,
         headers: Optional[Dict[str, str]],
         event_listener: "OkHttpUtil.SseEventListener",
+        cancel_token: Optional["CancelToken"] = None,
+        redact: bool = True,
     ):
+        """
+        cancel_token: 取消时关闭上游连接并以 AgentCancelledError 回调 on_error
+        redact: 事件内容按内置规则与配置的敏感模式脱敏；按完整行切分事件，网络分片不会拆开事件中的号码
+            文本事件共用一个流式脱敏器，跨事件拆开的号码也能命中，可能命中的尾部顺延到后续事件输出；
+            JSON 事件（{ / [ 开头，含 [DONE]）拆开会破坏结构，只能整条脱敏，跨 JSON 事件拆开的号码无法识别
+        """
         headers = headers or {}
-        logger.info("SSE POST %s payload=%s headers=%s", url, json_body, headers)
+        logger.info("SSE POST %s payload=%s", url, LogUtil.payload(json_body))
 
         client = OkHttpUtil.get_sse_client()
+        remove_callback = None
+        response = None
         try:
-            with client.stream(
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            request = client.build_request(
                 "POST",
                 url,
                 headers={
@@ -110,22 +145,46 @@ class OkHttpUtil:
                     "Content-Type": "application/json",
                 },
                 content=json_body,
-            ) as response:
-                for chunk in response.iter_text():
-                    if not chunk:
-                        continue
-                    for line in chunk.splitlines():
-                        if not line:
-                            continue
-                        line = line.strip()   # 🔥 关键一行
-                        if not line.startswith("data"):
-                            continue
-                        # 兼容 data:xxxx / data: xxxx
-                        _, _, payload = line.partition(":")
-                        payload = payload.strip()
-
-                        event_listener.on_event(payload)
-
-                event_listener.on_complete()
+            )
+            # 熔断只统计建连与响应状态，流式读取的时长不计入慢调用
+            with CircuitBreakerRegistry.get(url).track() as call:
+                response = client.send(request, stream=True)
+                if response.status_code >= 500:
+                    call.fail(f"HTTP {response.status_code}")
+            if cancel_token is not None:
+                # 取消回调可能来自其它线程，直接关闭连接让读取立即结束
+                remove_callback = cancel_token.add_callback(response.close)
+            redactor = RedactionEngine.default().stream() if redact else None
+            # iter_lines 跨网络分片拼接完整行，避免 data 行被拆成两半
+            for line in response.iter_lines():
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if not line:
+                    continue
+                line = line.strip()   # 🔥 关键一行
+                if not line.startswith("data"):
+                    continue
+                # 兼容 data:xxxx / data: xxxx
+                _, _, payload = line.partition(":")
+                payload = payload.strip()
+                if redactor is None:
+                    event_listener.on_event(payload)
+                elif payload.startswith(("{", "[")):
+                    # 先冲出前面文本事件保留的尾部，保持事件顺序
+                    OkHttpUtil._emit_redacted(event_listener, redactor.close())
+                    event_listener.on_event(redactor.engine.redact(payload))
+                else:
+                    OkHttpUtil._emit_redacted(event_listener, redactor.feed(payload))
+
+            if redactor is not None:
+                OkHttpUtil._emit_redacted(event_listener, redactor.close())
+            event_listener.on_complete()
         except Exception as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                e = AgentCancelledError(cancel_token.reason or "cancelled")
             event_listener.on_error(e)
+        finally:
+            if remove_callback is not None:
+                remove_callback()
+            if response is not None:
+                response.close()
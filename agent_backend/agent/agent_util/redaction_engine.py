@@ -0,0 +1,321 @@
+"""
+文本脱敏引擎
+内置规则（邮箱 / 身份证 / 手机号 / 银行卡）与自定义敏感词合并为一个预编译正则，一次从左到右扫描，
+命中片段按精确位置写入输出缓冲，不再对整串做 str.replace
+
+自定义敏感词（sensitive_patterns，key 为模式，value 为替换文本）：
+- "(?:[^A-Za-z0-9_-]|^)password[^A-Za-z0-9_-]" 形式：左右为边界字符类，只替换中间的敏感词，保留边界字符
+- 其余视为字面量，直接替换
+边界相同的字面敏感词合并为一棵前缀树，编译成共享前缀的正则分支（Aho-Corasick 的多模式合并，
+由 C 实现的正则引擎执行，比纯 Python 自动机逐字符扫描更快）
+
+流式输出使用 StreamingRedactor（engine.stream()）：跨 chunk 拆开的手机号 / 身份证同样能命中
+"""
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+MASK = "✿"
+
+# 左右边界：前后不能紧邻数字 / 字母 / 下划线
+_NOT_WORD_BEFORE = r"(?<![\dA-Za-z_])"
+_NOT_WORD_AFTER = r"(?![\dA-Za-z_])"
+
+_BUILTIN_PATTERNS = (
+    # 邮箱：只把 @ 换成全角，排除 @jd.com；本地部分中的手机号等仍会被其它规则命中
+    ("email", r"(?<=[a-zA-Z0-9._%+\-])@(?!jd\.com)(?=[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,})"),
+    ("id_card", _NOT_WORD_BEFORE
+     + r"(?:[1-6][1-7]|50|71|81|82)\d{4}"
+       r"(?:19|20)\d{2}"
+       r"(?:0[1-9]|10|11|12)"
+       r"(?:[0-2][1-9]|10|20|30|31)"
+       r"\d{3}[0-9Xx]"
+     + _NOT_WORD_AFTER),
+    ("phone", _NOT_WORD_BEFORE + r"1[3456789]\d{9}" + _NOT_WORD_AFTER),
+    ("bank_card", _NOT_WORD_BEFORE + r"62(?:\d{14}|\d{17})" + _NOT_WORD_AFTER),
+)
+
+# 内置规则命中的首字符
+_BUILTIN_FIRST_CHARS = "@1-8"
+# 内置规则的最长命中（19 位银行卡）
+_BUILTIN_MAX_MATCH = 19
+# 含非字面规则（长度未知）时流式脱敏保留的窗口
+_UNBOUNDED_WINDOW = 256
+# 邮箱域名最长 253 个字符，@ 之后域名字符未结束前无法判定
+_EMAIL_WINDOW = 256
+_DOMAIN_RUN = re.compile(r"[a-zA-Z0-9.\-]*")
+
+# "(?:CLASS|^)" 形式的左边界
+_LEFT_BOUNDARY = re.compile(r"^\(\?:(\[[^\]]*\])\|\^\)$")
+
+
+def luhn_verify(card_number: str) -> bool:
+    """
+    银行卡 Luhn 校验
+    """
+    total = 0
+    alternate = False
+
+    for ch in reversed(card_number):
+        digit = int(ch)
+        if alternate:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+        alternate = not alternate
+
+    return total % 10 == 0
+
+
+def _mask_email(text: str) -> str:
+    return "＠"
+
+
+def _mask_id_card(text: str) -> str:
+    return text[:12] + MASK * 6
+
+
+def _mask_phone(text: str) -> str:
+    return text[:3] + MASK * 4 + text[7:]
+
+
+def _mask_bank_card(text: str) -> str:
+    return text[:12] + MASK * 6 if luhn_verify(text) else text
+
+
+_BUILTIN_MASKS: Dict[str, Callable[[str], str]] = {
+    "email": _mask_email,
+    "id_card": _mask_id_card,
+    "phone": _mask_phone,
+    "bank_card": _mask_bank_card,
+}
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    字面量集合 -> 共享前缀的正则；终止节点用贪婪可选分支，优先命中最长的词
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _build(node: dict) -> str:
+        branches = [re.escape(ch) + _build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return _build(trie)
+
+
+def _split_pattern(pattern: str) -> Optional[Tuple[str, str, str]]:
+    """
+    "(?:[^X]|^)WORD[^X]" -> (左边界, 敏感词, 右边界)；不是该形式时返回 None（按字面量处理）
+    """
+    try:
+        start = pattern.index("^)") + 2
+        end = pattern.rfind("[^")
+    except ValueError:
+        return None
+    if start + 1 >= end:
+        return None
+    return pattern[:start], pattern[start:end], pattern[end:]
+
+
+def _left_lookbehind(left: str) -> str:
+    match = _LEFT_BOUNDARY.match(left)
+    if match:
+        # 零宽判断，不占用前一个字符，相邻规则仍可命中
+        return f"(?:^|(?<={match.group(1)}))"
+    return f"(?:{left})"
+
+
+def _is_lookbehind(left: str) -> bool:
+    return _LEFT_BOUNDARY.match(left) is not None
+
+
+class RedactionEngine:
+    """
+    预编译的脱敏引擎，同一组 sensitive_patterns 只编译一次（见 compile）
+    """
+    # 配置中的自定义敏感词（genie_config.sensitive_patterns），见 from_config / default
+    _sensitive_patterns: Dict[str, str] = {}
+
+    def __init__(self, sensitive_patterns: Optional[Dict[str, str]] = None):
+        parts: List[str] = []
+        self._handlers: Dict[str, Callable[[str], str]] = {}
+        for name, pattern in _BUILTIN_PATTERNS:
+            parts.append(f"(?P<{name}>{pattern})")
+            self._handlers[name] = _BUILTIN_MASKS[name]
+
+        # (左边界, 右边界) -> {敏感词: 替换文本}
+        literal_groups: Dict[Tuple[str, str], Dict[str, str]] = {}
+        regex_rules: List[Tuple[str, str, str, str]] = []
+        first_chars = set()
+        max_match = _BUILTIN_MAX_MATCH
+        # 左边界占用字符时命中起点不是敏感词首字符，不能做首字符预判
+        consuming_left = False
+        for pattern, replacement in (sensitive_patterns or {}).items():
+            if not pattern:
+                continue
+            split = _split_pattern(pattern)
+            if split is None:
+                literal_groups.setdefault(("", ""), {}).setdefault(pattern, replacement)
+                first_chars.add(pattern[0])
+                max_match = max(max_match, len(pattern))
+                continue
+            left, word, right = split
+            if re.escape(word) == word:
+                literal_groups.setdefault((left, right), {}).setdefault(word, replacement)
+                first_chars.add(word[0])
+                max_match = max(max_match, len(word))
+                consuming_left = consuming_left or not _is_lookbehind(left)
+            else:
+                regex_rules.append((left, word, right, replacement))
+
+        for index, ((left, right), mapping) in enumerate(literal_groups.items()):
+            name = f"_kw{index}"
+            body = f"(?P<{name}>{_trie_pattern(mapping)})"
+            if left:
+                body = _left_lookbehind(left) + body
+            if right:
+                body += f"(?={right})"
+            parts.append(body)
+            self._handlers[name] = mapping.__getitem__
+
+        for index, (left, word, right, replacement) in enumerate(regex_rules):
+            name = f"_re{index}"
+            parts.append(f"{_left_lookbehind(left)}(?P<{name}>{word})(?={right})")
+            self._handlers[name] = lambda text, _r=replacement: _r
+
+        pattern = "|".join(parts)
+        # 流式脱敏：命中起点（首字符集合）与最长命中长度（含右边界的一个字符）
+        self.first_chars: Optional[re.Pattern] = None
+        self.window = _UNBOUNDED_WINDOW
+        if not regex_rules and not consuming_left:
+            # 首字符预判：绝大多数位置只做一次字符集判断，不逐个尝试各分支
+            chars = "".join(re.escape(ch) for ch in sorted(first_chars))
+            first = f"[{_BUILTIN_FIRST_CHARS}{chars}]"
+            pattern = f"(?={first})(?:{pattern})"
+            self.first_chars = re.compile(first)
+            self.window = max_match + 1
+        self.pattern = re.compile(pattern)
+
+    @classmethod
+    def compile(cls, sensitive_patterns: Optional[Dict[str, str]] = None) -> "RedactionEngine":
+        return _compile_cached(tuple((sensitive_patterns or {}).items()))
+
+    @classmethod
+    def from_config(cls, genie_config) -> None:
+        cls._sensitive_patterns = dict(genie_config.sensitive_patterns or {})
+
+    @classmethod
+    def default(cls) -> "RedactionEngine":
+        """
+        内置规则 + 配置的自定义敏感词
+        """
+        return cls.compile(cls._sensitive_patterns)
+
+    def redact(self, content: str) -> str:
+        if not content:
+            return content
+        out: List[str] = []
+        pos = 0
+        handlers = self._handlers
+        for match in self.pattern.finditer(content):
+            name = match.lastgroup
+            start, end = match.span(name)
+            out.append(content[pos:start])
+            out.append(handlers[name](content[start:end]))
+            pos = end
+        if pos == 0:
+            return content
+        out.append(content[pos:])
+        return "".join(out)
+
+    def stream(self) -> "StreamingRedactor":
+        return StreamingRedactor(self)
+
+
+class StreamingRedactor:
+    """
+    流式脱敏：逐 chunk 输入，立即输出已能判定的安全前缀，只保留可能构成命中的尾部
+    - 尾部窗口为最长命中长度 + 1（右边界），且从窗口内第一个可能的命中首字符开始保留；
+      普通文本（无数字 / @ / 敏感词首字符）不产生延迟
+    - 邮箱的 @ 在域名字符结束前无法判定，最多保留 _EMAIL_WINDOW 个字符
+    - 已输出部分的最后一个字符作为左边界上下文保留，续扫时 lookbehind 与整串脱敏一致
+    输出拼接结果与 engine.redact(整串) 相同；流结束时必须调用 close() 取回剩余内容
+    """
+
+    __slots__ = ("engine", "_context", "_pending")
+
+    def __init__(self, engine: RedactionEngine):
+        self.engine = engine
+        self._context = ""
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        if not chunk:
+            return ""
+        text = self._context + self._pending + chunk
+        base = len(self._context)
+        limit = self._safe_limit(text, base)
+        if limit <= base:
+            self._pending = text[base:]
+            return ""
+        return self._emit(text, base, limit)
+
+    def close(self) -> str:
+        """
+        流结束：按真实结尾判定剩余内容
+        """
+        text = self._context + self._pending
+        base = len(self._context)
+        out = self._emit(text, base, len(text)) if len(text) > base else ""
+        self._context = self._pending = ""
+        return out
+
+    def _safe_limit(self, text: str, base: int) -> int:
+        """
+        [base, limit) 内开始的命中已可完整判定
+        """
+        engine = self.engine
+        end = len(text)
+        start = max(base, end - engine.window)
+        if engine.first_chars is None:
+            limit = start
+        else:
+            match = engine.first_chars.search(text, start)
+            limit = match.start() if match else end
+        at = text.rfind("@", max(base, end - _EMAIL_WINDOW), limit)
+        if at >= 0 and _DOMAIN_RUN.fullmatch(text, at + 1):
+            limit = at
+        return limit
+
+    def _emit(self, text: str, base: int, limit: int) -> str:
+        out: List[str] = []
+        pos = base
+        handlers = self.engine._handlers
+        for match in self.engine.pattern.finditer(text, base):
+            if match.start() >= limit:
+                break
+            name = match.lastgroup
+            start, end = match.span(name)
+            out.append(text[pos:start])
+            out.append(handlers[name](text[start:end]))
+            pos = end
+        cut = max(pos, limit)
+        out.append(text[pos:cut])
+        self._context = text[cut - 1:cut]
+        self._pending = text[cut:]
+        return "".join(out)
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(items: Tuple[Tuple[str, str], ...]) -> RedactionEngine:
+    return RedactionEngine(dict(items))
@@ -1,7 +1,7 @@
-import re
 import uuid
 import secrets
 from typing import Dict, Optional
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine, luhn_verify
 
 CHAR_LOWER = "abcdefghijklmnopqrstuvwxyz"
 NUMBER = "0123456789"
@@ -16,92 +16,18 @@ def generate_random_string(length: int) -> str:
     return "".join(secrets.choice(DATA_FOR_RANDOM_STRING) for _ in range(length))
 
 #银行卡 Luhn 校验（私有方法对齐）
-def _luhn_bank_card_verify(card_number: str) -> bool:
-    total = 0
-    alternate = False
+_luhn_bank_card_verify = luhn_verify
 
-    for ch in reversed(card_number):
-        digit = int(ch)
-        if alternate:
-            digit *= 2
-            if digit > 9:
-                digit -= 9
-        total += digit
-        alternate = not alternate
-
-    return total % 10 == 0
-
-#文本脱敏
+#文本脱敏：按 sensitive_patterns 取预编译引擎，单次扫描；未传入时使用配置的敏感词
 def text_desensitization(
     content: str,
-    sensitive_patterns_mapping: Dict[str, str],
+    sensitive_patterns_mapping: Optional[Dict[str, str]] = None,
 ) -> str:
     if not content:
         return content
-
-    # 邮箱脱敏（排除 @jd.com）
-    email_pattern = re.compile(r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}")
-    for match in email_pattern.finditer(content):
-        snippet = match.group()
-        if "@jd.com" in snippet:
-            continue
-        local, _, domain = snippet.partition("@")
-        content = content.replace(snippet, f"{local}＠{domain}")
-
-    # 身份证号脱敏
-    id_pattern = re.compile(
-        r"(?:[^\dA-Za-z_]|^)"
-        r"((?:[1-6][1-7]|50|71|81|82)\d{4}"
-        r"(?:19|20)\d{2}"
-        r"(?:0[1-9]|10|11|12)"
-        r"(?:[0-2][1-9]|10|20|30|31)"
-        r"\d{3}[0-9Xx])"
-        r"(?:[^\dA-Za-z_]|$)"
-    )
-    for match in id_pattern.finditer(content):
-        snippet = match.group(1)
-        content = content.replace(snippet, snippet[:12] + "✿✿✿✿✿✿")
-
-    # 手机号脱敏
-    phone_pattern = re.compile(r"(?:[^\dA-Za-z_]|^)(1[3456789]\d{9})(?:[^\dA-Za-z_]|$)")
-    for match in phone_pattern.finditer(content):
-        snippet = match.group(1)
-        content = content.replace(snippet, snippet[:3] + "✿✿✿✿" + snippet[7:])
-
-    # 银行卡脱敏（+ Luhn 校验）
-    bankcard_pattern = re.compile(r"(?:[^\dA-Za-z_]|^)(62(?:\d{14}|\d{17}))(?:[^\dA-Za-z_]|$)")
-    for match in bankcard_pattern.finditer(content):
-        snippet = match.group(1)
-        if _luhn_bank_card_verify(snippet):
-            content = content.replace(snippet, snippet[:12] + "✿✿✿✿✿✿")
-
-    # 密码 / 自定义敏感词脱敏
-    for pattern, word_mapping in sensitive_patterns_mapping.items():
-        try:
-            start = pattern.index("^)") + 2
-            end = pattern.rfind("[^")
-        except ValueError:
-            content = content.replace(pattern, word_mapping)
-            continue
-
-        if start + 1 < end:
-            sensitive_word = pattern[start:end]
-            compiled = re.compile(pattern)
-
-            for match in compiled.finditer(content):
-                snippet = match.group()
-                if content.startswith(sensitive_word):
-                    content = content.replace(
-                        snippet, word_mapping + snippet[-1]
-                    )
-                else:
-                    content = content.replace(
-                        snippet, snippet[0] + word_mapping + snippet[-1]
-                    )
-        else:
-            content = content.replace(pattern, word_mapping)
-
-    return content
+    if sensitive_patterns_mapping is None:
+        return RedactionEngine.default().redact(content)
+    return RedactionEngine.compile(sensitive_patterns_mapping).redact(content)
 
 #特殊字符移除
 def remove_special_chars(input_str: Optional[str]) -> str:
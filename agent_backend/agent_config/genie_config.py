@@ -75,6 +75,9 @@ class GenieConfig:
     executor_max_steps: int = 40
     react_max_steps: int = 40
 
+    # ========= Task Concurrency =========
+    task_max_parallel: int = 5  # 相互独立的 task 最大并发数
+
     max_observe: str = "10000"
 
     # ========= URLs =========
@@ -93,6 +96,8 @@ class GenieConfig:
     sensitive_patterns: Dict[str, str] = field(default_factory=dict)
     output_style_prompts: Dict[str, str] = field(default_factory=dict)
     message_interval: Dict[str, str] = field(default_factory=dict)
+    # message_type -> "窗口毫秒,最大字节数"，流式增量按此合并后下发，如 {"agent_stream": "100,1024"}
+    stream_coalesce: Dict[str, str] = field(default_factory=dict)
 
     struct_parse_tool_system_prompt: str = ""
 
@@ -104,6 +109,70 @@ class GenieConfig:
 
     task_complete_desc: str = "当前task完成，请将当前task标记为 completed"
 
+    # ========= Checkpoint =========
+    checkpoint_db_path: str = ""  # 为空表示不开启断点续跑
+
+    # ========= Memory Spill =========
+    memory_spill_db_path: str = ""  # 为空表示消息全部常驻内存
+    memory_hot_window: int = 20
+    memory_spill_min_bytes: int = 2048
+
+    # ========= Session Store =========
+    session_max_bytes: int = 256 * 1024 * 1024
+    session_tool_cache_ttl: int = 0  # 秒，0 表示不缓存工具结果
+    session_cacheable_tools: List[str] = field(default_factory=list)  # 允许缓存结果的幂等工具名
+    session_db_path: str = ""  # 为空表示会话只保存在内存
+
+    # ========= Request Budget（0 表示不限制） =========
+    budget_max_total_tokens: int = 0
+    budget_max_wall_time: float = 0  # 秒
+    budget_max_tool_calls: int = 0
+    budget_max_cost: float = 0
+    budget_cost_per_1k_tokens: float = 0.0
+    budget_degrade_ratio: float = 0.8  # 用量达到该比例后只做总结
+
+    # ========= Gateway =========
+    gateway_max_concurrency: int = 32  # 单 worker 同时执行的请求数
+    gateway_max_queue: int = 256  # 排队上限，超出返回 429
+    gateway_priority_map: Dict[str, int] = field(default_factory=dict)  # erp/租户 -> 优先级（越小越先），"default" 为缺省
+    gateway_drain_timeout: float = 30  # 优雅下线等待秒数
+    gateway_replay_buffer_size: int = 1000  # 单请求保留的 SSE 事件数（断线重连补发）
+    gateway_replay_retention: float = 60  # 请求结束后事件保留秒数
+    gateway_reconnect_grace: float = 10  # 客户端断开后等待重连的秒数，超时取消 Agent；0 为立即取消
+
+    # ========= Async Printer =========
+    printer_queue_size: int = 1000  # 单请求输出队列上限
+    printer_overflow_policy: str = "coalesce"  # coalesce / drop_partial / block
+    plan_patch_enable: bool = False  # 请求未声明 planPatch 时是否以 plan_patch 增量下发计划（需全部前端支持）
+
+    # ========= Tracing =========
+    trace_file: str = ""  # span 导出文件，为空时关闭追踪
+    trace_format: str = "jsonl"  # jsonl / chrome
+    trace_sample_rate: float = 1.0  # 按请求采样比例
+
+    # ========= Logging =========
+    log_payload_max_chars: int = 2000  # 日志中单个 payload 字段的最大字符数
+    log_payload_sample_rate: float = 1.0  # 输出完整 payload 的比例，其余只记录类型与长度
+    log_async: bool = False  # root logger 改为 QueueHandler，由后台线程写出
+
+    # ========= MCP =========
+    mcp_direct: bool = False  # 直连 MCP 服务（streamable HTTP 会话），不经 mcp_client_url 代理
+    mcp_timeout: float = 30  # MCP 请求超时（秒）
+    mcp_max_connections: int = 100  # 共享连接池的连接上限
+    mcp_per_host_limit: int = 32  # 单个 MCP 服务 / 代理的并发请求上限
+    mcp_catalog_ttl: float = 300  # 工具目录刷新间隔（秒）
+    mcp_discovery_timeout: float = 5  # 启动时等待工具发现的最长时间（秒），超时的服务在后台继续发现
+    mcp_batch_enable: bool = True  # 直连时合并同一服务的并发 tools/call 为 JSON-RPC 批量请求
+    mcp_batch_window_ms: float = 2  # 合并窗口（毫秒），0 表示只合并同一轮事件循环内的调用
+
+    # ========= Circuit Breaker（按 MCP 服务 / 工具服务 URL）=========
+    breaker_window: float = 30  # 统计窗口（秒）
+    breaker_min_calls: int = 10  # 窗口内至少多少次调用才判断是否熔断
+    breaker_error_rate: float = 0.5  # 失败率阈值
+    breaker_slow_call_seconds: float = 10  # 慢调用耗时阈值（秒）
+    breaker_slow_rate: float = 0.8  # 慢调用率阈值
+    breaker_open_seconds: float = 15  # 熔断持续时间（秒），之后放行一个探测请求
+
     # =====================================================
     # 加载入口（对齐 Spring @Value）
     # =====================================================
@@ -176,5 +245,99 @@ class GenieConfig:
         cfg.message_interval = _load_json_map(
             os.getenv("AUTOBOTS_AUTOAGENT_MESSAGE_INTERVAL", ""), {}
         )
+        cfg.stream_coalesce = _load_json_map(
+            os.getenv("AUTOBOTS_AUTOAGENT_STREAM_COALESCE", ""), {}
+        )
+
+        # -------- Task Concurrency --------
+        cfg.task_max_parallel = int(os.getenv("AUTOBOTS_AUTOAGENT_TASK_MAX_PARALLEL", "5"))
+
+        # -------- Checkpoint --------
+        cfg.checkpoint_db_path = os.getenv("AUTOBOTS_AUTOAGENT_CHECKPOINT_DB_PATH", "")
+
+        # -------- Memory Spill --------
+        cfg.memory_spill_db_path = os.getenv("AUTOBOTS_AUTOAGENT_MEMORY_SPILL_DB_PATH", "")
+        cfg.memory_hot_window = int(os.getenv("AUTOBOTS_AUTOAGENT_MEMORY_HOT_WINDOW", "20"))
+        cfg.memory_spill_min_bytes = int(
+            os.getenv("AUTOBOTS_AUTOAGENT_MEMORY_SPILL_MIN_BYTES", "2048")
+        )
+
+        # -------- Session Store --------
+        cfg.session_max_bytes = int(
+            os.getenv("AUTOBOTS_AUTOAGENT_SESSION_MAX_BYTES", str(256 * 1024 * 1024))
+        )
+        cfg.session_tool_cache_ttl = int(os.getenv("AUTOBOTS_AUTOAGENT_SESSION_TOOL_CACHE_TTL", "0"))
+        cfg.session_cacheable_tools = [
+            name.strip()
+            for name in os.getenv("AUTOBOTS_AUTOAGENT_SESSION_CACHEABLE_TOOLS", "").split(",")
+            if name.strip()
+        ]
+        cfg.session_db_path = os.getenv("AUTOBOTS_AUTOAGENT_SESSION_DB_PATH", "")
+
+        # -------- Request Budget --------
+        cfg.budget_max_total_tokens = int(os.getenv("AUTOBOTS_AUTOAGENT_BUDGET_MAX_TOTAL_TOKENS", "0"))
+        cfg.budget_max_wall_time = float(os.getenv("AUTOBOTS_AUTOAGENT_BUDGET_MAX_WALL_TIME", "0"))
+        cfg.budget_max_tool_calls = int(os.getenv("AUTOBOTS_AUTOAGENT_BUDGET_MAX_TOOL_CALLS", "0"))
+        cfg.budget_max_cost = float(os.getenv("AUTOBOTS_AUTOAGENT_BUDGET_MAX_COST", "0"))
+        cfg.budget_cost_per_1k_tokens = float(
+            os.getenv("AUTOBOTS_AUTOAGENT_BUDGET_COST_PER_1K_TOKENS", "0")
+        )
+        cfg.budget_degrade_ratio = float(os.getenv("AUTOBOTS_AUTOAGENT_BUDGET_DEGRADE_RATIO", "0.8"))
+
+        # -------- Gateway --------
+        cfg.gateway_max_concurrency = int(os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_MAX_CONCURRENCY", "32"))
+        cfg.gateway_max_queue = int(os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_MAX_QUEUE", "256"))
+        cfg.gateway_priority_map = _load_json_map(
+            os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_PRIORITY", ""), {}
+        )
+        cfg.gateway_drain_timeout = float(os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_DRAIN_TIMEOUT", "30"))
+        cfg.gateway_replay_buffer_size = int(
+            os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_REPLAY_BUFFER_SIZE", "1000")
+        )
+        cfg.gateway_replay_retention = float(
+            os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_REPLAY_RETENTION", "60")
+        )
+        cfg.gateway_reconnect_grace = float(
+            os.getenv("AUTOBOTS_AUTOAGENT_GATEWAY_RECONNECT_GRACE", "10")
+        )
+
+        # -------- Async Printer --------
+        cfg.printer_queue_size = int(os.getenv("AUTOBOTS_AUTOAGENT_PRINTER_QUEUE_SIZE", "1000"))
+        cfg.printer_overflow_policy = os.getenv("AUTOBOTS_AUTOAGENT_PRINTER_OVERFLOW_POLICY", "coalesce")
+        cfg.plan_patch_enable = os.getenv("AUTOBOTS_AUTOAGENT_PLAN_PATCH_ENABLE", "false").lower() == "true"
+
+        # -------- Tracing --------
+        cfg.trace_file = os.getenv("AUTOBOTS_AUTOAGENT_TRACE_FILE", "")
+        cfg.trace_format = os.getenv("AUTOBOTS_AUTOAGENT_TRACE_FORMAT", "jsonl")
+        cfg.trace_sample_rate = float(os.getenv("AUTOBOTS_AUTOAGENT_TRACE_SAMPLE_RATE", "1.0"))
+
+        # -------- Logging --------
+        cfg.log_payload_max_chars = int(os.getenv("AUTOBOTS_AUTOAGENT_LOG_PAYLOAD_MAX_CHARS", "2000"))
+        cfg.log_payload_sample_rate = float(
+            os.getenv("AUTOBOTS_AUTOAGENT_LOG_PAYLOAD_SAMPLE_RATE", "1.0")
+        )
+        cfg.log_async = os.getenv("AUTOBOTS_AUTOAGENT_LOG_ASYNC", "false").lower() == "true"
+
+        # -------- MCP --------
+        cfg.mcp_client_url = os.getenv("AUTOBOTS_AUTOAGENT_MCP_CLIENT_URL", "")
+        cfg.mcp_server_url_arr = [
+            url.strip() for url in os.getenv("AUTOBOTS_AUTOAGENT_MCP_SERVER_URL", "").split(",") if url.strip()
+        ]
+        cfg.mcp_direct = os.getenv("AUTOBOTS_AUTOAGENT_MCP_DIRECT", "false").lower() == "true"
+        cfg.mcp_timeout = float(os.getenv("AUTOBOTS_AUTOAGENT_MCP_TIMEOUT", "30"))
+        cfg.mcp_max_connections = int(os.getenv("AUTOBOTS_AUTOAGENT_MCP_MAX_CONNECTIONS", "100"))
+        cfg.mcp_per_host_limit = int(os.getenv("AUTOBOTS_AUTOAGENT_MCP_PER_HOST_LIMIT", "32"))
+        cfg.mcp_catalog_ttl = float(os.getenv("AUTOBOTS_AUTOAGENT_MCP_CATALOG_TTL", "300"))
+        cfg.mcp_discovery_timeout = float(os.getenv("AUTOBOTS_AUTOAGENT_MCP_DISCOVERY_TIMEOUT", "5"))
+        cfg.mcp_batch_enable = os.getenv("AUTOBOTS_AUTOAGENT_MCP_BATCH_ENABLE", "true").lower() == "true"
+        cfg.mcp_batch_window_ms = float(os.getenv("AUTOBOTS_AUTOAGENT_MCP_BATCH_WINDOW_MS", "2"))
+
+        # -------- Circuit Breaker --------
+        cfg.breaker_window = float(os.getenv("AUTOBOTS_AUTOAGENT_BREAKER_WINDOW", "30"))
+        cfg.breaker_min_calls = int(os.getenv("AUTOBOTS_AUTOAGENT_BREAKER_MIN_CALLS", "10"))
+        cfg.breaker_error_rate = float(os.getenv("AUTOBOTS_AUTOAGENT_BREAKER_ERROR_RATE", "0.5"))
+        cfg.breaker_slow_call_seconds = float(os.getenv("AUTOBOTS_AUTOAGENT_BREAKER_SLOW_CALL_SECONDS", "10"))
+        cfg.breaker_slow_rate = float(os.getenv("AUTOBOTS_AUTOAGENT_BREAKER_SLOW_RATE", "0.8"))
+        cfg.breaker_open_seconds = float(os.getenv("AUTOBOTS_AUTOAGENT_BREAKER_OPEN_SECONDS", "15"))
 
         return cfg
@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+
+class AdmissionRejected(Exception):
+    """
+    准入拒绝：队列已满（429）或网关正在下线（503）
+    """
+
+    def __init__(self, status: int, reason: str, queue_position: int = 0, retry_after: float = 0):
+        self.status = status
+        self.reason = reason
+        self.queue_position = queue_position
+        self.retry_after = retry_after
+        super().__init__(f"{status} {reason}")
+
+
+class AdmissionController:
+    """
+    单 worker 的准入控制
+    - 最多 max_concurrency 个请求同时执行
+    - 超出的请求进入优先级队列（priority 越小越先执行，同优先级 FIFO），最多 max_queue 个
+    - 队列满时立即拒绝（429），附带队列位置与预计等待时间
+    - drain() 后拒绝新请求（503），等待在途请求全部结束
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 256):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # 请求平均占用时长（EWMA，秒），用于估算 Retry-After
+        self._avg_hold = 1.0
+
+    # =============================
+    # 状态
+    # =============================
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "maxConcurrency": self.max_concurrency,
+            "maxQueue": self.max_queue,
+            "draining": self._draining,
+        }
+
+    def estimate_wait(self, position: int) -> float:
+        return round(self._avg_hold * max(position, 1) / self.max_concurrency, 1)
+
+    # =============================
+    # 准入
+    # =============================
+    async def acquire(
+        self,
+        priority: int = 0,
+        on_queued: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        """
+        获取执行名额，排队时通过 on_queued 回调告知队列位置（从 1 开始）
+        """
+        if self._draining:
+            raise AdmissionRejected(503, "draining")
+        if self._active < self.max_concurrency and not self._waiters:
+            self._grant()
+            return
+        if len(self._waiters) >= self.max_queue:
+            position = len(self._waiters) + 1
+            raise AdmissionRejected(429, "queue full", position, self.estimate_wait(position))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+        if on_queued is not None:
+            on_queued(self._position(entry))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已移交但调用方已取消，归还给下一个
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _position(self, entry: list) -> int:
+        key = (entry[0], entry[1])
+        return 1 + sum(1 for other in self._waiters if (other[0], other[1]) < key)
+
+    def _grant(self) -> None:
+        self._active += 1
+        self._idle.clear()
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # 名额直接移交，active 不变
+                future.set_result(None)
+                return
+        self._active -= 1
+        if self._active == 0:
+            self._idle.set()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: int = 0,
+        on_queued: Optional[Callable[[int], None]] = None,
+    ):
+        await self.acquire(priority, on_queued)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    # =============================
+    # 下线
+    # =============================
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        停止接收新请求并等待在途 / 排队请求完成
+        :return: 超时前全部完成返回 True
+        """
+        self._draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -0,0 +1,491 @@
+import asyncio
+import json
+import logging
+import signal
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+from agent_backend.agent.agent_core.agent_budget import AgentBudget
+from agent_backend.agent.agent_core.agent_checkpoint import SqliteCheckpointer
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.agent_prototype import AgentPrototypeRegistry
+from agent_backend.agent.agent_core.cancel_token import CancelToken
+from agent_backend.agent.agent_core.session_store import SessionStore
+from agent_backend.agent.agent_enums.agent_type import AgentType
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError, SessionConflictError
+from agent_backend.agent.agent_llms.llm import LLMClient
+from agent_backend.agent.agent_schema.memory_spill import MessageSpillStore
+from agent_backend.agent.agent_tools.mcp.mcp_catalog import McpToolCatalog
+from agent_backend.agent.agent_tools.mcp.mcp_client import McpClient
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_tracing.async_printer import AsyncPrinter, OverflowPolicy
+from agent_backend.agent.agent_tracing.coalescing_printer import CoalescingPrinter
+from agent_backend.agent.agent_tracing.printer import Printer
+from agent_backend.agent.agent_tracing.sse_printer import SSEPrinter
+from agent_backend.agent.agent_tracing.tracer import Tracer
+from agent_backend.agent.agent_util.circuit_breaker import CircuitBreakerRegistry
+from agent_backend.agent.agent_util.log_util import LogUtil
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine
+from agent_backend.agent_config.genie_config import GenieConfig
+from agent_backend.agent_gateway.admission import AdmissionController, AdmissionRejected
+from agent_backend.agent_gateway.replay_buffer import ReplayRegistry, ReplayStream
+from agent_backend.agent_gateway.sse_emitter import SSEEmitter
+from agent_backend.agent_model.req.agent_request import AgentRequest
+
+logger = logging.getLogger(__name__)
+
+# 执行一次 AgentRequest，通过 printer 推送 AgentResponse；客户端断开时 cancel_token 被触发
+AgentRunner = Callable[[AgentRequest, Printer, CancelToken], Awaitable[Any]]
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 411: "Length Required",
+           413: "Payload Too Large", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+
+async def read_http_request(reader: asyncio.StreamReader) -> HttpRequest:
+    """
+    解析 HTTP/1.1 请求（仅支持 Content-Length 形式的 body）
+    """
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    parts = request_line.split()
+    if len(parts) < 2:
+        raise ValueError(f"bad request line: {request_line!r}")
+    headers: Dict[str, str] = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = b""
+    length = int(headers.get("content-length", "0") or 0)
+    if length > MAX_BODY_BYTES:
+        raise OverflowError(length)
+    if length:
+        body = await reader.readexactly(length)
+    return HttpRequest(method=parts[0].upper(), path=parts[1].split("?", 1)[0], headers=headers, body=body)
+
+
+def _response_head(status: int, content_type: str, extra: Optional[Dict[str, str]] = None) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+             "Cache-Control: no-cache", "Connection: close"]
+    for name, value in (extra or {}).items():
+        lines.append(f"{name}: {value}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _last_event_id(http_request: HttpRequest) -> Optional[int]:
+    try:
+        return int(http_request.headers.get("last-event-id", ""))
+    except ValueError:
+        return None
+
+
+async def _write_json(writer: asyncio.StreamWriter, status: int, data: Dict[str, Any],
+                      extra: Optional[Dict[str, str]] = None) -> None:
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Length": str(len(body))}
+    headers.update(extra or {})
+    writer.write(_response_head(status, "application/json; charset=utf-8", headers) + body)
+    await writer.drain()
+
+
+class AgentGateway:
+    """
+    asyncio HTTP / SSE 网关
+    POST {path}  body 为 AgentRequest（驼峰 / 下划线字段均可），响应为 AgentResponse SSE 流
+                 携带 Last-Event-ID 且 erp / query 与原请求一致时视为重连：不重复执行，补发后接回实时流；
+                 requestId 仍在使用中的其它请求返回 409；
+                 sessionId 属于其它 erp 或该会话已有请求在执行时返回 409
+    GET  /health 返回准入状态
+    """
+
+    def __init__(
+        self,
+        runner: AgentRunner,
+        admission: Optional[AdmissionController] = None,
+        priority_fn: Optional[Callable[[AgentRequest], int]] = None,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/AutoAgent",
+        printer_queue_size: int = 1000,
+        printer_overflow_policy: OverflowPolicy = OverflowPolicy.COALESCE,
+        stream_coalesce: Optional[Dict[str, str]] = None,
+        plan_patch: bool = False,
+        replay: Optional[ReplayRegistry] = None,
+        mcp_catalog: Optional[McpToolCatalog] = None,
+    ):
+        self.runner = runner
+        self.mcp_catalog = mcp_catalog
+        self.replay = replay if replay is not None else ReplayRegistry()
+        self.plan_patch = plan_patch
+        self.stream_coalesce = stream_coalesce or {}
+        self.printer_queue_size = printer_queue_size
+        self.printer_overflow_policy = printer_overflow_policy
+        self.admission = admission or AdmissionController()
+        self.priority_fn = priority_fn or (lambda request: 0)
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @classmethod
+    def from_config(
+        cls,
+        genie_config: GenieConfig,
+        runner: AgentRunner,
+        tools: Optional[ToolCollection] = None,
+        **kwargs,
+    ) -> "AgentGateway":
+        """
+        tools: 原型共享的工具模板；AgentPrototypeRegistry 中已注册的原型在此构建
+        """
+        Tracer.from_config(genie_config)
+        LogUtil.from_config(genie_config)
+        McpClient.from_config(genie_config)
+        CircuitBreakerRegistry.from_config(genie_config)
+        RedactionEngine.from_config(genie_config)
+        MessageSpillStore.from_config(genie_config)
+        SessionStore.from_config(genie_config)
+        kwargs.setdefault("mcp_catalog", McpToolCatalog.from_config(genie_config))
+        AgentPrototypeRegistry.build(genie_config, tools if tools is not None else ToolCollection())
+        priority_map = genie_config.gateway_priority_map
+        default_priority = int(priority_map.get("default", 0))
+        return cls(
+            runner=runner,
+            admission=AdmissionController(genie_config.gateway_max_concurrency, genie_config.gateway_max_queue),
+            priority_fn=lambda request: int(priority_map.get(request.erp or "", default_priority)),
+            printer_queue_size=genie_config.printer_queue_size,
+            printer_overflow_policy=OverflowPolicy.from_value(genie_config.printer_overflow_policy),
+            stream_coalesce=genie_config.stream_coalesce,
+            plan_patch=genie_config.plan_patch_enable,
+            replay=ReplayRegistry(
+                genie_config.gateway_replay_buffer_size,
+                genie_config.gateway_replay_retention,
+                genie_config.gateway_reconnect_grace,
+            ),
+            **kwargs,
+        )
+
+    @staticmethod
+    def reload(genie_config: GenieConfig) -> None:
+        """
+        配置重载：按新配置重建 Agent 原型（prompt / max_steps 等），之后的请求使用新原型
+        """
+        AgentPrototypeRegistry.reload(genie_config)
+        logger.info("agent prototypes rebuilt")
+
+    # =============================
+    # 生命周期
+    # =============================
+    async def start(self) -> None:
+        if self.mcp_catalog is not None:
+            # 最多等待 discovery_timeout，慢服务在后台继续发现
+            await self.mcp_catalog.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info("agent gateway listening on %s:%s%s", self.host, self.port, self.path)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        优雅下线：停止监听，拒绝新请求，等待在途请求结束
+        """
+        if self._server is not None:
+            self._server.close()
+        drained = await self.admission.drain(timeout)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self.mcp_catalog is not None:
+            await self.mcp_catalog.stop()
+        logger.info("agent gateway drained: %s", drained)
+        return drained
+
+    # =============================
+    # 请求处理
+    # =============================
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                http_request = await read_http_request(reader)
+            except OverflowError:
+                await _write_json(writer, 413, {"code": 413, "message": "body too large"})
+                return
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                await _write_json(writer, 400, {"code": 400, "message": str(e)})
+                return
+
+            if http_request.method == "GET" and http_request.path == "/health":
+                health = self.admission.stats()
+                if self.mcp_catalog is not None:
+                    health["mcpCatalog"] = self.mcp_catalog.freshness()
+                health["circuitBreakers"] = CircuitBreakerRegistry.metrics()
+                await _write_json(writer, 200, health)
+            elif http_request.method == "POST" and http_request.path == self.path:
+                await self._handle_agent(http_request, reader, writer)
+            else:
+                await _write_json(writer, 404, {"code": 404, "message": "not found"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            logger.info("agent gateway client disconnected")
+        except Exception as e:
+            logger.error("agent gateway handle error", exc_info=e)
+        finally:
+            if not writer.is_closing():
+                writer.close()
+
+    async def _handle_agent(
+        self,
+        http_request: HttpRequest,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            request = AgentRequest.from_dict(json.loads(http_request.body or b"{}"))
+        except (ValueError, TypeError) as e:
+            await _write_json(writer, 400, {"code": 400, "message": f"invalid AgentRequest: {e}"})
+            return
+        if not request.request_id:
+            request.request_id = str(uuid.uuid4())
+
+        origin = (request.erp, request.query)
+        stream = self.replay.get(request.request_id)
+        if stream is not None:
+            last_event_id = _last_event_id(http_request)
+            # 只有原请求的断线重连才能接回：新请求复用 requestId 不会拿到旧输出，也不能接管他人的流
+            if last_event_id is None or stream.origin != origin:
+                await _write_json(writer, 409, {"code": 409, "message": "requestId already in use"})
+                return
+            if stream.attached:
+                await _write_json(writer, 409, {"code": 409, "message": "stream already attached"},
+                                  {"Retry-After": "1"})
+                return
+            await self._resume(stream, last_event_id, reader, writer)
+            return
+
+        # 会话只能由创建它的用户使用，且同一会话同时只运行一个请求
+        session_store = SessionStore.get_default()
+        if request.session_id and session_store is not None:
+            try:
+                session_store.check_access(request.session_id, request.erp)
+            except SessionConflictError as e:
+                await _write_json(writer, 409, {"code": 409, "message": str(e)})
+                return
+
+        # 客户端断开且 reconnect_grace 内未重连 -> 取消排队 / 执行中的 Agent，连同其 LLM 与工具调用
+        cancel_token = CancelToken()
+        stream = self.replay.open(
+            request.request_id, lambda: cancel_token.cancel("client disconnected"), origin
+        )
+        emitter = SSEEmitter(writer, on_disconnect=lambda: stream.detach(emitter))
+        stream.attach(emitter)
+        work = asyncio.create_task(self._admit_and_run(request, writer, stream, cancel_token))
+        remove_callback = cancel_token.bind_task(work)
+        watcher = asyncio.create_task(self._watch_disconnect(reader, emitter))
+        finished = False
+        try:
+            finished = await work
+        except (asyncio.CancelledError, AgentCancelledError):
+            current = asyncio.current_task()
+            if not cancel_token.cancelled or (current is not None and current.cancelling()):
+                raise
+            logger.info("%s agent cancelled: %s", request.request_id, cancel_token.reason)
+        finally:
+            remove_callback()
+            watcher.cancel()
+            # 只保留正常结束的输出；被拒绝 / 取消的请求重试时重新执行
+            self.replay.close(stream, retain=finished)
+
+    async def _resume(
+        self,
+        stream: ReplayStream,
+        last_event_id: Optional[int],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        writer.write(_response_head(200, "text/event-stream; charset=utf-8"))
+        emitter = SSEEmitter(writer, on_disconnect=lambda: stream.detach(emitter))
+        replayed = stream.attach(emitter, last_event_id)
+        logger.info(
+            "%s sse resumed after event %s, replayed %s", stream.request_id, last_event_id, replayed
+        )
+        watcher = asyncio.create_task(self._watch_disconnect(reader, emitter))
+        try:
+            await emitter.flush()
+            await emitter.wait_closed()
+        finally:
+            watcher.cancel()
+
+    @staticmethod
+    async def _watch_disconnect(reader: asyncio.StreamReader, emitter: SSEEmitter) -> None:
+        """
+        请求体已读完，之后读到 EOF 即客户端关闭了连接
+        """
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        if not emitter.closed:
+            emitter.mark_disconnected()
+
+    async def _admit_and_run(
+        self,
+        request: AgentRequest,
+        writer: asyncio.StreamWriter,
+        stream: ReplayStream,
+        cancel_token: CancelToken,
+    ) -> bool:
+        """
+        :return: True 表示 Agent 已执行结束（未被拒绝）
+        """
+        headers_sent = False
+
+        def _send_headers() -> None:
+            nonlocal headers_sent
+            if not headers_sent:
+                writer.write(_response_head(200, "text/event-stream; charset=utf-8"))
+                headers_sent = True
+
+        def _on_queued(position: int) -> None:
+            # 排队时先建立 SSE 流，告知队列位置
+            _send_headers()
+            stream.comment(f"queued position={position}")
+
+        # 根 span：AsyncPrinter 写出 task 在其中创建，printer.flush 与 agent.run 同属一个 trace
+        with Tracer.span("gateway.request", request_id=request.request_id, agent_type=request.agent_type):
+            try:
+                slot = self.admission.slot(self.priority_fn(request), _on_queued)
+                async with slot:
+                    _send_headers()
+                    # Agent -> 增量合并 -> 入队；序列化与写 socket 由 AsyncPrinter 的写出 task 完成
+                    # plan_patch 需要客户端支持：请求 planPatch 字段优先，未声明时按服务端配置
+                    plan_patch = self.plan_patch if request.plan_patch is None else bool(request.plan_patch)
+                    sse_printer = SSEPrinter(stream, request, request.agent_type, plan_patch)
+                    # 重连补发有缺口时（plan_patch 的基准已被淘汰）重发完整计划
+                    stream.on_gap = sse_printer.send_plan_snapshot
+                    async_printer = AsyncPrinter(
+                        sse_printer,
+                        self.printer_queue_size,
+                        self.printer_overflow_policy,
+                    ).start()
+                    printer = CoalescingPrinter.wrap(async_printer, self.stream_coalesce)
+                    started = time.monotonic()
+                    try:
+                        await self.runner(request, printer, cancel_token)
+                    except AgentCancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error("%s agent run failed", request.request_id, exc_info=e)
+                    finally:
+                        if printer is not async_printer:
+                            printer.flush()
+                        await async_printer.aclose()
+                        logger.info(
+                            "%s agent finished in %sms %s",
+                            request.request_id,
+                            int((time.monotonic() - started) * 1000),
+                            async_printer.metrics(),
+                        )
+                return True
+            except AdmissionRejected as e:
+                if headers_sent:
+                    stream.comment(f"rejected {e.status}")
+                    stream.complete()
+                    return False
+                await _write_json(
+                    writer,
+                    e.status,
+                    {"code": e.status, "message": e.reason, "queuePosition": e.queue_position,
+                     "retryAfter": e.retry_after},
+                    {"Retry-After": str(max(1, int(e.retry_after + 0.5)))},
+                )
+                return False
+
+
+def prototype_runner(
+    genie_config: GenieConfig,
+    llm_factory: Callable[[AgentRequest], LLMClient],
+    mcp_catalog: Optional[McpToolCatalog] = None,
+) -> AgentRunner:
+    """
+    默认执行方式：按 agent_type 从 AgentPrototypeRegistry 克隆 Agent 执行，最终结果以 result 消息推送
+    各 agent_type 的原型需在 AgentGateway.from_config 之前 register()，由 from_config 统一构建
+    mcp_catalog: 工具集追加目录中的 MCP 工具（内存中派生，不逐请求发现）
+    配置了 checkpoint_db_path 时开启断点续跑：同一 requestId 重试（可在其它 worker 上）从最近完成的 step 继续
+    请求带 sessionId 时从 SessionStore 默认实例取会话：装载历轮对话，结束后追加本轮问答；
+    会话归属首次使用它的 erp，同一会话同时只运行一个请求
+    """
+    checkpointer = SqliteCheckpointer.from_config(genie_config)
+
+    async def _run(request: AgentRequest, printer: Printer, cancel_token: CancelToken) -> str:
+        context = AgentContext(
+            request_id=request.request_id,
+            query=request.query,
+            agent_type=request.agent_type,
+            printer=printer,
+            is_stream=bool(request.is_stream),
+            sop_prompt=request.sop_prompt,
+            base_prompt=request.base_prompt,
+            checkpointer=checkpointer,
+            budget=AgentBudget.from_config(genie_config),
+            cancel_token=cancel_token,
+        )
+        session_store = SessionStore.get_default()
+        if session_store is not None and request.session_id:
+            context.session_id = request.session_id
+            # 排队期间被其它请求占用时抛出 SessionConflictError
+            context.session = session_store.get_or_create(request.session_id, owner=request.erp, exclusive=True)
+        agent_type = AgentType.from_code(request.agent_type)
+        if mcp_catalog is not None:
+            context.tool_collection = mcp_catalog.extend(AgentPrototypeRegistry.get(agent_type).tools).fork()
+        agent = AgentPrototypeRegistry.clone(
+            agent_type,
+            context,
+            llm_factory(request),
+            query=request.query or "",
+            sopPrompt=request.sop_prompt or "",
+            basePrompt=request.base_prompt or "",
+        )
+        try:
+            result = await agent.run(request.query or "")
+            if context.session is not None:
+                context.session.append_turn(request.query, result)
+        finally:
+            if context.session is not None:
+                session_store.release(context.session)
+        printer.send_simple("result", result)
+        return result
+
+    return _run
+
+
+async def serve(gateway: AgentGateway, drain_timeout: float = 30) -> None:
+    """
+    启动网关直到收到 SIGTERM / SIGINT，随后优雅下线
+    """
+    await gateway.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    await stop.wait()
+    await gateway.drain(drain_timeout)
+    await McpClient.aclose()
+    session_store = SessionStore.get_default()
+    if session_store is not None:
+        session_store.flush()
+    Tracer.flush()
+    LogUtil.shutdown()
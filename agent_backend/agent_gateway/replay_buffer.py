@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from agent_backend.agent_gateway.sse_emitter import SSEEmitter
+from agent_backend.agent_model.response import agent_response_codec
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayStream:
+    """
+    单个请求的 SSE 事件流
+    每帧分配单调递增的 event id，序列化结果保存在有界环形缓冲中，同时写给当前连接
+    连接断开后 Agent 继续执行并缓冲输出；reconnect_grace 秒内无客户端接回则触发 on_abandoned（取消 Agent）
+    客户端携带 Last-Event-ID 重连时，只补发缺失的事件，随后接回实时流
+    origin 记录发起请求的 (erp, query)，重连请求需与之一致
+    提供 SSEPrinter 所需的 send / comment / flush / complete
+    """
+
+    def __init__(
+        self,
+        request_id: str,
+        max_events: int = 1000,
+        reconnect_grace: float = 0,
+        on_abandoned: Optional[Callable[[], None]] = None,
+        origin: Optional[Tuple[Optional[str], Optional[str]]] = None,
+    ):
+        self.request_id = request_id
+        self.origin = origin
+        self.reconnect_grace = reconnect_grace
+        self.on_abandoned = on_abandoned
+        # 补发存在缺口（所需事件已被环形缓冲淘汰）时回调，如重发完整计划
+        self.on_gap: Optional[Callable[[], None]] = None
+        self.emitter: Optional[SSEEmitter] = None
+        self.last_event_id = 0
+        self.completed = False
+        self._frames: Deque[Tuple[int, bytes]] = deque(maxlen=max_events)
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+        self._abandoned = False
+
+    # =============================
+    # 连接
+    # =============================
+    @property
+    def attached(self) -> bool:
+        """
+        是否有仍在接收的连接
+        """
+        return self.emitter is not None and not self.emitter.closed
+
+    def attach(self, emitter: SSEEmitter, last_event_id: Optional[int] = None) -> int:
+        """
+        接入连接：补发 last_event_id 之后的事件（None 表示从头补发）
+        已有健康连接时不替换，抛出 RuntimeError
+        :return: 补发的事件数
+        """
+        if self.attached and self.emitter is not emitter:
+            raise RuntimeError(f"{self.request_id} sse stream already attached")
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+        self.emitter = emitter
+
+        after = last_event_id or 0
+        oldest = self._frames[0][0] if self._frames else self.last_event_id + 1
+        gap = after + 1 < oldest
+        replayed = 0
+        try:
+            for event_id, frame in self._frames:
+                if event_id > after:
+                    emitter.write_frame(frame)
+                    replayed += 1
+        except ConnectionError:
+            self.detach(emitter)
+            return replayed
+        if gap:
+            logger.info("%s replay gap: last=%s oldest=%s", self.request_id, after, oldest)
+            if self.on_gap is not None:
+                self.on_gap()
+        if self.completed:
+            emitter.complete()
+            self.emitter = None
+        return replayed
+
+    def detach(self, emitter: SSEEmitter) -> None:
+        if self.emitter is not emitter:
+            return
+        self.emitter = None
+        if self.completed or self._abandoned:
+            return
+        if self.reconnect_grace <= 0:
+            self._abandon()
+            return
+        self._abandon_timer = asyncio.get_running_loop().call_later(self.reconnect_grace, self._abandon)
+
+    def _abandon(self) -> None:
+        self._abandon_timer = None
+        if self.emitter is not None or self.completed or self._abandoned:
+            return
+        self._abandoned = True
+        if self.on_abandoned is not None:
+            self.on_abandoned()
+
+    # =============================
+    # SSEPrinter 接口
+    # =============================
+    def send(self, response: Any) -> None:
+        self.last_event_id += 1
+        frame = agent_response_codec.sse_frame(response, self.last_event_id)
+        self._frames.append((self.last_event_id, frame))
+        emitter = self.emitter
+        if emitter is None:
+            return
+        try:
+            emitter.write_frame(frame)
+        except ConnectionError:
+            # 已缓冲，等待客户端重连
+            self.detach(emitter)
+
+    def comment(self, text: str) -> None:
+        if self.emitter is None:
+            return
+        try:
+            self.emitter.comment(text)
+        except ConnectionError:
+            self.detach(self.emitter)
+
+    async def flush(self) -> None:
+        if self.emitter is not None:
+            await self.emitter.flush()
+
+    def complete(self) -> None:
+        if self.completed:
+            return
+        self.completed = True
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+        if self.emitter is not None:
+            self.emitter.complete()
+            self.emitter = None
+
+
+class ReplayRegistry:
+    """
+    request_id -> ReplayStream
+    请求结束后保留 retention 秒，供断线客户端补齐输出，避免重复执行整个请求
+    """
+
+    def __init__(self, max_events: int = 1000, retention: float = 60, reconnect_grace: float = 0):
+        self.max_events = max_events
+        self.retention = retention
+        self.reconnect_grace = reconnect_grace
+        self._streams: Dict[str, ReplayStream] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def open(
+        self,
+        request_id: str,
+        on_abandoned: Optional[Callable[[], None]] = None,
+        origin: Optional[Tuple[Optional[str], Optional[str]]] = None,
+    ) -> ReplayStream:
+        stream = ReplayStream(request_id, self.max_events, self.reconnect_grace, on_abandoned, origin)
+        self._streams[request_id] = stream
+        return stream
+
+    def get(self, request_id: Optional[str]) -> Optional[ReplayStream]:
+        if not request_id:
+            return None
+        return self._streams.get(request_id)
+
+    def close(self, stream: ReplayStream, retain: bool = True) -> None:
+        """
+        结束事件流，retention 秒后移除；retain=False 立即移除
+        """
+        stream.complete()
+        if not retain or self.retention <= 0:
+            self._remove(stream)
+            return
+        asyncio.get_running_loop().call_later(self.retention, self._remove, stream)
+
+    def _remove(self, stream: ReplayStream) -> None:
+        if self._streams.get(stream.request_id) is stream:
+            del self._streams[stream.request_id]
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+from agent_backend.agent_model.response import agent_response_codec
+
+logger = logging.getLogger(__name__)
+
+
+class SSEEmitter:
+    """
+    基于 asyncio StreamWriter 的 SSE 输出，提供 SSEPrinter 所需的 send / complete
+    send 只写入发送缓冲，flush() 等待缓冲落到 socket
+    on_disconnect: 检测到客户端断开时回调一次（用于取消 Agent 执行）
+    """
+
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        on_disconnect: Optional[Callable[[], None]] = None,
+    ):
+        self.writer = writer
+        self.on_disconnect = on_disconnect
+        self.closed = False
+        self.disconnected = False
+        self._done = asyncio.Event()
+
+    def mark_disconnected(self) -> None:
+        if self.disconnected:
+            return
+        self.disconnected = True
+        self.closed = True
+        self._done.set()
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+
+    def _write(self, payload: bytes) -> None:
+        if self.closed:
+            raise ConnectionResetError("sse emitter closed")
+        if self.writer.is_closing():
+            self.mark_disconnected()
+            raise ConnectionResetError("sse client disconnected")
+        self.writer.write(payload)
+
+    def send(self, response: Any) -> None:
+        self._write(agent_response_codec.sse_frame(response))
+
+    def write_frame(self, frame: bytes) -> None:
+        """
+        写出已序列化的 SSE 帧（ReplayStream 补发 / 转发）
+        """
+        self._write(frame)
+
+    def comment(self, text: str) -> None:
+        """
+        SSE 注释行：客户端忽略，用于排队提示 / 心跳
+        """
+        self._write(f": {text}\n\n".encode("utf-8"))
+
+    async def flush(self) -> None:
+        if self.closed:
+            return
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            self.mark_disconnected()
+
+    async def wait_closed(self) -> None:
+        """
+        等待流结束（complete）或客户端断开
+        """
+        await self._done.wait()
+
+    def complete(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._done.set()
+        try:
+            self.writer.close()
+        except Exception as e:
+            logger.debug("sse emitter close error: %s", e)
@@ -1,7 +1,22 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+import re
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
 
-from agent_model.dto.file_information import FileInformation
+from agent_backend.agent_model.dto.file_information import FileInformation
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _known_fields(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+    # 兼容驼峰（Java 前端）与下划线两种字段名，忽略未知字段
+    names = {f.name for f in fields(cls)}
+    return {
+        key: value
+        for key, value in ((_snake(k), v) for k, v in data.items())
+        if key in names
+    }
 
 
 @dataclass
@@ -9,6 +24,7 @@ class AgentRequest:
     # ========= 请求级别 =========
     request_id: Optional[str] = None          # 请求唯一标识
     erp: Optional[str] = None                 # 用户/员工标识
+    session_id: Optional[str] = None          # 会话标识，同一会话的追问复用历轮对话与缓存
     query: Optional[str] = None               # 用户原始问题
     agent_type: Optional[int] = None          # Agent 类型
     base_prompt: Optional[str] = None         # 基础 Prompt
@@ -16,6 +32,15 @@ class AgentRequest:
     is_stream: Optional[bool] = None          # 是否流式输出
     messages: List["AgentRequest.Message"] = field(default_factory=list)
     output_style: Optional[str] = None        # 交付物产出格式：html(网页模式）， docs(文档模式）， table(表格模式）
+    plan_patch: Optional[bool] = None         # 客户端支持 plan_patch 增量计划；为空时按服务端配置
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentRequest":
+        values = _known_fields(cls, data)
+        values["messages"] = [
+            AgentRequest.Message.from_dict(m) for m in values.get("messages") or []
+        ]
+        return cls(**values)
 
     # =============================
     # 内嵌模型：Message
@@ -27,3 +52,13 @@ class AgentRequest:
         command_code: Optional[str] = None     # 指令/命令码
         upload_file: List["FileInformation"] = field(default_factory=list)
         files: List["FileInformation"] = field(default_factory=list)
+
+        @classmethod
+        def from_dict(cls, data: Dict[str, Any]) -> "AgentRequest.Message":
+            values = _known_fields(cls, data)
+            for key in ("upload_file", "files"):
+                values[key] = [
+                    FileInformation(**_known_fields(FileInformation, f))
+                    for f in values.get(key) or []
+                ]
+            return cls(**values)
@@ -1,7 +1,45 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, fields, is_dataclass
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 import re
 
+# 计划步骤格式：执行顺序1. 阶段名：具体步骤
+STEP_PATTERN = re.compile(r"执行顺序(\d+)\.\s?([\w\W]*)\s?[：:](.*)")
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+# dataclass 类型 -> ((属性名, 驼峰键), ...)，每个类型只计算一次
+_FIELD_TABLES: Dict[type, Tuple[Tuple[str, str], ...]] = {}
+_SCALAR_TYPES = frozenset({str, int, float, bool, dict, list, tuple})
+
+
+def _field_table(cls: type) -> Tuple[Tuple[str, str], ...]:
+    table = _FIELD_TABLES.get(cls)
+    if table is None:
+        table = tuple((f.name, _camel(f.name)) for f in fields(cls))
+        _FIELD_TABLES[cls] = table
+    return table
+
+
+def _to_camel_dict(obj: Any) -> Dict[str, Any]:
+    """
+    dataclass -> 前端协议字典：字段名转驼峰，None 字段省略；Dict 类型字段（如 resultMap）原样保留
+    """
+    out: Dict[str, Any] = {}
+    for name, key in _field_table(obj.__class__):
+        value = getattr(obj, name)
+        if value is None:
+            continue
+        cls = value.__class__
+        if cls in _FIELD_TABLES or (cls not in _SCALAR_TYPES and is_dataclass(value)):
+            value = _to_camel_dict(value)
+        out[key] = value
+    return out
+
 
 @dataclass
 class AgentResponse:
@@ -17,6 +55,8 @@ class AgentResponse:
     plan_thought: Optional[str] = None
     #结构化执行计划
     plan: Optional["AgentResponse.Plan"] = None
+    #计划增量（message_type=plan_patch）
+    plan_patch: Optional["AgentResponse.PlanPatch"] = None
 
     task: Optional[str] = None
     task_summary: Optional[str] = None
@@ -40,6 +80,22 @@ class AgentResponse:
         steps: List[str] = field(default_factory=list)
         step_status: List[str] = field(default_factory=list)
         notes: List[str] = field(default_factory=list)
+        #计划版本号，plan_patch 基于该版本递增
+        version: Optional[int] = None
+
+    # -----------------------------
+    # 内嵌模型：PlanPatch 计划增量，只携带变化的下标 -> 新值（下标为字符串，对齐 JSON 键）
+    # 客户端当前版本 != base_version 时应丢弃增量，等待下一次完整 plan
+    # -----------------------------
+    @dataclass
+    class PlanPatch:
+        base_version: Optional[int] = None
+        version: Optional[int] = None
+        title: Optional[str] = None
+        stages: Optional[Dict[str, str]] = None
+        steps: Optional[Dict[str, str]] = None
+        step_status: Optional[Dict[str, str]] = None
+        notes: Optional[Dict[str, str]] = None
 
     # -----------------------------
     # 内嵌模型：ToolResult
@@ -50,6 +106,12 @@ class AgentResponse:
         tool_param: Optional[Dict[str, Any]] = None
         tool_result: Optional[str] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        对齐 Java 序列化：驼峰字段名，省略 None
+        """
+        return _to_camel_dict(self)
+
     # -----------------------------
     # 静态方法：format_steps
     # -----------------------------
@@ -68,8 +130,6 @@ class AgentResponse:
             notes=[]
         )
 
-        pattern = re.compile(r"执行顺序(\d+)\.\s?([\w\W]*)\s?[：:](.*)")
-
         for i, step in enumerate(plan.steps):
             # 保留原有状态与备注
             if plan.step_status:
@@ -77,14 +137,21 @@ class AgentResponse:
             if plan.notes:
                 new_plan.notes.append(plan.notes[i])
 
-            match = pattern.search(step)
-            if match:
-                # group(2) -> stage
-                # group(3) -> step
-                new_plan.stages.append(match.group(2).strip())
-                new_plan.steps.append(match.group(3).strip())
-            else:
-                new_plan.stages.append("")
-                new_plan.steps.append(step)
+            stage, step_text = _parse_step(step)
+            new_plan.stages.append(stage)
+            new_plan.steps.append(step_text)
 
         return new_plan
+
+
+@lru_cache(maxsize=4096)
+def _parse_step(step: str) -> Tuple[str, str]:
+    """
+    步骤文本 -> (阶段名, 具体步骤)；同一计划每次更新都会重复解析相同步骤，结果按文本缓存
+    """
+    match = STEP_PATTERN.search(step)
+    if match:
+        # group(2) -> stage
+        # group(3) -> step
+        return match.group(2).strip(), match.group(3).strip()
+    return "", step
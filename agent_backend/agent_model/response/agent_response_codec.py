@@ -0,0 +1,62 @@
+"""
+AgentResponse 编码：JSON bytes / SSE 帧 / msgpack 帧
+- 字段映射由 AgentResponse.to_dict 预计算（驼峰键、省略 None），不再经过 json 往返复制
+- 安装了 orjson 时使用 orjson 编码 JSON，否则使用预构建的标准库 JSONEncoder
+- msgpack 帧供内部消费方使用，需要安装 msgpack
+"""
+import json
+import struct
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于部署环境
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 取决于部署环境
+    msgpack = None
+
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def to_payload(response: Any) -> Dict[str, Any]:
+    return response.to_dict() if hasattr(response, "to_dict") else response
+
+
+def dumps(response: Any) -> bytes:
+    payload = to_payload(response)
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, default=str, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # orjson 不支持的类型（如超出 64 位的整数）退回标准库
+            pass
+    return _JSON_ENCODER.encode(payload).encode("utf-8")
+
+
+def sse_frame(response: Any, event_id: Optional[int] = None) -> bytes:
+    data = b"data: " + dumps(response) + b"\n\n"
+    if event_id is None:
+        return data
+    return b"id: " + str(event_id).encode("ascii") + b"\n" + data
+
+
+def pack_frame(response: Any) -> bytes:
+    """
+    4 字节大端长度 + msgpack 正文
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    body = msgpack.packb(to_payload(response), use_bin_type=True, default=str)
+    return _FRAME_HEADER.pack(len(body)) + body
+
+
+def unpack_frame(frame: bytes) -> Dict[str, Any]:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    (length,) = _FRAME_HEADER.unpack_from(frame)
+    return msgpack.unpackb(frame[_FRAME_HEADER.size:_FRAME_HEADER.size + length], raw=False)
@@ -0,0 +1,100 @@
+"""
+AgentResponse 序列化微基准：单核每秒可编码的 SSE 事件数
+
+    python -m benchmark.bench_agent_response_serializer [--events 50000]
+
+baseline: dataclasses.asdict + 驼峰转换 + json.dumps（改造前的路径）
+codec:    AgentResponse.to_dict 预计算字段表 + agent_response_codec.sse_frame
+"""
+import argparse
+import json
+import time
+from dataclasses import asdict
+from agent_backend.agent_model.response import agent_response_codec
+from agent_backend.agent_model.response.agent_response import AgentResponse
+
+
+def _camel_keys(value):
+    if isinstance(value, dict):
+        return {
+            k.split("_")[0] + "".join(p.capitalize() for p in k.split("_")[1:]): _camel_keys(v)
+            for k, v in value.items()
+            if v is not None
+        }
+    if isinstance(value, list):
+        return [_camel_keys(v) for v in value]
+    return value
+
+
+def _baseline_frame(response: AgentResponse) -> bytes:
+    payload = _camel_keys(json.loads(json.dumps(asdict(response), ensure_ascii=False)))
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _sample_events():
+    stream = AgentResponse(
+        request_id="req-1",
+        message_id="msg-1",
+        is_final=False,
+        message_type="agent_stream",
+        message_time="1700000000000",
+        result_map={"agentType": 5},
+        result="这是一段流式输出的增量文本",
+        finish=False,
+    )
+    plan = AgentResponse(
+        request_id="req-1",
+        message_id="msg-2",
+        message_type="plan",
+        message_time="1700000000000",
+        plan=AgentResponse.Plan(
+            title="调研报告",
+            stages=["检索", "分析", "撰写"],
+            steps=["检索资料", "分析数据", "撰写报告"],
+            step_status=["completed", "in_progress", "not_started"],
+            notes=["", "", ""],
+        ),
+        result_map={"agentType": 5},
+        finish=False,
+    )
+    tool = AgentResponse(
+        request_id="req-1",
+        message_id="msg-3",
+        message_type="tool_result",
+        message_time="1700000000000",
+        tool_result=AgentResponse.ToolResult(
+            tool_name="deep_search",
+            tool_param={"query": "asyncio", "top_k": 5},
+            tool_result="x" * 512,
+        ),
+        result_map={"agentType": 5},
+        finish=False,
+    )
+    return [stream, plan, tool]
+
+
+def _measure(encode, events, total: int) -> float:
+    start = time.perf_counter()
+    for i in range(total):
+        encode(events[i % len(events)])
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+
+    events = _sample_events()
+    backend = "orjson" if agent_response_codec.orjson is not None else "json"
+    baseline = _measure(_baseline_frame, events, args.events)
+    codec = _measure(agent_response_codec.sse_frame, events, args.events)
+    print(f"baseline  {baseline:>12,.0f} events/s")
+    print(f"codec     {codec:>12,.0f} events/s  ({backend}, x{codec / baseline:.1f})")
+    if agent_response_codec.msgpack is not None:
+        packed = _measure(agent_response_codec.pack_frame, events, args.events)
+        print(f"msgpack   {packed:>12,.0f} events/s  (x{packed / baseline:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+热路径日志微基准：一个 Agent step 的日志量在生产配置（INFO、写文件）下占用调用线程的 CPU
+
+    python -m benchmark.bench_logging [--steps 300]
+
+一个 step 的日志：
+- truncate_message：40 条、约 60KB 的对话
+- SSEPrinter：200 个 agent_stream 增量 + 4 条其它消息
+- 2 次工具 HTTP 调用，请求体约 8KB
+
+baseline: 改造前的写法（立即 json.dumps 全量对话、每个 token 一条 INFO、同步 FileHandler）
+current:  LogUtil.payload（截断 2000 字符、采样 1%）+ QueueHandler 后台写出
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from agent_backend.agent.agent_util.log_util import LogUtil
+
+logger = logging.getLogger("bench.logging")
+
+MESSAGES = [
+    {"role": "user" if i % 2 == 0 else "assistant", "content": "这是一段对话内容 " * 80}
+    for i in range(40)
+]
+TOOL_BODY = json.dumps({"name": "search", "arguments": {"query": "q" * 8000}})
+TOKENS = ["增量"] * 200
+RESULTS = [{"fileName": "report.md", "data": "内容 " * 500}] * 4
+
+
+def _baseline_step() -> None:
+    logger.info("%s before truncate %s", "r1", json.dumps(MESSAGES, ensure_ascii=False))
+    logger.info("%s after truncate %s", "r1", json.dumps(MESSAGES, ensure_ascii=False))
+    for token in TOKENS:
+        logger.info("%s sse send %s %s %s", "r1", "agent_stream", token, None)
+    for result in RESULTS:
+        logger.info("%s sse send %s %s %s", "r1", "markdown", result, None)
+    for _ in range(2):
+        logger.info("POST %s payload=%s headers=%s", "http://mcp", TOOL_BODY, {"Content-Type": "json"})
+
+
+def _current_step() -> None:
+    logger.info("%s truncate messages %s -> %s, max_input_tokens=%s", "r1", 40, 40, 128000)
+    logger.debug("%s after truncate %s", "r1", LogUtil.payload(MESSAGES))
+    for token in TOKENS:
+        logger.debug("%s sse send %s %s", "r1", "m1", LogUtil.payload(token))
+    for result in RESULTS:
+        logger.info("%s sse send %s %s %s", "r1", "markdown", LogUtil.payload(result), None)
+    for _ in range(2):
+        logger.info("POST %s payload=%s", "http://mcp", LogUtil.payload(TOOL_BODY))
+
+
+def _measure(step, steps: int) -> float:
+    start = time.thread_time()
+    for _ in range(steps):
+        step()
+    return (time.thread_time() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=300)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.FileHandler(os.devnull, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+
+    baseline = _measure(_baseline_step, args.steps)
+
+    LogUtil.configure(max_chars=2000, sample_rate=0.01)
+    LogUtil.install_queue_handler(logger)
+    current = _measure(_current_step, args.steps)
+    LogUtil.shutdown()
+
+    print(f"baseline  {baseline * 1000:8.3f} ms CPU/step (calling thread)")
+    print(f"current   {current * 1000:8.3f} ms CPU/step (calling thread)")
+    print(f"recovered {(baseline - current) * 1000:8.3f} ms/step ({1 - current / baseline:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+脱敏吞吐微基准：1MB 工具输出
+
+    python -m benchmark.bench_redaction [--size-mb 1] [--words 200]
+
+legacy:  改造前的 text_desensitization（每次编译正则、逐规则扫描、str.replace 全串替换）
+engine:  RedactionEngine（预编译、字面敏感词前缀树合并、单次扫描按位置替换）
+stream:  StreamingRedactor 逐 chunk 脱敏（模拟 LLM 流式输出，每 chunk 约 4 个字符）的单 chunk 耗时
+"""
+import argparse
+import random
+import re
+import time
+from typing import Dict
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine, luhn_verify as _luhn_bank_card_verify
+
+def legacy_text_desensitization(
+    content: str,
+    sensitive_patterns_mapping: Dict[str, str],
+) -> str:
+    if not content:
+        return content
+
+    # 邮箱脱敏（排除 @jd.com）
+    email_pattern = re.compile(r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}")
+    for match in email_pattern.finditer(content):
+        snippet = match.group()
+        if "@jd.com" in snippet:
+            continue
+        local, _, domain = snippet.partition("@")
+        content = content.replace(snippet, f"{local}＠{domain}")
+
+    # 身份证号脱敏
+    id_pattern = re.compile(
+        r"(?:[^\dA-Za-z_]|^)"
+        r"((?:[1-6][1-7]|50|71|81|82)\d{4}"
+        r"(?:19|20)\d{2}"
+        r"(?:0[1-9]|10|11|12)"
+        r"(?:[0-2][1-9]|10|20|30|31)"
+        r"\d{3}[0-9Xx])"
+        r"(?:[^\dA-Za-z_]|$)"
+    )
+    for match in id_pattern.finditer(content):
+        snippet = match.group(1)
+        content = content.replace(snippet, snippet[:12] + "✿✿✿✿✿✿")
+
+    # 手机号脱敏
+    phone_pattern = re.compile(r"(?:[^\dA-Za-z_]|^)(1[3456789]\d{9})(?:[^\dA-Za-z_]|$)")
+    for match in phone_pattern.finditer(content):
+        snippet = match.group(1)
+        content = content.replace(snippet, snippet[:3] + "✿✿✿✿" + snippet[7:])
+
+    # 银行卡脱敏（+ Luhn 校验）
+    bankcard_pattern = re.compile(r"(?:[^\dA-Za-z_]|^)(62(?:\d{14}|\d{17}))(?:[^\dA-Za-z_]|$)")
+    for match in bankcard_pattern.finditer(content):
+        snippet = match.group(1)
+        if _luhn_bank_card_verify(snippet):
+            content = content.replace(snippet, snippet[:12] + "✿✿✿✿✿✿")
+
+    # 密码 / 自定义敏感词脱敏
+    for pattern, word_mapping in sensitive_patterns_mapping.items():
+        try:
+            start = pattern.index("^)") + 2
+            end = pattern.rfind("[^")
+        except ValueError:
+            content = content.replace(pattern, word_mapping)
+            continue
+
+        if start + 1 < end:
+            sensitive_word = pattern[start:end]
+            compiled = re.compile(pattern)
+
+            for match in compiled.finditer(content):
+                snippet = match.group()
+                if content.startswith(sensitive_word):
+                    content = content.replace(
+                        snippet, word_mapping + snippet[-1]
+                    )
+                else:
+                    content = content.replace(
+                        snippet, snippet[0] + word_mapping + snippet[-1]
+                    )
+        else:
+            content = content.replace(pattern, word_mapping)
+
+    return content
+
+
+def _tool_output(size: int, seed: int = 7) -> str:
+    """
+    模拟工具输出：普通文本中穿插邮箱 / 手机号 / 身份证 / 银行卡 / 敏感词
+    """
+    rng = random.Random(seed)
+    pieces = [
+        "检索结果：该公司 2023 年营收同比增长 12%，详情见附件。",
+        "联系人 zhang.san@example.com 电话 13800138000。",
+        "身份证 510104199001011234，银行卡 6226327514303272。",
+        "config: password=admin123 token=abc",
+        "The quick brown fox jumps over the lazy dog 0123456789. ",
+    ]
+    out = []
+    total = 0
+    while total < size:
+        piece = rng.choice(pieces)
+        out.append(piece)
+        total += len(piece)
+    return "".join(out)
+
+
+def _patterns(words: int):
+    patterns = {r"(?:[^A-Za-z0-9_-]|^)password[^A-Za-z0-9_-]": "PASSWORD"}
+    for i in range(words):
+        patterns[f"(?:[^A-Za-z0-9_-]|^)secret{i:04d}[^A-Za-z0-9_-]"] = "SECRET"
+    return patterns
+
+
+def _measure(fn, content, patterns, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(content, patterns)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=1)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    content = _tool_output(int(args.size_mb * 1024 * 1024))
+    mb = len(content.encode("utf-8")) / 1024 / 1024
+    for words in (0, args.words):
+        patterns = _patterns(words)
+        engine = RedactionEngine.compile(patterns)
+        legacy = _measure(legacy_text_desensitization, content, patterns, args.rounds)
+        current = _measure(lambda c, p: engine.redact(c), content, patterns, args.rounds)
+        print(f"custom words={words + 1:<4} legacy {mb / legacy:8.1f} MB/s   engine {mb / current:8.1f} MB/s"
+              f"   (x{legacy / current:.1f})")
+
+    chunks = [content[i:i + 4] for i in range(0, min(len(content), 200_000), 4)]
+    for words in (0, args.words):
+        engine = RedactionEngine.compile(_patterns(words))
+        redactor = engine.stream()
+        start = time.perf_counter()
+        for chunk in chunks:
+            redactor.feed(chunk)
+        redactor.close()
+        per_chunk = (time.perf_counter() - start) / len(chunks)
+        print(f"custom words={words + 1:<4} stream {per_chunk * 1e6:6.2f} us/chunk")
+
+
+if __name__ == "__main__":
+    main()
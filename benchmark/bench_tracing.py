@@ -0,0 +1,63 @@
+"""
+追踪开销微基准：一个 Agent step 产生的 span（step / think / act / prepare_messages / llm / tool / flush）
+在全量采样并写出文件时的 CPU 开销，以及相对一次 step 耗时的占比
+
+    python -m benchmark.bench_tracing [--steps 20000] [--step-ms 50]
+
+--step-ms 为单个 step 的典型耗时（一次 LLM 往返通常在数百毫秒以上，50ms 为保守下限）
+"""
+import argparse
+import os
+import tempfile
+import time
+from agent_backend.agent.agent_tracing.tracer import JsonLinesExporter, Tracer
+
+
+def _one_step(step: int) -> None:
+    with Tracer.span("agent.step", step=step):
+        with Tracer.span("agent.think") as think:
+            with Tracer.span("llm.prepare_messages", messages=12) as prepare:
+                prepare.set("formatted", 12)
+            with Tracer.span("llm.call", model="gpt", stream=False, tools=8) as llm:
+                llm.set("tokens", 1024)
+            think.set("should_act", True)
+        with Tracer.span("agent.act"):
+            with Tracer.span("tool.call", tool="search") as tool:
+                tool.set("result_chars", 2048)
+            with Tracer.span("printer.flush", batch=4, depth=0):
+                pass
+
+
+def _measure(steps: int) -> float:
+    start = time.perf_counter()
+    with Tracer.span("agent.run", agent="bench", request_id="r1"):
+        for step in range(steps):
+            _one_step(step)
+    Tracer.flush()
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--step-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    Tracer.configure(None)
+    disabled = _measure(args.steps)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl")
+        Tracer.configure(JsonLinesExporter(path))
+        enabled = _measure(args.steps)
+        Tracer.configure(None)
+        size = os.path.getsize(path)
+
+    cost_us = (enabled - disabled) * 1e6
+    print(f"disabled  {disabled * 1e6:8.2f} us/step")
+    print(f"enabled   {enabled * 1e6:8.2f} us/step  (7 spans, {size / args.steps:.0f} bytes/step)")
+    print(f"overhead  {cost_us / (args.step_ms * 1000):.4%} of a {args.step_ms:g}ms step")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from agent_backend.agent.agent_core.agent_budget import AgentBudget
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_errors.agent_exception import BudgetExceededError
+from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ask_llm_once(self, context, messages, system_msgs=None):
+        self.calls += 1
+        return "summary"
+
+
+class TokenAgent(BaseAgent):
+    """
+    每个 step 消耗固定 token
+    """
+
+    def __init__(self, context, llm=None, tokens_per_step=100):
+        super().__init__(
+            name="budget",
+            description="",
+            system_prompt="sys",
+            next_step_prompt="",
+            llm=llm,
+            context=context,
+            max_steps=10,
+        )
+        self.tokens_per_step = tokens_per_step
+        self.steps = 0
+
+    async def step(self):
+        self.steps += 1
+        self.context.budget.record_tokens(self.tokens_per_step)
+        return f"step {self.steps}"
+
+
+def test_budget_ratio_and_check():
+    budget = AgentBudget(max_total_tokens=1000, max_tool_calls=4)
+    budget.record_tokens(500)
+    budget.record_tool_call(3)
+    assert budget.usage_ratio() == pytest.approx(0.75)
+    assert not budget.should_degrade()
+    budget.record_tool_call()
+    assert budget.exceeded() == "tool_calls 4/4"
+    with pytest.raises(BudgetExceededError) as e:
+        budget.check()
+    assert e.value.dimension == "tool_calls"
+
+
+def test_budget_cost_dimension():
+    budget = AgentBudget(max_cost=1.0, cost_per_1k_tokens=0.5)
+    budget.record_tokens(1600)
+    assert budget.should_degrade()
+    assert budget.exceeded() is None
+
+
+def test_run_degrades_to_summary_step():
+    llm = FakeLLM()
+    context = AgentContext(request_id="r1", budget=AgentBudget(max_total_tokens=1000))
+    agent = TokenAgent(context, llm, tokens_per_step=300)
+
+    result = asyncio.run(agent.run("q"))
+
+    # 300 / 600 < 80%，第 3 步前达到 900 -> 只做总结
+    assert agent.steps == 3
+    assert result == "summary"
+    assert llm.calls == 1
+    assert agent.state == AgentState.FINISHED
+
+
+def test_run_terminates_when_budget_exhausted():
+    context = AgentContext(
+        request_id="r1",
+        budget=AgentBudget(max_total_tokens=1000, degrade_ratio=2.0),
+    )
+    agent = TokenAgent(context, tokens_per_step=500)
+
+    result = asyncio.run(agent.run("q"))
+
+    assert agent.steps == 2
+    assert result == "Terminated: Budget exceeded (tokens)"
+
+
+def test_tool_call_skipped_when_budget_exhausted():
+    context = AgentContext(request_id="r1", budget=AgentBudget(max_tool_calls=1))
+    agent = TokenAgent(context)
+    agent.context.budget.record_tool_call()
+    command = ToolCall(
+        id="c1",
+        type="function",
+        function=ToolCall.Function(name="search", arguments="{}"),
+    )
+
+    result = asyncio.run(agent.execute_tool(command))
+
+    assert result.startswith("Tool search skipped: budget exceeded")
@@ -0,0 +1,167 @@
+import uuid
+import pytest
+from agent_backend.agent.agent_core.agent_checkpoint import SqliteCheckpointer
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_enums.agent_type import RoleType
+from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
+from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent_config.genie_config import GenieConfig
+
+
+class CrashingAgent(BaseAgent):
+    def __init__(self, context, crash_at=None):
+        super().__init__(
+            name="crash_agent",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=5,
+        )
+        self.crash_at = crash_at
+        self.executed_steps = []
+
+    async def step(self):
+        if self.current_step == self.crash_at:
+            raise RuntimeError("worker died")
+        self.executed_steps.append(self.current_step)
+        self.update_memory(RoleType.ASSISTANT, f"step {self.current_step}")
+        if self.current_step == 4:
+            self.state = AgentState.FINISHED
+        return f"result {self.current_step}"
+
+
+@pytest.mark.asyncio
+async def test_resume_from_last_step(tmp_path):
+    checkpointer = SqliteCheckpointer(str(tmp_path / "ckpt.db"))
+    context = AgentContext(request_id="req-1", checkpointer=checkpointer)
+
+    first = CrashingAgent(context, crash_at=3)
+    first.available_tools.update_digital_employee({"search": "研究员"})
+    first.available_tools.set_current_task("task-a")
+    with pytest.raises(RuntimeError):
+        await first.run("hello")
+
+    second = CrashingAgent(context)
+    result = await second.run("hello")
+
+    assert result == "result 4"
+    assert second.executed_steps == [3, 4]
+    assert [m.content for m in second.memory.messages] == [
+        "hello", "step 1", "step 2", "step 3", "step 4"
+    ]
+    assert second.available_tools.get_digital_employee("search") == "研究员"
+    assert second.available_tools.current_task == "task-a"
+    # 正常结束后 checkpoint 被清理
+    assert checkpointer.load("req-1", "crash_agent") is None
+
+
+class RecordingCheckpointer(SqliteCheckpointer):
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.writes = []
+
+    def save(self, checkpoint):
+        self.writes.append((checkpoint.messages_offset, len(checkpoint.messages)))
+        super().save(checkpoint)
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_writes_only_new_messages(tmp_path):
+    checkpointer = RecordingCheckpointer(str(tmp_path / "ckpt.db"))
+    context = AgentContext(request_id="req-4", checkpointer=checkpointer)
+
+    first = CrashingAgent(context, crash_at=4)
+    with pytest.raises(RuntimeError):
+        await first.run("hello")
+
+    # 首个 step 写入 query + 输出，之后每个 step 只写新增的一条
+    assert checkpointer.writes == [(0, 2), (2, 1), (3, 1)]
+    assert [m["content"] for m in checkpointer.load("req-4", "crash_agent").messages] == [
+        "hello", "step 1", "step 2", "step 3"
+    ]
+
+    # 删除消息后全量重写
+    first.memory.messages = first.memory.messages[:2]
+    first.save_checkpoint()
+    assert checkpointer.writes[-1] == (0, 2)
+    assert len(checkpointer.load("req-4", "crash_agent").messages) == 2
+
+
+class CountingTool(BaseTool):
+    name = "fetch"
+    description = "fetch"
+
+    def __init__(self):
+        self.calls = 0
+
+    def to_params(self):
+        return {}
+
+    def execute(self, input):
+        self.calls += 1
+        return f"fetched {input['url']}"
+
+
+class ToolCrashAgent(BaseAgent):
+    """
+    step 1 调用工具后崩溃；每次运行生成新的 tool_call_id（与重新调用 LLM 一致）
+    """
+
+    def __init__(self, context, tool, crash=False):
+        super().__init__(
+            name="tool_agent",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=3,
+        )
+        self.available_tools.add_tool(tool)
+        self.crash = crash
+
+    async def step(self):
+        command = ToolCall(
+            id=str(uuid.uuid4()),
+            type="function",
+            function=ToolCall.Function(name="fetch", arguments='{"url": "a"}'),
+        )
+        result = await self.execute_tool(command)
+        if self.crash:
+            raise RuntimeError("worker died")
+        self.update_memory(RoleType.ASSISTANT, result)
+        self.state = AgentState.FINISHED
+        return result
+
+
+@pytest.mark.asyncio
+async def test_crash_in_first_step_keeps_query_and_reuses_tool_result(tmp_path):
+    checkpointer = SqliteCheckpointer(str(tmp_path / "ckpt.db"))
+    context = AgentContext(request_id="req-2", checkpointer=checkpointer)
+    tool = CountingTool()
+
+    with pytest.raises(RuntimeError):
+        await ToolCrashAgent(context, tool, crash=True).run("hello")
+
+    agent = ToolCrashAgent(context, tool)
+    result = await agent.run("hello")
+
+    assert result == "fetched a"
+    assert tool.calls == 1
+    assert [m.content for m in agent.memory.messages] == ["hello", "fetched a"]
+
+
+def test_from_config(tmp_path):
+    assert SqliteCheckpointer.from_config(GenieConfig()) is None
+    checkpointer = SqliteCheckpointer.from_config(GenieConfig(checkpoint_db_path=str(tmp_path / "ckpt.db")))
+    assert isinstance(checkpointer, SqliteCheckpointer)
+
+
+@pytest.mark.asyncio
+async def test_run_without_checkpointer():
+    agent = CrashingAgent(AgentContext(request_id="req-3"))
+    assert await agent.run("hello") == "result 4"
@@ -0,0 +1,100 @@
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.agent_prototype import AgentPrototype, AgentPrototypeRegistry
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_enums.agent_type import AgentType
+from agent_backend.agent.agent_prompts.prompt_template import PromptTemplate
+from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent_config.genie_config import GenieConfig
+
+
+class SearchTool(BaseTool):
+    name = "search"
+    description = "search the web"
+
+    def to_params(self):
+        return {}
+
+    def execute(self, tool_input):
+        return "ok"
+
+
+class EchoAgent(BaseAgent):
+    async def step(self):
+        return self.system_prompt
+
+
+@pytest.fixture(autouse=True)
+def _clear_registry():
+    AgentPrototypeRegistry.clear()
+    yield
+    AgentPrototypeRegistry.clear()
+
+
+def _config():
+    cfg = GenieConfig()
+    cfg.react_system_prompt_map = {"default": "你是{{role}}，今天是{{date}}，问题：{{query}}"}
+    cfg.react_next_step_prompt_map = {"default": "继续"}
+    cfg.react_max_steps = 7
+    return cfg
+
+
+def _tools():
+    tools = ToolCollection()
+    tools.add_tool(SearchTool())
+    return tools
+
+
+def test_prompt_template_render_keeps_unknown_placeholders():
+    template = PromptTemplate.compile("a {{x}} b {{y}}")
+    assert template.placeholders == ("x", "y")
+    assert template.render(x=1) == "a 1 b {{y}}"
+    assert template.partial(y="Y").render(x="X") == "a X b Y"
+
+
+def test_registry_clone_renders_request_values():
+    AgentPrototypeRegistry.register(
+        AgentType.REACT,
+        lambda cfg, tools: AgentPrototype.from_config(
+            AgentType.REACT, EchoAgent, cfg, "react", tools, name="react",
+            static_values={"role": "助手"},
+        ),
+    )
+    AgentPrototypeRegistry.build(_config(), _tools())
+
+    context = AgentContext(request_id="r1")
+    agent = AgentPrototypeRegistry.clone(AgentType.REACT, context, date="2024-01-01", query="q")
+
+    assert isinstance(agent, EchoAgent)
+    assert agent.system_prompt == "你是助手，今天是2024-01-01，问题：q"
+    assert agent.next_step_prompt == "继续"
+    assert agent.max_steps == 7
+    assert agent.available_tools is context.tool_collection
+    assert context.tool_collection.agent_context is context
+
+
+def test_clones_share_registry_and_compiled_schemas():
+    tools = _tools()
+    prototype = AgentPrototype.from_config(AgentType.REACT, EchoAgent, _config(), "react", tools, name="react")
+
+    first = prototype.clone(AgentContext(request_id="r1")).available_tools
+    second = prototype.clone(AgentContext(request_id="r2")).available_tools
+
+    assert first is not second
+    assert first.tool_map is second.tool_map is tools.tool_map
+    assert first.get_tools_desc() is second.get_tools_desc()
+
+    # 请求级追加工具只影响自己的视图
+    class OtherTool(SearchTool):
+        name = "other"
+
+    first.add_tool(OtherTool())
+    assert "other" not in tools.tool_map
+    assert "other" in first.get_tools_desc()
+    assert "other" not in second.get_tools_desc()
+
+
+def test_get_without_prototype_raises():
+    with pytest.raises(KeyError):
+        AgentPrototypeRegistry.get(AgentType.PLAN_SOLVE, "planner")
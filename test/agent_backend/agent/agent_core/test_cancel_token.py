@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_core.cancel_token import CancelToken
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError
+from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
+
+
+class LoopAgent(BaseAgent):
+    def __init__(self, context):
+        super().__init__(
+            name="loop",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=5,
+        )
+        self.steps = 0
+
+    async def step(self):
+        self.steps += 1
+        if self.steps == 2:
+            self.context.cancel_token.cancel("client disconnected")
+        return f"step {self.steps}"
+
+
+def test_cancel_runs_callbacks_once():
+    token = CancelToken()
+    calls = []
+    token.add_callback(lambda: calls.append("a"))
+    remove = token.add_callback(lambda: calls.append("b"))
+    remove()
+
+    assert token.cancel("bye") is True
+    assert token.cancel("again") is False
+    assert calls == ["a"]
+    assert token.reason == "bye"
+    with pytest.raises(AgentCancelledError):
+        token.raise_if_cancelled()
+
+    # 已取消时注册的回调立即执行
+    token.add_callback(lambda: calls.append("late"))
+    assert calls == ["a", "late"]
+
+
+def test_bind_task_cancels_from_other_thread():
+    async def _main():
+        token = CancelToken()
+        task = asyncio.create_task(asyncio.sleep(30))
+        token.bind_task(task)
+        await asyncio.to_thread(token.cancel, "disconnect")
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_main())
+
+
+def test_run_stops_before_next_step_when_cancelled():
+    context = AgentContext(request_id="r1", cancel_token=CancelToken())
+    agent = LoopAgent(context)
+
+    with pytest.raises(AgentCancelledError):
+        asyncio.run(agent.run("q"))
+    assert agent.steps == 2
+    assert agent.state == AgentState.IDLE
+
+
+def test_execute_tool_skips_after_cancel():
+    token = CancelToken()
+    token.cancel()
+    agent = LoopAgent(AgentContext(request_id="r1", cancel_token=token))
+    command = ToolCall(id="c1", type="function", function=ToolCall.Function(name="search", arguments="{}"))
+
+    assert asyncio.run(agent.execute_tool(command)) == "Tool search cancelled."
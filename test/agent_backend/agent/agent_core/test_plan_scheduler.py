@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_core.plan_scheduler import (
+    PlanScheduler,
+    PlanTaskStatus,
+    build_plan_dag,
+)
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent_config.genie_config import GenieConfig
+
+STEPS = [
+    "执行顺序1. 调研：搜索行业报告",
+    "执行顺序1. 调研：搜索竞品信息",
+    "执行顺序2. 分析：对比数据",
+    "执行顺序3. 输出：撰写报告",
+]
+
+
+class StepAgent(BaseAgent):
+    def __init__(self, context, log, fail=(), delay=0.02):
+        super().__init__(
+            name="executor",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=3,
+        )
+        self.log = log
+        self.fail = fail
+        self.delay = delay
+
+    async def step(self):
+        self.log.append(("start", self.context.task))
+        await asyncio.sleep(self.delay)
+        if self.context.task in self.fail:
+            raise RuntimeError("tool down")
+        self.log.append(("end", self.context.task))
+        self.state = AgentState.FINISHED
+        return self.context.task
+
+
+def test_build_plan_dag():
+    tasks = build_plan_dag(STEPS + ["没有执行顺序的步骤"])
+
+    assert [t.order for t in tasks] == [1, 1, 2, 3, 4]
+    assert tasks[0].stage == "调研"
+    assert tasks[0].depends_on == [] and tasks[1].depends_on == []
+    assert tasks[2].depends_on == [0, 1]
+    assert tasks[3].depends_on == [2]
+    assert tasks[4].depends_on == [3]
+    assert tasks[0].priority == 4.0 and tasks[4].priority == 1.0
+
+
+@pytest.mark.asyncio
+async def test_same_order_runs_in_parallel_and_records_timings():
+    log = []
+    context = AgentContext(request_id="r1", tool_collection=ToolCollection())
+    result = await PlanScheduler(max_parallel=5).run(
+        context, STEPS, lambda ctx: StepAgent(ctx, log)
+    )
+
+    assert result.succeeded
+    assert result.results == STEPS
+    # 两个调研 task 同时开始，分析在二者之后
+    assert log[:2] == [("start", STEPS[0]), ("start", STEPS[1])]
+    assert log.index(("start", STEPS[2])) > log.index(("end", STEPS[1]))
+    report = result.timing_report()
+    assert all(item["run_ms"] is not None for item in report)
+
+
+@pytest.mark.asyncio
+async def test_failure_skips_dependents_only():
+    log = []
+    steps = [
+        "执行顺序1. 调研：A",
+        "执行顺序1. 调研：B",
+        "执行顺序2. 分析：C",
+    ]
+    context = AgentContext(request_id="r2", tool_collection=ToolCollection())
+    result = await PlanScheduler().run(
+        context, steps, lambda ctx: StepAgent(ctx, log, fail=(steps[0],))
+    )
+
+    statuses = [t.status for t in result.tasks]
+    assert statuses == [PlanTaskStatus.FAILED, PlanTaskStatus.COMPLETED, PlanTaskStatus.SKIPPED]
+    assert ("start", steps[2]) not in log
+
+
+@pytest.mark.asyncio
+async def test_critical_path_first_and_stage_limit():
+    log = []
+    steps = [
+        "执行顺序1. 短：独立任务",
+        "执行顺序1. 长：链路起点",
+    ]
+    context = AgentContext(request_id="r3", tool_collection=ToolCollection())
+    costs = {steps[0]: 1.0, steps[1]: 5.0}
+    await PlanScheduler(max_parallel=1).run(
+        context, steps, lambda ctx: StepAgent(ctx, log), cost_fn=costs.get
+    )
+    assert log[0] == ("start", steps[1])
+
+    log.clear()
+    parallel = ["执行顺序1. 搜索：a", "执行顺序1. 搜索：b", "执行顺序1. 搜索：c"]
+    await PlanScheduler(max_parallel=5, stage_limits={"搜索": 1}).run(
+        context, parallel, lambda ctx: StepAgent(ctx, log)
+    )
+    # 同一阶段限流为 1，严格串行
+    assert [event for event, _ in log] == ["start", "end"] * 3
+
+
+def test_scheduler_from_config():
+    scheduler = PlanScheduler.from_config(GenieConfig(task_max_parallel=3), fail_fast=True)
+
+    assert scheduler.max_parallel == 3
+    assert scheduler.fail_fast is True
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.digital_employee_cache import DigitalEmployeeCache
+from agent_backend.agent.agent_core.reactagnet import ReActAgent
+from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+
+
+class SearchTool(BaseTool):
+    name = "search"
+    description = "search the web"
+
+    def to_params(self):
+        return {}
+
+    def execute(self, tool_input):
+        return "ok"
+
+
+class SlowLLM:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def ask_llm_once(self, context, messages, system_msgs=None):
+        self.calls += 1
+        await self.release.wait()
+        return '{"search": "研究员"}'
+
+
+class RecordingAgent(ReActAgent):
+    def __init__(self, context, llm):
+        super().__init__(
+            name="react",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=llm,
+            context=context,
+        )
+        self.digital_employee_prompt = "{{task}} {{ToolsDesc}} {{query}}"
+        self.label_at_act = None
+
+    async def think(self):
+        # think 期间数字员工仍在生成
+        assert self.context.tool_collection.get_digital_employee("search") is None
+        self.llm.release.set()
+        return True
+
+    async def act(self):
+        self.label_at_act = self.context.tool_collection.get_digital_employee("search")
+        return "done"
+
+
+def _context(query="q"):
+    tools = ToolCollection()
+    tools.add_tool(SearchTool())
+    return AgentContext(request_id="r1", query=query, tool_collection=tools)
+
+
+@pytest.mark.asyncio
+async def test_digital_employee_overlaps_think_and_is_cached():
+    DigitalEmployeeCache.clear()
+    llm = SlowLLM()
+    agent = RecordingAgent(_context(), llm)
+
+    await agent.generate_digital_employee("task-1")
+    assert await agent.step() == "done"
+    assert agent.label_at_act == "研究员"
+
+    # 相同 task / 工具集 / prompt 的新请求直接命中缓存
+    second = RecordingAgent(_context(), SlowLLM())
+    await second.generate_digital_employee("task-1")
+    assert second.context.tool_collection.get_digital_employee("search") == "研究员"
+    assert second.llm.calls == 0
+    assert llm.calls == 1
+
+    # prompt 引用了 {{query}}：query 不同时不共享映射
+    other_query = RecordingAgent(_context("another q"), SlowLLM())
+    await other_query.generate_digital_employee("task-1")
+    assert other_query.context.tool_collection.get_digital_employee("search") is None
+    assert other_query._digital_employee_task is not None
+    other_query._digital_employee_task.cancel()
+
+
+def test_cache_key_includes_query_only_when_prompt_uses_it():
+    build = DigitalEmployeeCache.build_key
+    assert build("t", "v1", "{{task}} {{query}}", "a") != build("t", "v1", "{{task}} {{query}}", "b")
+    assert build("t", "v1", "{{task}}", "a") == build("t", "v1", "{{task}}", "b")
+
+
+def test_tool_version_changes_with_tools():
+    tools = ToolCollection()
+    empty_version = tools.get_version()
+    tools.add_tool(SearchTool())
+    assert tools.get_version() != empty_version
@@ -0,0 +1,122 @@
+import pytest
+from agent_backend.agent.agent_core.session_store import (
+    AgentSession,
+    SessionStore,
+    SqliteSessionBackend,
+)
+from agent_backend.agent.agent_errors.agent_exception import SessionConflictError
+from agent_backend.agent_config.genie_config import GenieConfig
+
+
+def test_tool_result_cache_respects_ttl():
+    session = AgentSession(session_id="s1", tool_cache_ttl=60, cacheable_tools=frozenset({"search"}))
+    session.put_tool_result("search", {"q": "a", "n": 1}, "result")
+
+    assert session.get_tool_result("search", {"n": 1, "q": "a"}) == "result"
+    assert session.get_tool_result("search", {"q": "b"}) is None
+
+    session.tool_cache_ttl = 0
+    assert session.get_tool_result("search", {"q": "a", "n": 1}) is None
+
+
+def test_only_allowlisted_tools_are_cached():
+    store = SessionStore(tool_cache_ttl=60, cacheable_tools=["search"])
+    session = store.get_or_create("s1")
+
+    session.put_tool_result("search", {"q": "a"}, "result")
+    session.put_tool_result("code_interpreter", {"code": "x"}, "written")
+
+    assert session.get_tool_result("search", {"q": "a"}) == "result"
+    assert session.get_tool_result("code_interpreter", {"code": "x"}) is None
+    # 默认不缓存任何工具结果
+    assert SessionStore().get_or_create("s2").is_tool_cacheable("search") is False
+
+
+def test_prune_keeps_only_history_caches():
+    session = AgentSession(session_id="s1")
+    session.append_turn("question", "answer")
+    transient = AgentSession(session_id="tmp")
+    transient.append_turn("tool output", None)
+
+    for message in session.history + transient.history:
+        session.put_formatted(message, False, {"content": message.content})
+        session.token_ledger[message.content] = 3
+
+    session.prune_caches()
+
+    assert session.get_formatted(session.history[0], False) == {"content": "question"}
+    assert session.get_formatted(transient.history[0], False) is None
+    assert set(session.token_ledger) == {"question", "answer"}
+
+
+def test_lru_eviction_persists_to_backend(tmp_path):
+    backend = SqliteSessionBackend(str(tmp_path / "session.db"))
+    store = SessionStore(max_bytes=3000, backend=backend)
+
+    first = store.get_or_create("s1")
+    first.append_turn("q" * 1000, "a" * 1000)
+    first.digital_employees["task"] = {"search": "研究员"}
+    store.release(first)
+
+    second = store.get_or_create("s2")
+    second.append_turn("q" * 1000, "a" * 1000)
+    store.release(second)
+
+    assert "s1" not in store
+    assert "s2" in store
+    assert store.total_bytes <= 3000
+
+    restored = store.get_or_create("s1")
+    assert [m.content for m in restored.history] == ["q" * 1000, "a" * 1000]
+    assert restored.digital_employees == {"task": {"search": "研究员"}}
+    assert restored.tool_cache_ttl == store.tool_cache_ttl
+
+
+def test_session_in_use_is_not_evicted_and_saved_on_release(tmp_path):
+    backend = SqliteSessionBackend(str(tmp_path / "session.db"))
+    store = SessionStore(max_bytes=1, backend=backend)
+
+    first = store.get_or_create("A")
+    store.get_or_create("B")
+    # A 仍在请求中，超出预算也不淘汰
+    assert "A" in store
+
+    first.append_turn("q1", "answer1")
+    store.release(first)
+
+    assert "A" not in store
+    assert [m.content for m in store.get_or_create("A").history] == ["q1", "answer1"]
+
+
+def test_session_owner_and_exclusive_use(tmp_path):
+    backend = SqliteSessionBackend(str(tmp_path / "session.db"))
+    store = SessionStore(backend=backend)
+
+    session = store.get_or_create("s1", owner="alice", exclusive=True)
+    with pytest.raises(SessionConflictError):
+        store.get_or_create("s1", owner="bob")
+    with pytest.raises(SessionConflictError):
+        store.get_or_create("s1", owner="alice", exclusive=True)
+    store.release(session)
+
+    # 归属随会话落盘，从后端回读后仍然生效
+    reloaded = SessionStore(backend=backend)
+    with pytest.raises(SessionConflictError):
+        reloaded.check_access("s1", "bob")
+    reloaded.check_access("s1", "alice")
+    assert reloaded.get_or_create("s1", owner="alice", exclusive=True).owner == "alice"
+
+
+def test_default_store_from_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(SessionStore, "_default", None)
+    config = GenieConfig(
+        session_db_path=str(tmp_path / "session.db"),
+        session_tool_cache_ttl=30,
+        session_cacheable_tools=["search"],
+    )
+
+    store = SessionStore.from_config(config)
+
+    assert store is SessionStore.get_default()
+    assert isinstance(store.backend, SqliteSessionBackend)
+    assert store.get_or_create("s1").is_tool_cacheable("search")
@@ -0,0 +1,168 @@
+import asyncio
+import time
+import pytest
+from agent_backend.agent.agent_core.agent_checkpoint import SqliteCheckpointer
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_core.task_scheduler import TaskScheduler
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_enums.agent_type import RoleType
+from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_tracing.printer import Printer
+from agent_backend.agent_config.genie_config import GenieConfig
+
+
+class ListPrinter(Printer):
+    def __init__(self):
+        self.events = []
+
+    def send(self, message_id, message_type, message, digital_employee=None, is_final=None):
+        self.events.append(message)
+
+    def send_simple(self, message_type, message, digital_employee=None):
+        self.send(None, message_type, message, digital_employee, True)
+
+    def send_partial(self, message_id, message_type, message, is_final=None):
+        self.send(message_id, message_type, message, None, is_final)
+
+    def close(self):
+        pass
+
+    def update_agent_type(self, agent_type):
+        pass
+
+
+class EchoTool(BaseTool):
+    name = "echo"
+    description = "echo"
+
+    def to_params(self):
+        return {}
+
+    def execute(self, tool_input):
+        return tool_input
+
+
+class ResearchAgent(BaseAgent):
+    def __init__(self, context, delay):
+        super().__init__(
+            name="executor",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=3,
+        )
+        self.delay = delay
+        self.available_tools = context.tool_collection
+
+    async def step(self):
+        task = self.context.task
+        self.available_tools.update_digital_employee({"echo": task})
+        self.context.printer.send_simple("task", f"{task} start")
+        await asyncio.sleep(self.delay[task])
+        label = self.available_tools.get_digital_employee("echo")
+        self.context.printer.send_simple("task", f"{task} end {label}")
+        self.state = AgentState.FINISHED
+        return await self.available_tools.execute("echo", task)
+
+
+@pytest.mark.asyncio
+async def test_independent_tasks_run_concurrently_in_order():
+    printer = ListPrinter()
+    tools = ToolCollection()
+    tools.add_tool(EchoTool())
+    context = AgentContext(request_id="r1", printer=printer, tool_collection=tools)
+    delay = {"t0": 0.2, "t1": 0.05, "t2": 0.1, "t3": 0.05, "t4": 0.15}
+
+    started = time.monotonic()
+    results = await TaskScheduler(max_parallel=5).run_tasks(
+        context, list(delay), lambda ctx: ResearchAgent(ctx, delay)
+    )
+    elapsed = time.monotonic() - started
+
+    assert results == ["t0", "t1", "t2", "t3", "t4"]
+    assert elapsed < 0.4
+    # 每个 task 的数字员工互不干扰，输出按 task 顺序
+    assert printer.events == [
+        item for task in delay for item in (f"{task} start", f"{task} end {task}")
+    ]
+    assert tools.digital_employees is None
+
+
+@pytest.mark.asyncio
+async def test_parallelism_limit_and_failures():
+    running = 0
+    peak = 0
+
+    class LimitedAgent(ResearchAgent):
+        async def step(self):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            if self.context.task == "bad":
+                raise RuntimeError("boom")
+            self.state = AgentState.FINISHED
+            return self.context.task
+
+    context = AgentContext(request_id="r2", tool_collection=ToolCollection())
+    results = await TaskScheduler(max_parallel=2).run_tasks(
+        context, ["a", "bad", "c", "d"], lambda ctx: LimitedAgent(ctx, {})
+    )
+
+    assert peak == 2
+    assert results == ["a", "Task Error: boom", "c", "d"]
+
+
+def test_fork_shares_registry_copy_on_write():
+    tools = ToolCollection()
+    tools.add_tool(EchoTool())
+    overlay = tools.fork()
+    overlay.update_digital_employee({"echo": "专员"})
+
+    assert overlay.get_tool("echo") is tools.get_tool("echo")
+    assert tools.get_digital_employee("echo") is None
+
+    class OtherTool(EchoTool):
+        name = "other"
+
+    overlay.add_tool(OtherTool())
+    assert "other" not in tools.tool_map
+
+
+class CrashAfterFirstStepAgent(BaseAgent):
+    def __init__(self, context):
+        super().__init__(
+            name="executor",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=3,
+        )
+
+    async def step(self):
+        if self.current_step == 2:
+            raise RuntimeError("worker died")
+        self.update_memory(RoleType.ASSISTANT, f"{self.context.task} step 1")
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_task_checkpoints_do_not_collide(tmp_path):
+    checkpointer = SqliteCheckpointer(str(tmp_path / "ckpt.db"))
+    context = AgentContext(request_id="r1", tool_collection=ToolCollection(), checkpointer=checkpointer)
+
+    results = await TaskScheduler.from_config(GenieConfig(task_max_parallel=2)).run_tasks(
+        context, ["t0", "t1"], CrashAfterFirstStepAgent
+    )
+
+    assert results == ["Task Error: worker died"] * 2
+    for index, task in enumerate(["t0", "t1"]):
+        checkpoint = checkpointer.load("r1", f"executor#task{index}")
+        assert [m["content"] for m in checkpoint.messages] == [task, f"{task} step 1"]
@@ -0,0 +1,86 @@
+from agent_backend.agent.agent_enums.agent_type import MessageKind, RoleType
+from agent_backend.agent.agent_schema.memory import Memory
+from agent_backend.agent.agent_schema.message import Message
+from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
+
+
+def _tool_call(call_id: str) -> ToolCall:
+    return ToolCall(
+        id=call_id,
+        type="function",
+        function=ToolCall.Function(name="search", arguments="{}"),
+    )
+
+
+def _build_memory() -> Memory:
+    memory = Memory()
+    memory.add_message(Message.user_message("question"))
+    memory.mark_step(1)
+    memory.add_message(Message.user_message("根据当前状态和可用工具，确定下一步行动"))
+    memory.add_message(Message.from_tool_calls("thinking", [_tool_call("c1")]))
+    memory.add_message(Message.tool_message("tool output", "c1"))
+    memory.mark_step(2)
+    memory.add_message(Message.assistant_message("answer"))
+    return memory
+
+
+def test_role_and_step_queries():
+    memory = _build_memory()
+
+    assert memory.get_last_user_message().content.startswith("根据当前状态")
+    assert memory.get_last_message_by_role(RoleType.TOOL).tool_call_id == "c1"
+    assert memory.get_last_message_by_role(RoleType.SYSTEM) is None
+    assert [m.content for m in memory.get_messages_since_step(2)] == ["answer"]
+    assert len(memory.get_messages_since_step(1)) == 4
+    assert len(memory.get_messages_since_step(0)) == 5
+    assert [m.content for m in memory.get_window(2)] == ["tool output", "answer"]
+
+
+def test_clear_tool_context_uses_kinds():
+    memory = _build_memory()
+    assert memory.count_by_kind(MessageKind.NEXT_STEP_PROMPT) == 1
+
+    memory.clear_tool_context()
+
+    assert [m.content for m in memory.messages] == ["question", "answer"]
+    assert memory.count_by_kind(MessageKind.TOOL_RESULT) == 0
+    assert [m.content for m in memory.get_messages_since_step(2)] == ["answer"]
+
+
+def test_snapshot_is_stable():
+    memory = _build_memory()
+    snapshot = memory.snapshot()
+
+    memory.add_message(Message.user_message("follow up"))
+    memory.clear()
+
+    assert len(snapshot) == 5
+    assert snapshot[-1].content == "answer"
+    assert memory.is_empty()
+
+
+def test_format_message_matches_original_layout():
+    memory = Memory()
+    memory.add_message(Message.user_message("hi"))
+    memory.add_message(Message.assistant_message("hello"))
+
+    assert memory.get_format_message() == (
+        f"role:{RoleType.USER} content:hi\nrole:{RoleType.ASSISTANT} content:hello"
+    )
+
+    # 外部直接修改 messages 时索引自动重建
+    memory.messages.append(Message.user_message("direct"))
+    assert memory.get_last_user_message().content == "direct"
+    assert memory.get_format_message().endswith("content:direct")
+
+
+def test_format_message_follows_in_place_update():
+    memory = Memory()
+    message = Message.assistant_message("draft")
+    memory.add_message(Message.user_message("hi"))
+    memory.add_message(message)
+    assert memory.get_format_message().endswith("content:draft")
+
+    message.content = "final"
+
+    assert memory.get_format_message().endswith("content:final")
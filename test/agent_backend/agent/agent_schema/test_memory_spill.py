@@ -0,0 +1,122 @@
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.session_store import AgentSession
+from agent_backend.agent.agent_llms.llm import LLMClient
+from agent_backend.agent.agent_llms.llm_setting_params import LLMParams
+from agent_backend.agent.agent_schema.memory import Memory
+from agent_backend.agent.agent_schema.memory_spill import MessageSpillStore, SpilledMessage
+from agent_backend.agent.agent_schema.message import Message
+from agent_backend.agent_config.genie_config import GenieConfig
+
+
+def _store(tmp_path, hot_window=2):
+    return MessageSpillStore(
+        str(tmp_path / "spill.db"), hot_window=hot_window, min_spill_bytes=10
+    )
+
+
+def test_cold_messages_spill_and_page_in(tmp_path):
+    store = _store(tmp_path)
+    memory = Memory(spill_store=store)
+    big = "x" * 100
+    memory.add_message(Message.user_message(big + "0", base64_image="img"))
+    memory.add_message(Message.tool_message(big + "1", "call-1"))
+    memory.add_message(Message.assistant_message("short"))
+    memory.add_message(Message.assistant_message(big + "3"))
+    # 仍在 LLM 上下文中的消息不落盘
+    assert memory.spilled_count() == 0
+
+    memory.mark_out_of_context(3)
+
+    # 前两条已移出上下文、超出热窗口且足够大，已替换为桩
+    assert isinstance(memory.messages[0], SpilledMessage)
+    assert isinstance(memory.messages[1], SpilledMessage)
+    assert not isinstance(memory.messages[3], SpilledMessage)
+    assert memory.spilled_count() == 2
+
+    # 读取透明换入，元数据保留在内存中
+    assert memory.get(0).content == big + "0"
+    assert memory.get(0).base64_image == "img"
+    assert memory.get(1).tool_call_id == "call-1"
+    assert memory.get_format_message().splitlines()[1].endswith(big + "1")
+    assert memory.messages[1].to_dict()["content"] == big + "1"
+
+    # 重新赋值后不再依赖磁盘
+    memory.messages[0].content = "edited"
+    assert memory.get(0).content == "edited"
+    assert memory.get(0).base64_image == "img"
+
+
+def test_snapshot_unaffected_by_spill_and_clear(tmp_path):
+    store = _store(tmp_path)
+    memory = Memory(spill_store=store)
+    big = "x" * 100
+    memory.add_message(Message.user_message(big + "0"))
+    memory.add_message(Message.assistant_message(big + "1"))
+    before = memory.snapshot()
+    memory.add_message(Message.assistant_message(big + "2"))
+    memory.add_message(Message.assistant_message(big + "3"))
+    memory.mark_out_of_context(2)
+
+    # 落盘不原地修改已发出快照的消息列表
+    assert not isinstance(before[0], SpilledMessage)
+    after = memory.snapshot()
+    assert isinstance(after[0], SpilledMessage)
+
+    # clear 之后，快照中的桩仍可换入
+    memory.clear()
+    assert after[0].content == big + "0"
+
+
+def test_segment_dropped_when_last_stub_released(tmp_path):
+    store = _store(tmp_path, hot_window=0)
+    memory = Memory(spill_store=store)
+    memory.add_message(Message.user_message("y" * 50))
+    memory.mark_out_of_context(1)
+    stub = memory.get(0)
+    segment_id = memory._segment.segment_id
+
+    memory.clear()
+    assert stub.content == "y" * 50
+
+    del stub
+    assert store.get(segment_id, 1) == (None, None)
+
+
+def test_llm_truncation_marks_messages_out_of_context(tmp_path, monkeypatch):
+    store = _store(tmp_path, hot_window=1)
+    memory = Memory(spill_store=store)
+    for i in range(4):
+        memory.add_message(Message.user_message(f"{i}" * 100))
+    llm = LLMClient(LLMParams(model_name="m", api_key="k", base_url="http://llm.test", max_tokens=25))
+    # 每条 10 token，预算只够最近两条
+    monkeypatch.setattr(llm, "count_message_tokens", lambda message, ledger=None: 10)
+    session = AgentSession("s1")
+    context = AgentContext(request_id="r1", session=session)
+
+    formatted = llm._prepare_messages(context, memory.context_messages(), None)
+
+    assert [m["content"][0] for m in formatted] == ["2", "3"]
+    assert memory.spilled_count() == 2
+    assert len(memory.context_messages()) == 2
+    # 已落盘的消息不进入格式化缓存
+    llm.format_messages(memory.messages, is_claude=False, session=session)
+    assert all(not isinstance(message, SpilledMessage) for message, _ in session.formatted_cache.values())
+
+
+def test_memory_without_store_keeps_messages():
+    memory = Memory()
+    memory.add_message(Message.user_message("z" * 5000))
+    assert not isinstance(memory.get(0), SpilledMessage)
+
+
+def test_default_store_from_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(MessageSpillStore, "_default", None)
+    assert MessageSpillStore.from_config(GenieConfig()) is None
+
+    config = GenieConfig(memory_spill_db_path=str(tmp_path / "spill.db"), memory_hot_window=4)
+    store = MessageSpillStore.from_config(config)
+
+    assert store is MessageSpillStore.get_default()
+    assert store.hot_window == 4
+    # 未显式传入 store 的 Memory 使用默认实例
+    assert Memory()._spill_store is store
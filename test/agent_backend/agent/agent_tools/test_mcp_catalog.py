@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from agent_backend.agent.agent_tools.mcp.mcp_catalog import McpToolCatalog
+from agent_backend.agent.agent_tools.mcp.mcp_client import McpClient
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+
+FAST = "http://fast.test/mcp"
+SLOW = "http://slow.test/mcp"
+
+
+class FakeProxy:
+    """
+    /v1/tool/list：SLOW 服务延迟返回，支持 If-None-Match
+    """
+
+    def __init__(self, slow_delay: float = 0.3):
+        self.slow_delay = slow_delay
+        self.fail = set()
+        self.lists = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        server_url = json.loads(request.content)["server_url"]
+        self.lists += 1
+        if server_url in self.fail:
+            return httpx.Response(502)
+        if server_url == SLOW:
+            await asyncio.sleep(self.slow_delay)
+        etag = f'"{server_url}-v1"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        name = "fast_search" if server_url == FAST else "slow_report"
+        tools = [{"name": name, "description": name, "inputSchema": {"type": "object"}}]
+        return httpx.Response(200, json={"code": 200, "data": tools}, headers={"ETag": etag})
+
+
+def test_slow_server_does_not_block_start():
+    proxy = FakeProxy()
+    McpClient.configure(proxy_url="http://proxy.test", transport=httpx.MockTransport(proxy.handle))
+    catalog = McpToolCatalog([FAST, SLOW], ttl=60, discovery_timeout=0.05)
+
+    async def run():
+        begin = time.monotonic()
+        await catalog.start()
+        started_in = time.monotonic() - begin
+        early = set(catalog.extend(ToolCollection()).mcp_tool_map)
+        freshness = catalog.freshness()
+        await asyncio.sleep(0.4)
+        late = set(catalog.extend(ToolCollection()).mcp_tool_map)
+        await catalog.stop()
+        return started_in, early, freshness, late
+
+    started_in, early, freshness, late = asyncio.run(run())
+    assert started_in < 0.2
+    assert early == {"fast_search"}
+    assert freshness[SLOW]["refreshing"] and freshness[SLOW]["stale"]
+    assert not freshness[FAST]["stale"]
+    assert late == {"fast_search", "slow_report"}
+    McpClient.configure()
+
+
+def test_refresh_uses_etag_and_keeps_tools_on_failure():
+    proxy = FakeProxy()
+    McpClient.configure(proxy_url="http://proxy.test", transport=httpx.MockTransport(proxy.handle))
+    catalog = McpToolCatalog([FAST], ttl=60)
+    base = ToolCollection()
+
+    async def run():
+        changed = await catalog.refresh(FAST)
+        extended = catalog.extend(base)
+        unchanged = await catalog.refresh(FAST)
+        proxy.fail.add(FAST)
+        failed = await catalog.refresh(FAST)
+        return changed, extended, unchanged, failed
+
+    changed, extended, unchanged, failed = asyncio.run(run())
+    assert (changed, unchanged, failed) == (True, False, False)
+    # 304 与失败都不重建派生工具集
+    assert catalog.extend(base) is extended
+    assert json.loads(extended.get_mcp_tool("fast_search").parameters) == {"type": "object"}
+    assert catalog.freshness()[FAST]["error"].startswith("McpError")
+    assert catalog.freshness()[FAST]["tools"] == 1
+    McpClient.configure()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+
+import httpx
+
+from agent_backend.agent.agent_errors.agent_exception import McpError
+from agent_backend.agent.agent_tools.mcp.mcp_client import McpClient
+from agent_backend.agent.agent_util.circuit_breaker import CircuitBreakerRegistry
+
+SERVER = "http://mcp.test/mcp"
+
+
+class FakeMcpServer:
+    """
+    streamable HTTP MCP 服务：initialize 分配会话，tools/call 以 SSE 返回；batch=False 时拒绝 JSON-RPC 批量请求
+    """
+
+    def __init__(self, batch: bool = True):
+        self.batch = batch
+        self.initialized = 0
+        self.calls = []
+        self.posts = 0
+        self.expire_next = False
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "DELETE":
+            self.calls.append(("DELETE", request.headers.get("Mcp-Session-Id")))
+            return httpx.Response(200)
+        self.posts += 1
+        body = json.loads(request.content)
+        session = request.headers.get("Mcp-Session-Id")
+        if isinstance(body, list):
+            if not self.batch:
+                return httpx.Response(400, json={"jsonrpc": "2.0", "id": None,
+                                                 "error": {"code": -32600, "message": "batch not supported"}})
+            self.calls.extend((item["method"], session) for item in body)
+            events = "".join(f"data: {json.dumps(self._reply(item))}\n\n" for item in reversed(body))
+            return httpx.Response(200, content=events.encode("utf-8"), headers={"Content-Type": "text/event-stream"})
+
+        method = body["method"]
+        self.calls.append((method, session))
+        if method == "initialize":
+            self.initialized += 1
+            return httpx.Response(
+                200,
+                json={"jsonrpc": "2.0", "id": body["id"], "result": {"protocolVersion": "2025-03-26"}},
+                headers={"Mcp-Session-Id": f"s{self.initialized}"},
+            )
+        if method == "notifications/initialized":
+            return httpx.Response(202)
+        if self.expire_next:
+            self.expire_next = False
+            return httpx.Response(404)
+        if method == "tools/list":
+            return httpx.Response(200, json={
+                "jsonrpc": "2.0", "id": body["id"],
+                "result": {"tools": [{"name": "echo", "description": "d", "inputSchema": {}}]},
+            })
+        message = json.dumps(self._reply(body))
+        return httpx.Response(
+            200,
+            content=f"event: message\ndata: {message}\n\n".encode("utf-8"),
+            headers={"Content-Type": "text/event-stream"},
+        )
+
+    @staticmethod
+    def _reply(body):
+        text = body["params"]["arguments"]["text"]
+        if text == "bad":
+            return {"jsonrpc": "2.0", "id": body["id"], "error": {"code": -32602, "message": "bad text"}}
+        return {"jsonrpc": "2.0", "id": body["id"], "result": {"content": [{"type": "text", "text": text}]}}
+
+
+def test_direct_session_is_reused_across_calls():
+    server = FakeMcpServer()
+    McpClient.configure(direct=True, transport=httpx.MockTransport(server.handle))
+
+    async def run():
+        tools = await McpClient.list_tools(SERVER)
+        results = await asyncio.gather(*(McpClient.call_tool(SERVER, "echo", {"text": str(i)}) for i in range(3)))
+        await McpClient.aclose()
+        return tools, results
+
+    tools, results = asyncio.run(run())
+    assert [tool["name"] for tool in tools] == ["echo"]
+    assert results == ["0", "1", "2"]
+    assert server.initialized == 1
+    assert all(session == "s1" for method, session in server.calls if method == "tools/call")
+    # initialize + initialized + tools/list + 一次批量 tools/call
+    assert server.posts == 4
+    assert server.calls[-1] == ("DELETE", "s1")
+
+
+def test_expired_session_is_reinitialized_once():
+    server = FakeMcpServer()
+    McpClient.configure(direct=True, transport=httpx.MockTransport(server.handle))
+
+    async def run():
+        await McpClient.call_tool(SERVER, "echo", {"text": "a"})
+        server.expire_next = True
+        return await McpClient.call_tool(SERVER, "echo", {"text": "b"})
+
+    assert asyncio.run(run()) == "b"
+    assert server.initialized == 2
+    assert server.calls[-1] == ("tools/call", "s2")
+
+
+def test_batch_results_are_demultiplexed_and_fallback_when_rejected():
+    async def run(server):
+        McpClient.configure(direct=True, transport=httpx.MockTransport(server.handle))
+        calls = [McpClient.call_tool(SERVER, "echo", {"text": text}) for text in ("a", "bad", "c")]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    for server in (FakeMcpServer(batch=True), FakeMcpServer(batch=False)):
+        results = asyncio.run(run(server))
+        assert results[0] == "a" and results[2] == "c"
+        assert "bad text" in str(results[1])
+        assert [method for method, _ in server.calls].count("tools/call") == 3
+    McpClient.configure()
+
+
+def test_batch_resolves_each_call_on_arrival_and_counts_once(monkeypatch):
+    monkeypatch.setattr(CircuitBreakerRegistry, "_breakers", {})
+    server = FakeMcpServer()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if not isinstance(body, list):
+            return server.handle(request)
+
+        async def events():
+            # 只回第一个调用，随后读超时
+            yield f"data: {json.dumps(server._reply(body[0]))}\n\n".encode("utf-8")
+            await release.wait()
+            raise httpx.ReadTimeout("read timed out")
+
+        return httpx.Response(200, content=events(), headers={"Content-Type": "text/event-stream"})
+
+    McpClient.configure(direct=True, transport=httpx.MockTransport(handler))
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(McpClient.call_tool(SERVER, "echo", {"text": "a"}))
+        second = asyncio.ensure_future(McpClient.call_tool(SERVER, "echo", {"text": "b"}))
+        # 第一个调用不等待整批即返回
+        result = await asyncio.wait_for(first, 1)
+        pending = not second.done()
+        release.set()
+        error = await asyncio.gather(second, return_exceptions=True)
+        return result, pending, error[0]
+
+    release = None
+    result, pending, error = asyncio.run(run())
+    assert result == "a"
+    assert pending
+    assert isinstance(error, McpError) and "ReadTimeout" in str(error)
+    metrics = CircuitBreakerRegistry.metrics()[SERVER]
+    # 整批（含会话初始化）在熔断中只计一次
+    assert (metrics["calls"], metrics["failures"]) == (1, 1)
+    McpClient.configure()
+
+
+def test_proxy_mode_keeps_client_protocol():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.url.path, json.loads(request.content)))
+        if request.url.path.endswith("/list"):
+            return httpx.Response(200, json={"code": 200, "data": [{"name": "echo"}]})
+        return httpx.Response(200, text='{"code": 200, "data": "ok"}')
+
+    McpClient.configure(proxy_url="http://proxy.test", transport=httpx.MockTransport(handler))
+
+    async def run():
+        tools = await McpClient.list_tools(SERVER)
+        result = await McpClient.call_tool(SERVER, "echo", {"text": "a"})
+        return tools, result
+
+    tools, result = asyncio.run(run())
+    assert tools == [{"name": "echo"}]
+    assert result == '{"code": 200, "data": "ok"}'
+    assert requests[1] == ("/v1/tool/call", {"server_url": SERVER, "name": "echo", "arguments": {"text": "a"}})
+    McpClient.configure()
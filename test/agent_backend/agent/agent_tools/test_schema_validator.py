@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_errors.agent_exception import ToolArgumentError
+from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
+from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.schema_validator import SchemaValidator
+
+SEARCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string", "minLength": 1},
+        "top_k": {"type": "integer", "minimum": 1, "maximum": 50},
+        "fresh": {"type": "boolean"},
+        "mode": {"type": "string", "enum": ["web", "news"]},
+        "filters": {"type": "object", "properties": {"site": {"type": "string"}}},
+    },
+    "required": ["query"],
+}
+
+
+class SearchTool(BaseTool):
+    name = "search"
+    description = "search"
+
+    def __init__(self):
+        self.calls = []
+
+    def to_params(self):
+        return SEARCH_SCHEMA
+
+    def execute(self, input):
+        self.calls.append(input)
+        return f"top_k={input.get('top_k')}"
+
+
+class ToolAgent(BaseAgent):
+    def __init__(self, context):
+        super().__init__(name="tool", description="", system_prompt="", next_step_prompt="", context=context)
+
+    async def step(self):
+        return ""
+
+
+def test_coerces_model_type_drift():
+    validator = SchemaValidator(SEARCH_SCHEMA)
+    args = {"query": "q", "top_k": "5", "fresh": "true", "filters": '{"site": "jd.com"}'}
+
+    result = validator.validate(args)
+
+    assert result == {"query": "q", "top_k": 5, "fresh": True, "filters": {"site": "jd.com"}}
+    # 原参数不被修改
+    assert args["top_k"] == "5"
+
+
+def test_valid_arguments_returned_as_is():
+    args = {"query": "q", "top_k": 3}
+
+    assert SchemaValidator(SEARCH_SCHEMA).validate(args) is args
+
+
+def test_reports_all_errors_with_paths():
+    with pytest.raises(ToolArgumentError) as info:
+        SchemaValidator(SEARCH_SCHEMA).validate({"top_k": 99, "mode": "image"})
+
+    errors = info.value.errors
+    assert "arguments: missing required property 'query'" in errors
+    assert "arguments.top_k: expected <= 50, got 99" in errors
+    assert any(error.startswith('arguments.mode: "image" is not one of') for error in errors)
+
+
+def test_refs_and_nullable():
+    schema = {
+        "$defs": {
+            "node": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}, "children": {"type": "array", "items": {"$ref": "#/$defs/node"}}},
+                "required": ["name"],
+            }
+        },
+        "type": "object",
+        "properties": {"root": {"$ref": "#/$defs/node"}, "note": {"type": "string", "nullable": True}},
+        "additionalProperties": False,
+    }
+    validator = SchemaValidator(schema)
+
+    assert validator.validate({"root": {"name": "a", "children": [{"name": "b"}]}, "note": None})
+    with pytest.raises(ToolArgumentError) as info:
+        validator.validate({"root": {"name": "a", "children": [{}]}, "extra": 1})
+    assert info.value.errors == [
+        "arguments.root.children[0]: missing required property 'name'",
+        "arguments: unexpected property 'extra'",
+    ]
+
+
+def test_any_of_picks_matching_branch():
+    validator = SchemaValidator({"anyOf": [{"type": "integer"}, {"type": "string", "enum": ["all"]}]})
+
+    assert validator.validate("all") == "all"
+    assert validator.validate("7") == 7
+    with pytest.raises(ToolArgumentError):
+        validator.validate("some")
+
+
+def test_one_of_requires_exactly_one_branch():
+    validator = SchemaValidator({"oneOf": [{"type": "integer"}, {"type": "number", "minimum": 10}]})
+
+    assert validator.validate(3) == 3
+    assert validator.validate(10.5) == 10.5
+    # 原值不匹配时按类型修正后的分支判断
+    assert validator.validate("3") == 3
+    with pytest.raises(ToolArgumentError) as info:
+        validator.validate(12)
+    assert info.value.errors == ["arguments: matches 2 oneOf branches, expected exactly one"]
+
+
+def test_validator_cached_per_tool_set_version():
+    context = AgentContext(request_id="r1")
+    agent = ToolAgent(context)
+    agent.available_tools.add_tool(SearchTool())
+
+    first = agent.available_tools.get_validator("search")
+
+    assert first is agent.available_tools.get_validator("search")
+    assert agent.available_tools.get_validator("unknown") is None
+
+
+def test_execute_tool_rejects_invalid_arguments_without_dispatch():
+    context = AgentContext(request_id="r1")
+    agent = ToolAgent(context)
+    tool = SearchTool()
+    agent.available_tools.add_tool(tool)
+
+    def call(arguments):
+        command = ToolCall(id="c1", type="function", function=ToolCall.Function(name="search", arguments=arguments))
+        return asyncio.run(agent.execute_tool(command))
+
+    invalid = call('{"top_k": 0}')
+    broken = call('{"query": ')
+    coerced = call('{"query": "q", "top_k": "5"}')
+
+    assert invalid.startswith("Tool search arguments invalid:")
+    assert "missing required property 'query'" in invalid
+    assert broken.startswith("Tool search arguments are not valid JSON")
+    assert coerced == "top_k=5"
+    assert tool.calls == [{"query": "q", "top_k": 5}]
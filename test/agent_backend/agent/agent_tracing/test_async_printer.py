@@ -0,0 +1,105 @@
+import asyncio
+import time
+from agent_backend.agent.agent_tracing.async_printer import AsyncPrinter, OverflowPolicy
+from agent_backend.agent.agent_tracing.printer import Printer
+
+
+class SlowPrinter(Printer):
+    """
+    记录收到的消息，flush 模拟慢客户端
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.events = []
+        self.closed = False
+
+    def send(self, message_id, message_type, message, digital_employee=None, is_final=None):
+        self.events.append((message_id, message_type, message, is_final))
+
+    def send_simple(self, message_type, message, digital_employee=None):
+        self.events.append((None, message_type, message, True))
+
+    def send_partial(self, message_id, message_type, message, is_final=None):
+        self.events.append((message_id, message_type, message, is_final))
+
+    async def flush(self):
+        await asyncio.sleep(self.delay)
+
+    def close(self):
+        self.closed = True
+
+    def update_agent_type(self, agent_type):
+        pass
+
+
+def test_producer_not_blocked_by_slow_client():
+    async def _main():
+        downstream = SlowPrinter(delay=0.05)
+        printer = AsyncPrinter(downstream, max_queue=1000).start()
+        started = time.monotonic()
+        for i in range(200):
+            printer.send_partial("m1", "agent_stream", f"{i},")
+        printer.send_simple("result", "done")
+        enqueue_cost = time.monotonic() - started
+        await printer.aclose()
+        return downstream, printer, enqueue_cost
+
+    downstream, printer, enqueue_cost = asyncio.run(_main())
+    assert enqueue_cost < 0.05
+    assert downstream.closed
+    assert "".join(e[2] for e in downstream.events[:-1]) == "".join(f"{i}," for i in range(200))
+    assert downstream.events[-1][1] == "result"
+    assert printer.metrics()["sent"] == 201
+
+
+def test_coalesce_merges_deltas_when_full():
+    async def _main():
+        downstream = SlowPrinter()
+        printer = AsyncPrinter(downstream, max_queue=3, policy=OverflowPolicy.COALESCE).start()
+        printer.send_simple("task", "t1")
+        for delta in ["a", "b", "c", "d", "e"]:
+            printer.send_partial("m1", "agent_stream", delta)
+        printer.send_partial("m1", "agent_stream", "", is_final=True)
+        await printer.aclose()
+        return downstream, printer
+
+    downstream, printer = asyncio.run(_main())
+    partials = [e for e in downstream.events if e[0] == "m1"]
+    assert "".join(e[2] for e in partials) == "abcde"
+    assert partials[-1][3] is True
+    assert printer.coalesced == 3
+    assert printer.dropped == 0
+
+
+def test_drop_partial_keeps_final_messages():
+    async def _main():
+        downstream = SlowPrinter()
+        printer = AsyncPrinter(downstream, max_queue=2, policy=OverflowPolicy.DROP_PARTIAL).start()
+        for delta in ["a", "b", "c", "d"]:
+            printer.send_partial("m1", "agent_stream", delta)
+        printer.send_simple("result", "done")
+        await printer.aclose()
+        return downstream, printer
+
+    downstream, printer = asyncio.run(_main())
+    assert [e[2] for e in downstream.events] == ["a", "b", "done"]
+    assert printer.dropped == 2
+
+
+def test_block_policy_waits_for_writer():
+    async def _main():
+        downstream = SlowPrinter(delay=0.02)
+        printer = AsyncPrinter(downstream, max_queue=2, policy=OverflowPolicy.BLOCK).start()
+        for delta in ["a", "b", "c"]:
+            printer.send_partial("m1", "agent_stream", delta)
+        assert printer.metrics()["depth"] == 3
+        await printer.wait_writable()
+        depth_after_wait = printer.metrics()["depth"]
+        await printer.aclose()
+        return downstream, printer, depth_after_wait
+
+    downstream, printer, depth_after_wait = asyncio.run(_main())
+    assert depth_after_wait < 2
+    assert [e[2] for e in downstream.events] == ["a", "b", "c"]
+    assert printer.overflowed == 1
@@ -0,0 +1,97 @@
+import asyncio
+from agent_backend.agent.agent_tracing.coalescing_printer import (
+    CoalesceRule,
+    CoalescingPrinter,
+    parse_coalesce_rules,
+)
+from agent_backend.agent.agent_tracing.printer import Printer
+from agent_backend.agent_config.genie_config import GenieConfig
+
+
+class RecordingPrinter(Printer):
+    def __init__(self):
+        self.events = []
+        self.closed = False
+
+    def send(self, message_id, message_type, message, digital_employee=None, is_final=None):
+        self.events.append(("send", message_id, message_type, message, is_final))
+
+    def send_simple(self, message_type, message, digital_employee=None):
+        self.events.append(("simple", None, message_type, message, True))
+
+    def send_partial(self, message_id, message_type, message, is_final=None):
+        self.events.append(("partial", message_id, message_type, message, is_final))
+
+    def close(self):
+        self.closed = True
+
+    def update_agent_type(self, agent_type):
+        pass
+
+
+def test_parse_coalesce_rules():
+    rules = parse_coalesce_rules({"agent_stream": "100,512", "tool_thought": "50", "bad": "x"})
+    assert rules["agent_stream"] == CoalesceRule(window=0.1, max_bytes=512)
+    assert rules["tool_thought"].max_bytes == 1024
+    assert "bad" not in rules
+
+
+def test_wrap_without_rules_returns_printer():
+    downstream = RecordingPrinter()
+    assert CoalescingPrinter.wrap(downstream, {}) is downstream
+    # 旧的 message_interval（"首包,间隔" 分片数）不再被当作合并窗口
+    config = GenieConfig(message_interval={"agent_stream": "1,3"})
+    assert CoalescingPrinter.wrap(downstream, config.stream_coalesce) is downstream
+
+
+def test_flush_by_size_and_final():
+    downstream = RecordingPrinter()
+    printer = CoalescingPrinter(downstream, {"agent_stream": CoalesceRule(window=10, max_bytes=4)})
+    for delta in ["a", "b", "c", "d", "e"]:
+        printer.send_partial("m1", "agent_stream", delta)
+    printer.send_partial("m1", "agent_stream", "f", is_final=True)
+
+    assert [e[3] for e in downstream.events] == ["abcd", "ef"]
+    assert downstream.events[-1][4] is True
+
+
+def test_flush_by_time_window():
+    async def _main():
+        downstream = RecordingPrinter()
+        printer = CoalescingPrinter(downstream, {"agent_stream": CoalesceRule(window=0.02, max_bytes=1024)})
+        printer.send_partial("m1", "agent_stream", "he")
+        printer.send_partial("m1", "agent_stream", "llo")
+        assert downstream.events == []
+        await asyncio.sleep(0.06)
+        return downstream
+
+    downstream = asyncio.run(_main())
+    assert [e[3] for e in downstream.events] == ["hello"]
+
+
+def test_other_messages_flush_pending_first():
+    downstream = RecordingPrinter()
+    printer = CoalescingPrinter(downstream, {"agent_stream": CoalesceRule(window=10, max_bytes=1024)})
+    printer.send_partial("m1", "agent_stream", "think")
+    printer.send_simple("tool_thought", "call search")
+    printer.send_partial("m1", "agent_stream", "more")
+    printer.close()
+
+    assert [(e[0], e[3]) for e in downstream.events] == [
+        ("partial", "think"),
+        ("simple", "call search"),
+        ("partial", "more"),
+    ]
+    assert downstream.closed
+
+
+def test_long_answer_frames_reduced():
+    deltas = 2000
+    downstream = RecordingPrinter()
+    printer = CoalescingPrinter(downstream, {"agent_stream": CoalesceRule(window=10, max_bytes=1024)})
+    for i in range(deltas):
+        printer.send_partial("m1", "agent_stream", "tok ")
+    printer.send_partial("m1", "agent_stream", "", is_final=True)
+
+    assert "".join(e[3] for e in downstream.events) == "tok " * deltas
+    assert len(downstream.events) * 10 < deltas
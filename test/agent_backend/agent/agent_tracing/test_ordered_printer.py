@@ -0,0 +1,77 @@
+import asyncio
+from agent_backend.agent.agent_tracing.ordered_printer import OrderedPrinter
+from agent_backend.agent.agent_tracing.printer import Printer
+
+
+class RecordingPrinter(Printer):
+    """
+    记录收到的消息与 wait_writable 调用次数
+    """
+
+    def __init__(self):
+        self.events = []
+        self.waits = 0
+
+    def send(self, message_id, message_type, message, digital_employee=None, is_final=None):
+        self.events.append(message)
+
+    def send_simple(self, message_type, message, digital_employee=None):
+        self.events.append(message)
+
+    def send_partial(self, message_id, message_type, message, is_final=None):
+        self.events.append(message)
+
+    async def wait_writable(self):
+        self.waits += 1
+
+    def close(self):
+        pass
+
+    def update_agent_type(self, agent_type):
+        pass
+
+
+def test_channel_forwards_wait_writable():
+    async def _main():
+        downstream = RecordingPrinter()
+        ordered = OrderedPrinter(downstream, 2)
+        await ordered.channel(0).wait_writable()
+        await ordered.channel(1).wait_writable()
+        assert downstream.waits == 2
+
+    asyncio.run(_main())
+
+
+def test_full_buffer_waits_for_head():
+    async def _main():
+        downstream = RecordingPrinter()
+        ordered = OrderedPrinter(downstream, 2, max_buffer=2)
+        head = ordered.channel(0)
+        tail = ordered.channel(1)
+        tail.send_simple("text", "b1")
+        tail.send_simple("text", "b2")
+
+        waiter = asyncio.create_task(tail.wait_writable())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert ordered.pending_count() == 2
+
+        head.send_simple("text", "a1")
+        head.close()
+        await asyncio.wait_for(waiter, 1)
+        assert downstream.events == ["a1", "b1", "b2"]
+
+    asyncio.run(_main())
+
+
+def test_no_wait_when_head_not_started():
+    async def _main():
+        downstream = RecordingPrinter()
+        ordered = OrderedPrinter(downstream, 2, max_buffer=1)
+        tail = ordered.channel(1)
+        tail.send_simple("text", "b1")
+        # head 还没拿到并发名额，不能让后续 task 占着名额等它
+        await asyncio.wait_for(tail.wait_writable(), 1)
+        assert downstream.events == []
+
+    asyncio.run(_main())
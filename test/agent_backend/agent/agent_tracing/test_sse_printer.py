@@ -0,0 +1,69 @@
+from agent_backend.agent.agent_tracing.sse_printer import SSEPrinter
+from agent_backend.agent_model.req.agent_request import AgentRequest
+from agent_backend.agent_model.response import agent_response_codec
+from agent_backend.agent_model.response.agent_response import AgentResponse
+
+
+class _ListEmitter:
+    def __init__(self):
+        self.responses = []
+
+    def send(self, response):
+        self.responses.append(agent_response_codec.to_payload(response))
+
+    def complete(self):
+        pass
+
+
+def _plan(status, steps=None):
+    steps = steps or [f"执行顺序{i + 1}. 阶段{i}：步骤{i}" for i in range(len(status))]
+    return AgentResponse.Plan(title="计划", steps=steps, step_status=list(status), notes=[""] * len(steps))
+
+
+def _printer(plan_patch=True):
+    emitter = _ListEmitter()
+    printer = SSEPrinter(emitter, AgentRequest(request_id="r1", query="q"), 5, plan_patch)
+    return printer, emitter
+
+
+def test_plan_update_emits_patch_with_changed_indexes():
+    printer, emitter = _printer()
+    status = ["not_started"] * 20
+    printer.send_simple("plan", _plan(status))
+    status[3] = "completed"
+    printer.send_simple("plan", _plan(status))
+
+    full, patch = emitter.responses
+    assert full["messageType"] == "plan"
+    assert full["plan"]["stages"][0] == "阶段0"
+    assert full["plan"]["version"] == 1
+    assert patch["messageType"] == "plan_patch"
+    assert "plan" not in patch
+    assert patch["planPatch"] == {"baseVersion": 1, "version": 2, "stepStatus": {"3": "completed"}}
+
+
+def test_unchanged_plan_is_not_resent():
+    printer, emitter = _printer()
+    printer.send_simple("plan", _plan(["not_started"]))
+    printer.send_simple("plan", _plan(["not_started"]))
+    assert len(emitter.responses) == 1
+
+
+def test_step_count_change_and_snapshot_send_full_plan():
+    printer, emitter = _printer()
+    printer.send_simple("plan", _plan(["completed"]))
+    printer.send_simple("plan", _plan(["completed", "not_started"]))
+    printer.send_plan_snapshot()
+
+    assert [r["messageType"] for r in emitter.responses] == ["plan", "plan", "plan"]
+    assert emitter.responses[1]["plan"]["version"] == 2
+    # 快照与最近一次计划一致，版本号不变
+    assert emitter.responses[2]["plan"] == emitter.responses[1]["plan"]
+
+
+def test_plan_patch_disabled_always_sends_full_plan():
+    printer, emitter = _printer(plan_patch=False)
+    printer.send_simple("plan", _plan(["not_started"]))
+    printer.send_simple("plan", _plan(["completed"]))
+    assert [r["messageType"] for r in emitter.responses] == ["plan", "plan"]
+    assert emitter.responses[1]["plan"]["stepStatus"] == ["completed"]
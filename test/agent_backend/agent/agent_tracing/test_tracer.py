@@ -0,0 +1,137 @@
+import asyncio
+import json
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.reactagnet import ReActAgent
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_schema.tool.tool_call import ToolCall
+from agent_backend.agent.agent_tools.base_tool import BaseTool
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_tracing.tracer import (
+    NOOP_SPAN,
+    ChromeTraceExporter,
+    JsonLinesExporter,
+    Span,
+    Tracer,
+)
+
+
+class EchoTool(BaseTool):
+    name = "echo"
+    description = "echo"
+
+    def to_params(self):
+        return {}
+
+    def execute(self, tool_input):
+        return "pong"
+
+
+class OneShotAgent(ReActAgent):
+    def __init__(self, context):
+        super().__init__(
+            name="tracing",
+            description="",
+            system_prompt="",
+            next_step_prompt="",
+            llm=None,
+            context=context,
+            max_steps=3,
+        )
+        self.available_tools = context.tool_collection
+
+    async def think(self):
+        return True
+
+    async def act(self):
+        command = ToolCall(id="c1", type="function", function=ToolCall.Function(name="echo", arguments="{}"))
+        results = await self.execute_tools([command])
+        self.state = AgentState.FINISHED
+        return results["c1"]
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    yield path
+    Tracer.configure(None)
+
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _run_agent():
+    tools = ToolCollection()
+    tools.add_tool(EchoTool())
+    context = AgentContext(request_id="r1", query="q", tool_collection=tools)
+    return asyncio.run(OneShotAgent(context).run("q"))
+
+
+def test_spans_nest_across_agent_step_and_tool_tasks(trace_file):
+    Tracer.configure(JsonLinesExporter(str(trace_file)))
+    assert _run_agent() == "pong"
+
+    spans = {span["name"]: span for span in _read(trace_file)}
+    assert set(spans) == {"agent.run", "agent.step", "agent.think", "agent.act", "tool.call"}
+    assert spans["agent.run"]["parentId"] is None
+    assert spans["agent.run"]["attrs"] == {"agent": "tracing", "request_id": "r1", "state": "FINISHED"}
+    assert spans["agent.step"]["parentId"] == spans["agent.run"]["spanId"]
+    assert spans["agent.act"]["parentId"] == spans["agent.step"]["spanId"]
+    # 工具在 execute_tools 创建的 task 中执行，仍挂在 act 之下
+    assert spans["tool.call"]["parentId"] == spans["agent.act"]["spanId"]
+    assert spans["tool.call"]["attrs"] == {"tool": "echo", "result_chars": 4}
+    assert len({span["traceId"] for span in spans.values()}) == 1
+    assert spans["agent.run"]["dur"] >= spans["agent.step"]["dur"]
+
+
+def test_unsampled_trace_records_nothing(trace_file):
+    Tracer.configure(JsonLinesExporter(str(trace_file)), sample_rate=0)
+    _run_agent()
+    assert not trace_file.exists()
+
+
+def test_disabled_tracer_returns_noop_span():
+    Tracer.configure(None)
+    with Tracer.span("x") as span:
+        span.set("k", "v")
+    assert span is NOOP_SPAN
+
+
+def test_chrome_trace_format_and_error_attr(tmp_path):
+    path = tmp_path / "trace.json"
+    Tracer.configure(ChromeTraceExporter(str(path)))
+    try:
+        with pytest.raises(ValueError):
+            with Tracer.span("llm.call", model="m"):
+                raise ValueError("boom")
+    finally:
+        Tracer.configure(None)
+
+    text = path.read_text(encoding="utf-8")
+    assert text.startswith("[\n")
+    events = json.loads(text.rstrip().rstrip(",") + "]")
+    assert events[0]["ph"] == "X"
+    assert events[0]["cat"] == "llm"
+    assert events[0]["args"]["error"] == "ValueError"
+
+
+def test_chrome_lanes_not_reused_while_trace_is_live(tmp_path):
+    exporter = ChromeTraceExporter(str(tmp_path / "trace.json"))
+
+    def _root(trace_id):
+        span = Span("agent.run", trace_id, None, {})
+        span.end_ns = span.start_ns
+        return span
+
+    def _lane(span):
+        return json.loads(exporter._format(span).rstrip(","))["tid"]
+
+    lane_a, lane_b = _lane(_root("A")), _lane(_root("B"))
+    # A 结束后其泳道号被释放，新 trace C 不能拿到仍在进行的 B 的泳道号
+    exporter.export([_root("A")])
+    lane_c = _lane(_root("C"))
+
+    assert (lane_a, lane_b) == (1, 2)
+    assert lane_c == 3
+    assert _lane(_root("B")) == lane_b
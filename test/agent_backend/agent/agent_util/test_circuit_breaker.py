@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from agent_backend.agent.agent_errors.agent_exception import AgentCancelledError, CircuitOpenError
+from agent_backend.agent.agent_tools.mcp.mcp_client import McpClient
+from agent_backend.agent.agent_util.circuit_breaker import BreakerState, CircuitBreaker, CircuitBreakerRegistry
+
+
+def _fail(breaker: CircuitBreaker, times: int = 1) -> None:
+    for _ in range(times):
+        with breaker.track() as call:
+            call.fail("HTTP 502")
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    breaker = CircuitBreaker("http://svc", min_calls=4, error_rate=0.5, open_seconds=60)
+    with breaker.track():
+        pass
+    _fail(breaker, 2)
+    assert breaker.state is BreakerState.CLOSED
+    _fail(breaker)
+    assert breaker.state is BreakerState.OPEN
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.track()
+    assert "HTTP 502" in str(info.value) and info.value.retry_after > 50
+    assert breaker.metrics()["rejected"] == 1
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker("http://svc", min_calls=1, open_seconds=0.01)
+    _fail(breaker)
+    time.sleep(0.02)
+    probe = breaker.track()
+    # 探测进行中，其它调用仍快速失败
+    with pytest.raises(CircuitOpenError):
+        breaker.track()
+    with probe:
+        pass
+    assert breaker.state is BreakerState.CLOSED
+
+    _fail(breaker)
+    time.sleep(0.02)
+    _fail(breaker)
+    assert breaker.state is BreakerState.OPEN
+
+
+def test_slow_calls_and_cancellation():
+    breaker = CircuitBreaker("http://svc", min_calls=2, slow_call_seconds=0, slow_rate=1.0)
+    with pytest.raises(AgentCancelledError):
+        with breaker.track():
+            raise AgentCancelledError()
+    assert breaker.metrics()["calls"] == 0
+    for _ in range(2):
+        with breaker.track():
+            pass
+    assert breaker.state is BreakerState.OPEN
+
+
+def test_mcp_server_breaker_isolated_per_server():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503 if b"bad.test" in request.content else 200, text="ok")
+
+    CircuitBreakerRegistry.configure(min_calls=2, open_seconds=60)
+    McpClient.configure(proxy_url="http://proxy.test", transport=httpx.MockTransport(handler))
+
+    async def run():
+        errors = []
+        for _ in range(3):
+            try:
+                await McpClient.call_tool("http://bad.test/mcp", "t", {})
+            except Exception as e:
+                errors.append(type(e).__name__)
+        good = await McpClient.call_tool("http://good.test/mcp", "t", {})
+        return errors, good
+
+    errors, good = asyncio.run(run())
+    assert errors == ["McpError", "McpError", "CircuitOpenError"]
+    assert good == "ok"
+    metrics = CircuitBreakerRegistry.metrics()
+    assert metrics["http://bad.test/mcp"]["state"] == "open"
+    assert metrics["http://good.test/mcp"]["state"] == "closed"
+    CircuitBreakerRegistry.configure()
+    McpClient.configure()
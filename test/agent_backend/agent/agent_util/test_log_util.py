@@ -0,0 +1,61 @@
+import logging
+import pytest
+from agent_backend.agent.agent_util.log_util import LogUtil
+
+
+class _Unserializable:
+    def __str__(self):
+        raise AssertionError("payload formatted although the record was discarded")
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    yield
+    LogUtil.configure()
+    LogUtil.shutdown()
+
+
+def test_payload_is_not_formatted_when_level_disabled():
+    logger = logging.getLogger("test_log_util.lazy")
+    logger.setLevel(logging.INFO)
+    logger.debug("payload %s", LogUtil.payload(_Unserializable(), as_json=False))
+
+
+def test_payload_is_capped_and_sampled():
+    LogUtil.configure(max_chars=10)
+    text = str(LogUtil.payload({"content": "x" * 100}))
+    assert text.startswith('{"content"')
+    assert text.endswith("...(+105 chars)")
+
+    LogUtil.configure(sample_rate=0)
+    assert str(LogUtil.payload([1, 2, 3])) == "<list len=3>"
+    assert LogUtil.cap("abcdef", 3) == "abc...(+3 chars)"
+
+
+def test_queue_handler_writes_in_background():
+    logger = logging.getLogger("test_log_util.async")
+    logger.propagate = False
+    handler = _ListHandler()
+    logger.addHandler(handler)
+    try:
+        LogUtil.install_queue_handler(logger)
+        assert handler not in logger.handlers
+        message = {"step": 1}
+        logger.warning("payload %s", LogUtil.payload(message))
+        # 入队时已完成插值，之后的修改不影响日志内容
+        message["step"] = 2
+        LogUtil.shutdown()
+        assert handler.messages == ['payload {"step": 1}']
+        assert handler in logger.handlers
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
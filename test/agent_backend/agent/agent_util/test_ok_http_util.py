@@ -127,3 +127,72 @@ def test_sync_sse():
     assert listener.error is None
     assert listener.completed is True
 
+
+
+# SSE 行被网络分片拆开时仍按完整事件回调，并做脱敏
+def test_request_sse_joins_split_lines_and_redacts():
+    import httpx
+
+    def handler(request):
+        body = [b'data: {"content": "\xe7\x94\xb5\xe8\xaf\x9d 1380', b'0138000"}\n\n', b"data: [DONE]\n\n"]
+        return httpx.Response(200, content=iter(body), headers={"Content-Type": "text/event-stream"})
+
+    events = []
+
+    class Listener(OkHttpUtil.SseEventListener):
+        def on_event(self, event: str):
+            events.append(event)
+
+        def on_complete(self):
+            events.append("<complete>")
+
+        def on_error(self, e: Exception):
+            events.append(e)
+
+    previous = OkHttpUtil._sse_client
+    OkHttpUtil._sse_client = httpx.Client(transport=httpx.MockTransport(handler))
+    try:
+        OkHttpUtil.request_sse("http://sse.test/stream", "{}", None, Listener())
+    finally:
+        OkHttpUtil._sse_client = previous
+    assert events == ['{"content": "电话 138✿✿✿✿8000"}', "[DONE]", "<complete>"]
+
+
+def _collect_sse(body):
+    import httpx
+
+    def handler(request):
+        return httpx.Response(200, content=iter(body), headers={"Content-Type": "text/event-stream"})
+
+    events = []
+
+    class Listener(OkHttpUtil.SseEventListener):
+        def on_event(self, event: str):
+            events.append(event)
+
+        def on_complete(self):
+            events.append("<complete>")
+
+        def on_error(self, e: Exception):
+            events.append(e)
+
+    previous = OkHttpUtil._sse_client
+    OkHttpUtil._sse_client = httpx.Client(transport=httpx.MockTransport(handler))
+    try:
+        OkHttpUtil.request_sse("http://sse.test/stream", "{}", None, Listener())
+    finally:
+        OkHttpUtil._sse_client = previous
+    return events
+
+
+# 文本事件共用一个流式脱敏器：号码被拆到两个事件里也能命中
+def test_request_sse_redacts_across_text_events():
+    events = _collect_sse([b"data: tel 1380\n\n", b"data: 0138000 end\n\n", b"data: [DONE]\n\n"])
+    assert events[-2:] == ["[DONE]", "<complete>"]
+    assert "".join(events[:-2]) == "tel 138✿✿✿✿8000 end"
+
+
+# 已知限制：JSON 事件只能整条脱敏，跨 JSON 事件拆开的号码不会被识别
+def test_request_sse_json_events_redacted_per_event():
+    events = _collect_sse([b'data: {"c": "1380"}\n\n', b'data: {"c": "0138000"}\n\n'])
+    assert events == ['{"c": "1380"}', '{"c": "0138000"}', "<complete>"]
@@ -0,0 +1,75 @@
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine
+
+BOUNDARY = r"(?:[^A-Za-z0-9_-]|^){}[^A-Za-z0-9_-]"
+
+
+def test_adjacent_matches_are_all_masked():
+    engine = RedactionEngine()
+    assert engine.redact("13800138000,13900139000") == "138✿✿✿✿8000,139✿✿✿✿9000"
+
+
+def test_only_exact_spans_are_replaced():
+    engine = RedactionEngine()
+    # 旧实现用 str.replace，会连带改写更长数字串中的相同片段
+    assert engine.redact("13800138000 / 9913800138000") == "138✿✿✿✿8000 / 9913800138000"
+
+
+def test_email_and_phone_in_local_part():
+    engine = RedactionEngine()
+    assert engine.redact("13800138000@qq.com") == "138✿✿✿✿8000＠qq.com"
+    assert engine.redact("me@jd.com") == "me@jd.com"
+
+
+def test_invalid_bank_card_is_kept():
+    engine = RedactionEngine()
+    assert engine.redact("卡号 6226327514303273") == "卡号 6226327514303273"
+    assert engine.redact("卡号 6226327514303272") == "卡号 622632751430✿✿✿✿✿✿"
+
+
+def test_custom_words_share_prefix_and_respect_boundaries():
+    engine = RedactionEngine({
+        BOUNDARY.format("pass"): "P",
+        BOUNDARY.format("password"): "PW",
+        "id_card": "ID",
+    })
+    assert engine.redact("password: 1, pass: 2, passwordX: 3") == "PW: 1, P: 2, passwordX: 3"
+    # 开头命中时保留后续边界字符
+    assert engine.redact("pass;") == "P;"
+    # 右边界需要一个字符
+    assert engine.redact("pass") == "pass"
+    assert engine.redact("my id_card") == "my ID"
+
+
+def test_compile_is_cached_per_mapping():
+    patterns = {BOUNDARY.format("token"): "T"}
+    assert RedactionEngine.compile(patterns) is RedactionEngine.compile(dict(patterns))
+    assert RedactionEngine.compile(patterns) is not RedactionEngine.compile({})
+
+
+def _feed_all(engine, chunks):
+    redactor = engine.stream()
+    out = [redactor.feed(chunk) for chunk in chunks]
+    return out, redactor.close()
+
+
+def test_stream_matches_whole_text_for_any_split():
+    engine = RedactionEngine({BOUNDARY.format("password"): "PW"})
+    text = "电话 13800138000，邮箱 zhang.san@example.com，password: x，身份证 510104199001011234。"
+    expected = engine.redact(text)
+    for size in (1, 2, 3, 7, 16):
+        out, tail = _feed_all(engine, [text[i:i + size] for i in range(0, len(text), size)])
+        assert "".join(out) + tail == expected
+
+
+def test_stream_emits_plain_text_immediately():
+    out, tail = _feed_all(RedactionEngine(), ["你好，", "今天天气不错，电话 1380", "0138000"])
+    assert out[:2] == ["你好，", "今天天气不错，电话 "]
+    assert "".join(out) + tail == "你好，今天天气不错，电话 138✿✿✿✿8000"
+
+
+def test_stream_keeps_left_context_across_chunks():
+    engine = RedactionEngine()
+    # 前一个字符已输出，续扫时仍按左边界判定，不误脱敏
+    text = "x" * 30 + "13800138000"
+    out, tail = _feed_all(engine, [text[:30], text[30:]])
+    assert "".join(out) + tail == text
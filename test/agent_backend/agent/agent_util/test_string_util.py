@@ -6,6 +6,8 @@ from agent_backend.agent.agent_util.string_util import (
     get_uuid,
     _luhn_bank_card_verify,
 )
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine
+from agent_backend.agent_config.genie_config import GenieConfig
 
 def test_generate_random_string():
     s = generate_random_string(16)
@@ -67,3 +69,11 @@ def test_remove_special_chars():
 def test_remove_special_chars_empty():
     assert remove_special_chars(None) == ""
     assert remove_special_chars("") == ""
+
+
+def test_text_desensitization_defaults_to_config_patterns(monkeypatch):
+    monkeypatch.setattr(RedactionEngine, "_sensitive_patterns", {})
+    RedactionEngine.from_config(GenieConfig(sensitive_patterns={"secret-x": "***"}))
+
+    assert text_desensitization('{"id_card": "secret-x"}') == '{"id_card": "***"}'
+    assert text_desensitization("13800138000") == "138✿✿✿✿8000"
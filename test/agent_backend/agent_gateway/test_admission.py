@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from agent_backend.agent_gateway.admission import AdmissionController, AdmissionRejected
+
+
+def test_queue_orders_by_priority_then_fifo():
+    async def _main():
+        admission = AdmissionController(max_concurrency=1, max_queue=10)
+        order = []
+        positions = {}
+        gate = asyncio.Event()
+
+        async def _job(name, priority):
+            def _queued(position):
+                positions[name] = position
+
+            async with admission.slot(priority, _queued):
+                order.append(name)
+                await gate.wait()
+
+        first = asyncio.create_task(_job("first", 0))
+        await asyncio.sleep(0)
+        others = []
+        for name, priority in [("low", 10), ("vip", -1), ("normal-a", 0), ("normal-b", 0)]:
+            others.append(asyncio.create_task(_job(name, priority)))
+            await asyncio.sleep(0)
+        assert admission.queued == 4
+        gate.set()
+        await asyncio.gather(first, *others)
+        return order, positions, admission
+
+    order, positions, admission = asyncio.run(_main())
+    assert order == ["first", "vip", "normal-a", "normal-b", "low"]
+    assert positions["low"] == 1 and positions["vip"] == 1 and positions["normal-b"] == 3
+    assert admission.active == 0
+
+
+def test_rejects_when_queue_full():
+    async def _main():
+        admission = AdmissionController(max_concurrency=1, max_queue=1)
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.acquire()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert admission.queued == 0
+        admission.release()
+        return e.value
+
+    rejected = asyncio.run(_main())
+    assert rejected.status == 429
+    assert rejected.queue_position == 2
+    assert rejected.retry_after > 0
+
+
+def test_drain_waits_for_inflight_and_rejects_new():
+    async def _main():
+        admission = AdmissionController(max_concurrency=2)
+        await admission.acquire()
+        drain = asyncio.create_task(admission.drain(timeout=1))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.acquire()
+        assert not drain.done()
+        admission.release()
+        return e.value.status, await drain
+
+    status, drained = asyncio.run(_main())
+    assert status == 503
+    assert drained is True
@@ -0,0 +1,393 @@
+import asyncio
+import json
+import pytest
+from agent_backend.agent.agent_core.agent_context import AgentContext
+from agent_backend.agent.agent_core.agent_prototype import AgentPrototype, AgentPrototypeRegistry
+from agent_backend.agent.agent_core.baseagent import BaseAgent
+from agent_backend.agent.agent_core.cancel_token import CancelToken
+from agent_backend.agent.agent_core.session_store import SessionStore
+from agent_backend.agent.agent_enums.agent_state import AgentState
+from agent_backend.agent.agent_enums.agent_type import AgentType, RoleType
+from agent_backend.agent.agent_llms.llm import LLMClient
+from agent_backend.agent.agent_llms.llm_setting_params import LLMParams
+from agent_backend.agent.agent_schema.message import Message
+from agent_backend.agent_gateway.admission import AdmissionController
+from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_tracing.log_printer import LogPrinter
+from agent_backend.agent_config.genie_config import GenieConfig
+from agent_backend.agent_gateway.gateway import AgentGateway, prototype_runner, read_http_request
+from agent_backend.agent_gateway.replay_buffer import ReplayRegistry
+from agent_backend.agent_model.req.agent_request import AgentRequest
+from agent_backend.agent_model.response.agent_response import AgentResponse
+
+
+async def _start_stub_openai():
+    """
+    最小 OpenAI 兼容服务：/v1/chat/completions 回显最后一条 user 消息
+    """
+
+    async def _handle(reader, writer):
+        request = await read_http_request(reader)
+        payload = json.loads(request.body)
+        content = payload["messages"][-1]["content"]
+        body = json.dumps({
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": payload["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"echo: {content}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        }).encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def _post(port, body, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode("utf-8")
+    extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write(
+        b"POST /AutoAgent HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        + f"{extra}Content-Length: {len(data)}\r\n\r\n".encode()
+        + data
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, payload.decode("utf-8")
+
+
+def _events(payload):
+    return [
+        json.loads(line[len("data: "):])
+        for line in payload.split("\n")
+        if line.startswith("data: ")
+    ]
+
+
+def test_gateway_streams_agent_response_from_stub_llm():
+    async def _main():
+        stub, stub_port = await _start_stub_openai()
+        llm = LLMClient(LLMParams(
+            model_name="stub",
+            api_key="sk-test",
+            base_url=f"http://127.0.0.1:{stub_port}/v1",
+            max_tokens=None,
+        ))
+
+        async def _runner(request, printer, cancel_token):
+            context = AgentContext(request_id=request.request_id, printer=printer)
+            answer = await llm.ask_llm_once(context, [Message.user_message(request.query)])
+            printer.send_simple("result", answer)
+
+        gateway = AgentGateway(_runner, host="127.0.0.1", port=0)
+        await gateway.start()
+        try:
+            return await _post(gateway.port, {"requestId": "r1", "query": "你好", "agentType": 5})
+        finally:
+            await gateway.drain(1)
+            stub.close()
+
+    status, payload = asyncio.run(_main())
+    events = _events(payload)
+    assert status == 200
+    assert len(events) == 1
+    assert events[0]["requestId"] == "r1"
+    assert events[0]["messageType"] == "result"
+    assert events[0]["result"] == "echo: 你好"
+    assert events[0]["finish"] is True
+    assert "plan" not in events[0]
+
+
+def test_gateway_queues_then_rejects_when_saturated():
+    async def _main():
+        release = asyncio.Event()
+
+        async def _runner(request, printer, cancel_token):
+            await release.wait()
+            printer.send_simple("result", request.query)
+
+        gateway = AgentGateway(
+            _runner,
+            admission=AdmissionController(max_concurrency=1, max_queue=1),
+            host="127.0.0.1",
+            port=0,
+        )
+        await gateway.start()
+        try:
+            running = asyncio.create_task(_post(gateway.port, {"query": "a"}))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(_post(gateway.port, {"query": "b"}))
+            await asyncio.sleep(0.05)
+            rejected = await _post(gateway.port, {"query": "c"})
+            release.set()
+            return await running, await queued, rejected
+        finally:
+            await gateway.drain(1)
+
+    running, queued, rejected = asyncio.run(_main())
+    assert running[0] == 200 and _events(running[1])[0]["result"] == "a"
+    assert queued[0] == 200
+    assert ": queued position=1" in queued[1]
+    assert _events(queued[1])[0]["result"] == "b"
+    assert rejected[0] == 429
+    assert json.loads(rejected[1])["queuePosition"] == 2
+
+
+def test_client_disconnect_cancels_running_agent():
+    async def _main():
+        started = asyncio.Event()
+        outcome = {}
+
+        async def _runner(request, printer, cancel_token):
+            started.set()
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                outcome["cancelled_at"] = asyncio.get_running_loop().time()
+                outcome["reason"] = cancel_token.reason
+                raise
+
+        gateway = AgentGateway(_runner, host="127.0.0.1", port=0)
+        await gateway.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", gateway.port)
+            data = b'{"query": "a"}'
+            writer.write(
+                b"POST /AutoAgent HTTP/1.1\r\nHost: localhost\r\n"
+                + f"Content-Length: {len(data)}\r\n\r\n".encode()
+                + data
+            )
+            await writer.drain()
+            await started.wait()
+            closed_at = asyncio.get_running_loop().time()
+            writer.close()
+            drained = await gateway.drain(1)
+            return outcome, outcome["cancelled_at"] - closed_at, drained, gateway.admission.active
+        finally:
+            await gateway.drain(1)
+
+    outcome, latency, drained, active = asyncio.run(_main())
+    assert outcome["reason"] == "client disconnected"
+    assert latency < 0.5
+    assert drained is True
+    assert active == 0
+
+
+def test_reconnect_with_last_event_id_replays_missed_events_without_rerun():
+    async def _main():
+        release = asyncio.Event()
+        runs = []
+
+        async def _runner(request, printer, cancel_token):
+            runs.append(request.request_id)
+            printer.send_simple("tool_thought", "first")
+            await release.wait()
+            printer.send_simple("result", "done")
+
+        gateway = AgentGateway(
+            _runner,
+            host="127.0.0.1",
+            port=0,
+            replay=ReplayRegistry(max_events=10, retention=5, reconnect_grace=5),
+        )
+        await gateway.start()
+        try:
+            body = json.dumps({"requestId": "r-resume", "query": "q"}).encode("utf-8")
+            request = (
+                b"POST /AutoAgent HTTP/1.1\r\nHost: localhost\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            # 第一个连接收到第一条事件后断开
+            reader, writer = await asyncio.open_connection("127.0.0.1", gateway.port)
+            writer.write(request)
+            await writer.drain()
+            first = await reader.readuntil(b'"first"')
+            writer.close()
+            await asyncio.sleep(0.05)
+
+            # 带 Last-Event-ID 重连，Agent 仍在执行，收到之后的实时输出
+            reader, writer = await asyncio.open_connection("127.0.0.1", gateway.port)
+            writer.write(request.replace(b"Host: localhost\r\n", b"Host: localhost\r\nLast-Event-ID: 1\r\n"))
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            release.set()
+            resumed = await reader.read()
+            writer.close()
+
+            # 结束后保留期内重连，补发全部事件
+            replayed = await _post(gateway.port, {"requestId": "r-resume", "query": "q"}, {"Last-Event-ID": "0"})
+            return runs, first.decode("utf-8"), resumed.decode("utf-8"), replayed
+        finally:
+            await gateway.drain(1)
+
+    runs, first, resumed, replayed = asyncio.run(_main())
+    assert runs == ["r-resume"]
+    assert "id: 1\n" in first
+    assert "id: 2\n" in resumed
+    assert [e["result"] for e in _events(resumed)] == ["done"]
+    assert replayed[0] == 200
+    assert [e["messageType"] for e in _events(replayed[1])] == ["tool_thought", "result"]
+
+
+def test_reused_request_id_cannot_take_over_stream():
+    async def _main():
+        release = asyncio.Event()
+
+        async def _runner(request, printer, cancel_token):
+            printer.send_simple("tool_thought", "secret")
+            await release.wait()
+            printer.send_simple("result", "done")
+
+        gateway = AgentGateway(
+            _runner,
+            host="127.0.0.1",
+            port=0,
+            replay=ReplayRegistry(max_events=10, retention=5, reconnect_grace=5),
+        )
+        await gateway.start()
+        try:
+            owner = asyncio.create_task(_post(gateway.port, {"requestId": "r1", "erp": "alice", "query": "q"}))
+            await asyncio.sleep(0.05)
+            other_query = await _post(gateway.port, {"requestId": "r1", "erp": "alice", "query": "new"},
+                                      {"Last-Event-ID": "0"})
+            other_user = await _post(gateway.port, {"requestId": "r1", "erp": "bob", "query": "q"},
+                                     {"Last-Event-ID": "0"})
+            no_event_id = await _post(gateway.port, {"requestId": "r1", "erp": "alice", "query": "q"})
+            # 原连接仍健康：同一请求的重连也不替换它
+            duplicate = await _post(gateway.port, {"requestId": "r1", "erp": "alice", "query": "q"},
+                                    {"Last-Event-ID": "0"})
+            release.set()
+            return await owner, other_query, other_user, no_event_id, duplicate
+        finally:
+            await gateway.drain(1)
+
+    owner, other_query, other_user, no_event_id, duplicate = asyncio.run(_main())
+    assert [e["messageType"] for e in _events(owner[1])] == ["tool_thought", "result"]
+    assert other_query[0] == other_user[0] == no_event_id[0] == duplicate[0] == 409
+    assert "secret" not in other_query[1] + other_user[1] + no_event_id[1] + duplicate[1]
+
+
+def test_session_is_owned_and_runs_one_request_at_a_time(monkeypatch):
+    store = SessionStore()
+    monkeypatch.setattr(SessionStore, "_default", store)
+
+    async def _main():
+        async def _runner(request, printer, cancel_token):
+            printer.send_simple("result", "done")
+
+        gateway = AgentGateway(_runner, host="127.0.0.1", port=0)
+        await gateway.start()
+        try:
+            session = store.get_or_create("s1", owner="alice")
+            other_user = await _post(gateway.port, {"erp": "bob", "query": "q", "sessionId": "s1"})
+            busy = await _post(gateway.port, {"erp": "alice", "query": "q", "sessionId": "s1"})
+            store.release(session)
+            ok = await _post(gateway.port, {"erp": "alice", "query": "q", "sessionId": "s1"})
+            return other_user, busy, ok
+        finally:
+            await gateway.drain(1)
+
+    other_user, busy, ok = asyncio.run(_main())
+    assert other_user[0] == busy[0] == 409
+    assert "another user" in other_user[1]
+    assert "busy" in busy[1]
+    assert ok[0] == 200
+
+
+def test_plan_patch_only_when_client_opts_in():
+    async def _main():
+        async def _runner(request, printer, cancel_token):
+            for status in ("not_started", "completed"):
+                plan = AgentResponse.Plan(title="t", steps=["执行顺序1. a：b"], step_status=[status], notes=[""])
+                printer.send_simple("plan", plan)
+
+        gateway = AgentGateway(_runner, host="127.0.0.1", port=0)
+        await gateway.start()
+        try:
+            legacy = await _post(gateway.port, {"query": "q"})
+            patched = await _post(gateway.port, {"query": "q", "planPatch": True})
+            return legacy, patched
+        finally:
+            await gateway.drain(1)
+
+    legacy, patched = asyncio.run(_main())
+    assert [e["messageType"] for e in _events(legacy[1])] == ["plan", "plan"]
+    assert [e["messageType"] for e in _events(patched[1])] == ["plan", "plan_patch"]
+
+
+class HistoryAgent(BaseAgent):
+    """
+    回答为 Memory 中全部 user 消息
+    """
+
+    async def step(self):
+        self.state = AgentState.FINISHED
+        answer = "|".join(m.content for m in self.memory.messages if m.role == RoleType.USER)
+        self.update_memory(RoleType.ASSISTANT, answer)
+        return answer
+
+
+@pytest.fixture
+def react_prototype():
+    AgentPrototypeRegistry.clear()
+    AgentPrototypeRegistry.register(
+        AgentType.REACT,
+        lambda cfg, tools: AgentPrototype.from_config(AgentType.REACT, HistoryAgent, cfg, "react", tools, name="react"),
+    )
+    AgentPrototypeRegistry.build(GenieConfig(), ToolCollection())
+    yield
+    AgentPrototypeRegistry.clear()
+
+
+def test_from_config_builds_registered_prototypes_and_reload_rebuilds(react_prototype, monkeypatch):
+    monkeypatch.setattr(SessionStore, "_default", None)
+    AgentPrototypeRegistry.clear()
+    AgentPrototypeRegistry.register(
+        AgentType.REACT,
+        lambda cfg, tools: AgentPrototype.from_config(AgentType.REACT, HistoryAgent, cfg, "react", tools, name="react"),
+    )
+    tools = ToolCollection()
+
+    AgentGateway.from_config(GenieConfig(react_max_steps=3), prototype_runner(GenieConfig(), lambda r: None), tools)
+    prototype = AgentPrototypeRegistry.get(AgentType.REACT)
+    assert prototype.max_steps == 3
+    assert prototype.tools is tools
+
+    AgentGateway.reload(GenieConfig(react_max_steps=8))
+    assert AgentPrototypeRegistry.get(AgentType.REACT).max_steps == 8
+    assert AgentPrototypeRegistry.get(AgentType.REACT).tools is tools
+
+
+def test_prototype_runner_reuses_session_history(react_prototype, monkeypatch):
+    monkeypatch.setattr(SessionStore, "_default", SessionStore())
+    runner = prototype_runner(GenieConfig(), lambda request: None)
+
+    async def _ask(query, session_id):
+        request = AgentRequest(request_id=query, query=query, agent_type=AgentType.REACT.value, session_id=session_id)
+        return await runner(request, LogPrinter(request), CancelToken())
+
+    async def _main():
+        await _ask("first", "s1")
+        return await _ask("second", "s1"), await _ask("other", None)
+
+    followup, standalone = asyncio.run(_main())
+
+    assert followup == "first|second"
+    assert standalone == "other"
+    assert len(SessionStore.get_default().get_or_create("s1").history) == 4
@@ -8,6 +8,7 @@ from agent_backend.agent.agent_core.agent_context import AgentContext
 from agent_backend.agent.agent_schema.tool.tool_choise import ToolChoice
 from agent_backend.agent.agent_tools.base_tool import BaseTool
 from agent_backend.agent.agent_tools.tool_collection import ToolCollection
+from agent_backend.agent.agent_util.redaction_engine import RedactionEngine
 
 params = LLMParams(
     model_name="Qwen/Qwen3-32B-AWQ",
@@ -82,3 +83,23 @@ async def test_ask_tool_function_call():
         function_call_type=FunctionCallType.STRUCT_PARSE,
     )
     print(result)
+
+
+def test_stream_redaction_uses_builtin_and_config_patterns(monkeypatch):
+    monkeypatch.setattr(RedactionEngine, "_sensitive_patterns", {"secret-x": "***"})
+    llm = LLMClient(params)
+
+    async def fake_stream(request):
+        for chunk in ['{"id_card": "1380013', '8000", "k": "secr', 'et-x"}']:
+            yield chunk
+
+    monkeypatch.setattr(llm, "call_openai_stream", fake_stream)
+    # 截断与 token 估算依赖在线下载编码表
+    monkeypatch.setattr(llm, "_prepare_messages", lambda *args: [])
+    monkeypatch.setattr(llm, "_estimate_stream_tokens", lambda *args: 0)
+
+    async def collect():
+        return [chunk async for chunk in llm.ask_llm_stream(context=AgentContext(request_id="r1"), messages=messages)]
+
+    # 字面量 "id_card" 不是敏感词，原样输出
+    assert "".join(asyncio.run(collect())) == '{"id_card": "138✿✿✿✿8000", "k": "***"}'
@@ -0,0 +1,85 @@
+import json
+import pytest
+from agent_backend.agent.agent_tracing.sse_printer import SSEPrinter
+from agent_backend.agent_model.req.agent_request import AgentRequest
+from agent_backend.agent_model.response import agent_response_codec
+from agent_backend.agent_model.response.agent_response import AgentResponse
+
+
+class _ListEmitter:
+    def __init__(self):
+        self.responses = []
+
+    def send(self, response):
+        self.responses.append(agent_response_codec.to_payload(response))
+
+    def complete(self):
+        pass
+
+
+def _printer():
+    emitter = _ListEmitter()
+    return SSEPrinter(emitter, AgentRequest(request_id="r1", query="q"), 5), emitter
+
+
+def test_dumps_camel_case_and_omits_none():
+    response = AgentResponse(
+        request_id="r1",
+        message_type="tool_result",
+        tool_result=AgentResponse.ToolResult(tool_name="search", tool_param={"q": "x"}),
+        plan=AgentResponse.Plan(title="t", steps=["a"], step_status=["not_started"]),
+        result_map={"agent_type": 5},
+        finish=False,
+    )
+    payload = json.loads(agent_response_codec.dumps(response))
+    assert payload["requestId"] == "r1"
+    assert payload["toolResult"] == {"toolName": "search", "toolParam": {"q": "x"}}
+    assert payload["plan"]["stepStatus"] == ["not_started"]
+    # resultMap 内的键原样保留
+    assert payload["resultMap"] == {"agent_type": 5}
+    assert "messageId" not in payload and "isFinal" not in payload
+    assert payload == response.to_dict()
+
+
+def test_sse_frame_with_event_id():
+    frame = agent_response_codec.sse_frame({"result": "你好"}, event_id=7)
+    assert frame == 'id: 7\ndata: {"result":"你好"}\n\n'.encode("utf-8")
+    assert agent_response_codec.sse_frame({"a": 1}) == b'data: {"a":1}\n\n'
+
+
+def test_pack_frame_round_trip():
+    if agent_response_codec.msgpack is None:
+        with pytest.raises(RuntimeError):
+            agent_response_codec.pack_frame({"a": 1})
+        return
+    response = AgentResponse(request_id="r1", result="ok")
+    frame = agent_response_codec.pack_frame(response)
+    assert agent_response_codec.unpack_frame(frame) == response.to_dict()
+
+
+def test_agent_stream_fast_path_matches_agent_response():
+    printer, emitter = _printer()
+    printer.send_partial("m1", "agent_stream", "hello", is_final=False)
+    payload = emitter.responses[0]
+    expected = AgentResponse(
+        request_id="r1",
+        message_id="m1",
+        is_final=False,
+        message_type="agent_stream",
+        message_time=payload["messageTime"],
+        result_map={"agentType": 5},
+        result="hello",
+        finish=False,
+    ).to_dict()
+    assert payload == expected
+    assert list(payload) == list(expected)
+
+
+def test_sse_printer_does_not_mutate_message():
+    printer, emitter = _printer()
+    message = {"fileName": "a.md", "data": "x"}
+    printer.send_simple("markdown", message)
+    printer.send_simple("result", {"taskSummary": "done"})
+    assert message == {"fileName": "a.md", "data": "x"}
+    assert emitter.responses[0]["resultMap"] == {"fileName": "a.md", "data": "x", "agentType": 5}
+    assert emitter.responses[1]["result"] == "done"